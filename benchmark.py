@@ -0,0 +1,363 @@
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import typing
+
+import generer_donnees
+import parse
+
+
+def lire_tranches(src: str) -> typing.Tuple[typing.List[str], typing.List[parse.Tranche]]:
+    '''
+    Lit l'en-tête et les tranches du fichier source, gardées en mémoire pour que
+    les mesures ne portent pas sur les lectures.
+    '''
+    with open(src, 'rb') as f:
+        noms = next(csv.reader(io.TextIOWrapper(io.BytesIO(f.readline()), encoding='utf-8-sig')))
+        tranches = [ parse.Tranche(0, donnees) for donnees in parse.lire_tranches(f, parse.TAILLE_TRANCHE) ]
+    return noms, tranches
+
+
+def lecteur_dict(noms: typing.List[str], tranches: typing.List[parse.Tranche]) -> int:
+    '''
+    Lit les lignes avec `csv.DictReader`, comme le faisait initialement le
+    script.
+    '''
+    n = 0
+    for tranche in tranches:
+        src = io.TextIOWrapper(io.BytesIO(tranche.donnees), encoding='utf-8')
+        for ligne in csv.DictReader(src, noms):
+            n += 1
+    return n
+
+
+def lecteur_csv(noms: typing.List[str], tranches: typing.List[parse.Tranche]) -> int:
+    '''
+    Lit les lignes complètes avec `csv.reader`.
+    '''
+    n = 0
+    for tranche in tranches:
+        src = io.TextIOWrapper(io.BytesIO(tranche.donnees), encoding='utf-8')
+        for ligne in csv.reader(src):
+            if ligne:
+                n += 1
+    return n
+
+
+def lecteur_projete(noms: typing.List[str], tranches: typing.List[parse.Tranche]) -> int:
+    '''
+    Lit les lignes projetées sur les champs utilisés avec `parse.lire_lignes`.
+    '''
+    n = 0
+    for tranche in tranches:
+        for ligne in parse.lire_lignes(tranche):
+            n += 1
+    return n
+
+
+LECTEURS = {
+    'csv.DictReader': lecteur_dict,
+    'csv.reader': lecteur_csv,
+    'projection': lecteur_projete
+}
+
+
+# le nombre de lignes générées pour les mesures des fonctions
+LIGNES_MICRO = 10000
+
+# les erreurs levées par les fonctions mesurées sur des champs invalides
+ERREURS = (parse.CastError, parse.GenError)
+
+# les champs sources des conversions appelées par les fonctions generer_*, hors
+# colonnes du schéma
+CHAMPS_CONVERSIONS = {
+    'cast_code': ['Code_INSEE_(BAN)'],
+    'cast_conso': [
+        'Production_électricité_PV_(kWhep/an)', 'Electricité_PV_autoconsommée', 'Surface_totale_capteurs_photovoltaïque'
+    ] + [
+        f'Conso_chauffage{depensier}_générateur_n°{no_generateur}_installation_n°{no_installation}'
+        for depensier in ('', '_dépensier') for no_installation in range(1, 3) for no_generateur in range(1, 3)
+    ] + [
+        f'Conso_é_finale{depensier}_générateur_ECS_n°{no_generateur}'
+        for depensier in ('', '_dépensier') for no_generateur in range(1, 3)
+    ],
+    'cast_nombre': ['N°_département_(BAN)', 'Nombre_niveau_logement', 'Nombre_niveau_immeuble', 'Nombre_appartement'],
+    'cast_str': ['Identifiant__BAN', 'Adresse_brute', 'N°_DPE_remplacé', 'Type_ventilation', 'Catégorie_ENR'],
+    'cast_surface': ['Surface_habitable_logement', 'Surface_habitable_immeuble', 'Surface_ventilée'],
+    'cast_typologie': ['Typologie_logement']
+}
+
+Appels = typing.Callable[[], typing.List[typing.Tuple]]
+
+
+def preparer_conversions(noms: typing.List[str], lignes: typing.List[typing.List[str]]) -> typing.Dict[str, typing.Tuple[typing.Callable, Appels]]:
+    '''
+    Prépare les appels de chaque fonction cast_* sur les valeurs de ses champs
+    sources dans les lignes générées : retourne pour chacune la fonction et
+    celle produisant les arguments de ses appels.
+    '''
+    champs: typing.Dict[str, typing.Set[str]] = { fonction.__name__: set() for fonction in parse.CONVERSIONS.values() }
+    for schema in parse.SCHEMA.values():
+        for colonne in schema:
+            for source in filter(None, (colonne.source, colonne.repli)):
+                champs[parse.CONVERSIONS[colonne.conversion].__name__].update(
+                    source.format(no_installation=no_installation, no_generateur=no_generateur)
+                    for no_installation in range(1, 3) for no_generateur in range(1, 3)
+                )
+    for nom, sources in CHAMPS_CONVERSIONS.items():
+        champs[nom].update(sources)
+
+    positions = { nom: i for i, nom in enumerate(noms) }
+    conversions = {}
+    for nom, sources in champs.items():
+        arguments = [ (ligne[positions[source]],) for ligne in lignes for source in sorted(sources) ]
+        conversions[nom] = (getattr(parse, nom), lambda arguments=arguments: arguments)
+    return conversions
+
+
+def preparer_generations(lignes: typing.List[parse.LigneSource]) -> typing.Dict[str, typing.Tuple[typing.Callable, Appels]]:
+    '''
+    Prépare les appels des fonctions generer_* et de `combiner_generateurs` sur
+    les lignes projetées, leurs arguments étant extraits au préalable :
+    retourne pour chacune la fonction et celle produisant les arguments de ses
+    appels.
+    '''
+    e = parse.entete
+    appels: typing.Dict[str, typing.List[typing.Tuple]] = { nom: [] for nom in (
+        'generer_departement', 'generer_commune', 'generer_logement', 'generer_dpe', 'generer_installation_chauffage',
+        'generer_installation_ecs', 'generer_installation_solaire', 'generer_generateur_chauffage',
+        'generer_generateur_ecs', 'generer_diagnostic'
+    ) }
+    combinaisons = []
+
+    for ligne in lignes:
+        no_dpe = ligne[e.no_dpe]
+        dpe    = { 'no_dpe': no_dpe }
+        try:
+            no_departement = parse.cle_departement(ligne)
+            appels['generer_departement'].append((ligne, no_departement))
+            code_insee = parse.cle_commune(ligne)
+            appels['generer_commune'].append((ligne, code_insee, no_departement))
+            appels['generer_logement'].append((ligne, 1, code_insee))
+        except ERREURS:
+            pass
+        appels['generer_dpe'].append((ligne, no_dpe, 1))
+        appels['generer_installation_ecs'].append((ligne, dpe))
+        appels['generer_installation_solaire'].append((ligne, dpe))
+        appels['generer_diagnostic'].append((ligne, no_dpe, 1))
+
+        generateurs_chauffage = []
+        for no_installation in range(1, 3):
+            appels['generer_installation_chauffage'].append((ligne, dpe, no_installation))
+            installation = { 'no_dpe': no_dpe, 'no_installation_chauffage': no_installation }
+            for no_generateur in range(1, 3):
+                appels['generer_generateur_chauffage'].append((ligne, installation, no_generateur))
+                try:
+                    generateurs_chauffage.append(parse.generer_generateur_chauffage(ligne, installation, no_generateur))
+                except ERREURS:
+                    pass
+        generateurs_ecs = []
+        installation = { 'no_dpe': no_dpe, 'no_installation_ecs': 1 }
+        for no_generateur in range(1, 3):
+            appels['generer_generateur_ecs'].append((ligne, installation, no_generateur))
+            try:
+                generateurs_ecs.append(parse.generer_generateur_ecs(ligne, installation, no_generateur))
+            except ERREURS:
+                pass
+        if generateurs_chauffage or generateurs_ecs:
+            combinaisons.append((generateurs_chauffage, generateurs_ecs))
+
+    generations: typing.Dict[str, typing.Tuple[typing.Callable, Appels]] = {
+        nom: (getattr(parse, nom), lambda arguments=arguments: arguments) for nom, arguments in appels.items()
+    }
+    # les générateurs étant modifiés par leur combinaison, ils sont copiés
+    # avant chaque mesure
+    generations['combiner_generateurs'] = (parse.combiner_generateurs, lambda: [
+        ([ dict(g) for g in chauffage ], [ dict(g) for g in ecs ]) for chauffage, ecs in combinaisons
+    ])
+    return generations
+
+
+def mesurer(fonction: typing.Callable, appels: Appels, repetitions: int) -> typing.Optional[float]:
+    '''
+    Mesure la durée moyenne d'un appel d'une fonction en nanosecondes, la
+    meilleure de plusieurs mesures étant retenue, ou None si elle n'a aucun
+    appel à mesurer.
+    '''
+    meilleure = math.inf
+    for _ in range(repetitions):
+        arguments = appels()
+        if not arguments:
+            return None
+        debut = time.perf_counter()
+        for args in arguments:
+            try:
+                fonction(*args)
+            except ERREURS:
+                pass
+        meilleure = min(meilleure, time.perf_counter() - debut)
+    return meilleure / len(arguments) * 1e9
+
+
+def mesurer_fonctions(graine: int, repetitions: int) -> typing.Dict[str, float]:
+    '''
+    Mesure les fonctions cast_* et generer_* sur des lignes générées.
+    '''
+    noms   = generer_donnees.generer_entete()
+    lignes = list(generer_donnees.Generateur(noms, graine).lignes(LIGNES_MICRO))
+    parse.indexer_entete(noms)
+    projetees = [ parse.entete.projeter(ligne) for ligne in lignes ]
+
+    fonctions = { **preparer_conversions(noms, lignes), **preparer_generations(projetees) }
+    for nom in vars(parse):
+        if nom.startswith(('cast_', 'generer_')) and nom not in fonctions:
+            print(f'{nom} : non mesurée', file=sys.stderr)
+
+    durees = {}
+    for nom, (fonction, appels) in sorted(fonctions.items()):
+        duree = mesurer(fonction, appels, repetitions)
+        if duree is not None:
+            durees[nom] = duree
+    return durees
+
+
+def mesurer_traitement(lignes: int, graine: int, workers: int) -> typing.Dict[str, typing.Any]:
+    '''
+    Mesure le traitement complet par parse.py d'un fichier généré, dans un
+    répertoire temporaire : débit en lignes par seconde et mémoire résidente
+    maximale, d'après ses dernières métriques d'avancement.
+    '''
+    with tempfile.TemporaryDirectory() as repertoire:
+        os.mkdir(os.path.join(repertoire, 'data'))
+        noms = generer_donnees.generer_entete()
+        with open(os.path.join(repertoire, parse.fichier_src), 'w', encoding='utf-8', newline='') as sortie:
+            generer_donnees.ecrire(sortie, noms, generer_donnees.Generateur(noms, graine).lignes(lignes))
+
+        commande = [ sys.executable, os.path.abspath(parse.__file__), '--workers', str(workers),
+                     '--metrics-interval', '0', '--metrics-json', '--checkpoint-interval', '0' ]
+        resultat = subprocess.run(commande, cwd=repertoire, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if resultat.returncode != 0:
+            sys.exit(f'Échec du traitement :\n{resultat.stderr}')
+
+    metriques = json.loads([ ligne for ligne in resultat.stderr.splitlines() if ligne.startswith('{') ][-1])
+    return {
+        'lignes_par_seconde': metriques['lignes_par_seconde'],
+        'memoire_max_mo': metriques['memoire_max_mo']
+    }
+
+
+def comparer(nom: str, valeur: typing.Optional[float], reference: typing.Optional[float], tolerance: float,
+             plus_grand_meilleur: bool = False) -> typing.Optional[str]:
+    '''
+    Compare une mesure à sa référence, et retourne la description de sa
+    régression au delà de la tolérance, ou None.
+    '''
+    if valeur is None or not reference:
+        return None
+    ecart = (reference / valeur if plus_grand_meilleur else valeur / reference) - 1
+    if ecart > tolerance:
+        return f'{nom} : {valeur:.4g} au lieu de {reference:.4g} ({ecart:+.0%})'
+    return None
+
+
+def mesurer_suite(args: argparse.Namespace) -> None:
+    '''
+    Mesure les fonctions et le traitement complet sur des fichiers générés, et
+    les compare aux références enregistrées, en terminant en erreur en cas de
+    régression.
+    '''
+    parametres = { 'lignes': args.rows, 'graine': args.seed, 'workers': args.workers }
+    reference = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            reference = json.load(f)
+        if reference['parametres'] != parametres:
+            sys.exit(f'Les références de "{args.baseline}" ont été mesurées avec d\'autres paramètres : {reference["parametres"]}')
+
+    resultats = {
+        'parametres': parametres,
+        'fonctions': mesurer_fonctions(args.seed, args.repetitions),
+        'traitement': mesurer_traitement(args.rows, args.seed, args.workers)
+    }
+
+    regressions = []
+    for nom, duree in resultats['fonctions'].items():
+        precedente = reference['fonctions'].get(nom) if reference else None
+        print(f'{nom:32} {duree:10.0f} ns' + (f'  x{precedente / duree:.2f}' if precedente else ''))
+        regressions.append(comparer(nom, duree, precedente, args.tolerance))
+    for nom, plus_grand_meilleur in (('lignes_par_seconde', True), ('memoire_max_mo', False)):
+        valeur     = resultats['traitement'][nom]
+        precedente = reference['traitement'][nom] if reference else None
+        print(f'{nom:32} {valeur!s:>10}' + (f'  (référence {precedente})' if precedente else ''))
+        regressions.append(comparer(nom, valeur, precedente, args.tolerance, plus_grand_meilleur))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2)
+        print(f'Références enregistrées dans "{args.baseline}"')
+    elif reference is None:
+        print(f'Aucune référence dans "{args.baseline}" : --save-baseline les enregistre')
+
+    regressions = [ regression for regression in regressions if regression is not None ]
+    if regressions:
+        sys.exit('Régressions au delà de {:.0%} :\n'.format(args.tolerance) + '\n'.join(regressions))
+
+
+def mesurer_lecteurs(src: str, repetitions: int) -> None:
+    '''
+    Compare les temps de lecture du fichier source par chaque lecteur.
+    '''
+    noms, tranches = lire_tranches(src)
+    parse.indexer_entete(noms)
+    octets = sum(len(tranche.donnees) for tranche in tranches)
+    print(f'{src} : {octets / 2 ** 20:.1f} Mo, {len(noms)} champs dont {len(parse.entete.projection)} utilisés')
+
+    reference = None
+    for nom, lecteur in LECTEURS.items():
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            lignes = lecteur(noms, tranches)
+            durees.append(time.perf_counter() - debut)
+        duree = min(durees)
+        reference = reference or duree
+        print(f'{nom:16} {duree:7.3f} s  {lignes / duree:9.0f} lignes/s  {octets / 2 ** 20 / duree:6.1f} Mo/s  x{reference / duree:.2f}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare les temps de lecture du fichier source, ou mesure les performances du traitement sur des fichiers générés.')
+    parser.add_argument('src', nargs='?', default=parse.fichier_src,
+                        help=f'fichier source (par défaut "{parse.fichier_src}")')
+    parser.add_argument('--repetitions', type=int, default=3,
+                        help='nombre de mesures par lecteur ou par fonction, dont la meilleure est retenue (par défaut 3)')
+    parser.add_argument('--suite', action='store_true',
+                        help="mesure les fonctions cast_* et generer_* et le traitement complet d'un fichier généré, et les compare aux références")
+    parser.add_argument('--rows', type=int, default=50000, metavar='N',
+                        help='nombre de lignes du fichier généré pour le traitement complet (par défaut 50000)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='graine des fichiers générés (par défaut 0)')
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help='nombre de processus du traitement complet (par défaut 1)')
+    parser.add_argument('--baseline', default='benchmark.json', metavar='FICHIER',
+                        help='fichier des références (par défaut "benchmark.json")')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='enregistre les mesures comme références au lieu de les comparer')
+    parser.add_argument('--tolerance', type=float, default=.2, metavar='PROPORTION',
+                        help='écart toléré par rapport aux références (par défaut 0.2)')
+    args = parser.parse_args()
+
+    if args.suite:
+        mesurer_suite(args)
+    else:
+        mesurer_lecteurs(args.src, args.repetitions)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,409 @@
+import argparse
+import concurrent.futures
+import glob
+import graphlib
+import os
+import re
+import shutil
+import subprocess
+import time
+import typing
+
+import parse
+
+
+# le répertoire des fichiers produits et des fichiers de contrôle
+REPERTOIRE = 'data'
+
+# taille par défaut au delà de laquelle un fichier est réparti entre plusieurs
+# flux de chargement, en Mo
+TAILLE_DECOUPAGE = 256
+
+# le fichier des instructions à exécuter après un chargement
+FICHIER_APRES_CHARGEMENT = os.path.join(REPERTOIRE, 'apres_chargement.sql')
+
+# les codes de retour de SQL*Loader : succès, échec, succès avec des lignes
+# rejetées ou écartées, et erreur fatale
+EX_SUCC, EX_FAIL, EX_WARN, EX_FTL = 0, 1, 2, 3
+
+
+class Flux(typing.NamedTuple):
+    '''
+    Un flux de chargement d'une table, soit une exécution de SQL*Loader : son
+    fichier de contrôle, ses fichiers de données, de rejets et de journal, et
+    le nombre de lignes d'en-tête à ignorer.
+    '''
+    table: str
+    controle: str
+    donnees: str
+    rejets: str
+    journal: str
+    entete: int
+
+
+class Journal(typing.NamedTuple):
+    '''
+    Les chiffres relevés dans le journal d'une exécution de SQL*Loader : lignes
+    chargées, rejetées (erreurs de données ou refus de la base) et écartées
+    (clauses WHEN ou champs tous vides), et temps écoulé et processeur, en
+    secondes.
+    '''
+    charges: int = 0
+    rejetes: int = 0
+    ecartes: int = 0
+    duree: typing.Optional[float] = None
+    cpu: typing.Optional[float] = None
+
+
+class Resultat(typing.NamedTuple):
+    '''
+    Le chargement d'une table : ses flux, le pire de leurs codes de retour, la
+    somme des chiffres de leurs journaux, et sa durée mesurée de bout en bout.
+    '''
+    table: str
+    flux: int
+    code: int
+    journal: Journal
+    duree: float
+
+
+_motif_infile     = re.compile('\\bINFILE (\\S+)')
+_motif_charges    = re.compile('(\\d+) Rows? successfully loaded')
+_motif_rejetes    = re.compile('(\\d+) Rows? not loaded due to data errors')
+_motif_ecartes    = re.compile('(\\d+) Rows? not loaded because all (?:WHEN clauses were failed|fields were null)')
+_motif_duree      = re.compile('Elapsed time was:\\s+(\\d+):(\\d+):([0-9.]+)')
+_motif_cpu        = re.compile('CPU time was:\\s+(\\d+):(\\d+):([0-9.]+)')
+_motif_contrainte = re.compile('\\bCONSTRAINT (\\w+)\\s+(PRIMARY KEY|UNIQUE|REFERENCES|FOREIGN KEY|CHECK)\\b')
+
+def lire_journal(fichier: str) -> Journal:
+    '''
+    Relève les chiffres du journal d'une exécution de SQL*Loader, vides si le
+    journal n'a pas été écrit.
+    '''
+    try:
+        with open(fichier, encoding='utf-8', errors='replace') as f:
+            texte = f.read()
+    except FileNotFoundError:
+        return Journal()
+
+    def secondes(motif: typing.Pattern) -> typing.Optional[float]:
+        temps = motif.search(texte)
+        if temps is None:
+            return None
+        heures, minutes, secondes = temps.groups()
+        return int(heures) * 3600 + int(minutes) * 60 + float(secondes)
+
+    return Journal(
+        sum(map(int, _motif_charges.findall(texte))),
+        sum(map(int, _motif_rejetes.findall(texte))),
+        sum(map(int, _motif_ecartes.findall(texte))),
+        secondes(_motif_duree),
+        secondes(_motif_cpu)
+    )
+
+
+def additionner(journaux: typing.Iterable[Journal]) -> Journal:
+    '''
+    Additionne les chiffres des journaux des flux d'une table : leurs temps
+    écoulés se recouvrant, seul le plus long est retenu.
+    '''
+    journaux = list(journaux)
+    durees   = [ journal.duree for journal in journaux if journal.duree is not None ]
+    cpus     = [ journal.cpu for journal in journaux if journal.cpu is not None ]
+    return Journal(
+        sum(journal.charges for journal in journaux),
+        sum(journal.rejetes for journal in journaux),
+        sum(journal.ecartes for journal in journaux),
+        max(durees) if durees else None,
+        sum(cpus) if cpus else None
+    )
+
+
+def trouver_donnees(table: str) -> typing.Optional[str]:
+    '''
+    Retourne le fichier CSV produit pour une table, éventuellement compressé
+    par l'option --compress de parse.py.
+    '''
+    for extension in ('', *(f'.{compression}' for compression in parse.COMPRESSIONS)):
+        fichier = os.path.join(REPERTOIRE, f'{table}.csv{extension}')
+        if os.path.exists(fichier):
+            return fichier
+    return None
+
+
+def trouver_partitions(table: str) -> typing.List[typing.Tuple[str, str]]:
+    '''
+    Retourne les partitions d'une table et leurs fichiers CSV produits par
+    l'option --partition de parse.py, data/<table>/<partition>.csv,
+    éventuellement compressés, ou une liste vide si elle n'est pas
+    partitionnée.
+    '''
+    extensions = ('csv', *(f'csv.{compression}' for compression in parse.COMPRESSIONS))
+    partitions = []
+    for fichier in sorted(glob.glob(os.path.join(REPERTOIRE, glob.escape(table), '*.csv*'))):
+        # les parties d'une partition découpée, <partition>.<no>.csv, sont
+        # écartées
+        partition, _, extension = os.path.basename(fichier).partition('.')
+        if extension in extensions:
+            partitions.append((partition, fichier))
+    return partitions
+
+
+def supprimer(*fichiers: str) -> None:
+    '''
+    Supprime des fichiers d'une exécution précédente, s'ils existent.
+    '''
+    for fichier in fichiers:
+        try:
+            os.remove(fichier)
+        except FileNotFoundError:
+            pass
+
+
+def copier_controle(controle: str, copie: str, donnees: str) -> str:
+    '''
+    Copie le fichier de contrôle d'une table pour qu'il charge un autre fichier
+    de données, désigné relativement au répertoire de la copie, et retourne la
+    copie.
+    '''
+    with open(controle, encoding='utf-8') as f:
+        modele = f.read()
+    infile = f'INFILE {os.path.relpath(donnees, os.path.dirname(copie))}'
+    with open(copie, 'w', encoding='utf-8') as f:
+        f.write(_motif_infile.sub(lambda _: infile, modele, count=1))
+    return copie
+
+
+def preparer_flux(table: str, fichier: str, flux: int, partition: typing.Optional[str] = None) -> typing.List[Flux]:
+    '''
+    Prépare les flux de chargement d'une table, ou d'une de ses partitions. Un
+    fichier CSV non compressé chargé en un seul flux l'est tel quel ; sinon il
+    est décompressé et découpé en `flux` parties de tailles voisines, alignées
+    sur les fins d'enregistrement et sans en-tête. Chaque partie, et le fichier
+    d'une partition, sont chargés d'après une copie du fichier de contrôle de la
+    table, placée avec les fichiers de rejets et de journal à côté des données.
+    '''
+    controle = os.path.join(REPERTOIRE, f'{table}.ctl')
+    base     = os.path.join(REPERTOIRE, table) if partition is None else os.path.join(REPERTOIRE, table, partition)
+    if flux == 1 and fichier.endswith('.csv'):
+        if partition is not None:
+            controle = copier_controle(controle, f'{base}.ctl', fichier)
+        return [ Flux(table, controle, fichier, f'{base}.bad', f'{base}.log', 1) ]
+
+    resultat = []
+    with parse.Source(fichier) as source:
+        source.flux.readline()
+        # des tranches assez petites pour que les parties soient équilibrées
+        taille   = max(2 ** 16, min(parse.TAILLE_TRANCHE, source.taille // (4 * flux)))
+        tranches = parse.lire_tranches(source.flux, taille)
+        for no in range(1, flux + 1):
+            partie = f'{base}.{no}.csv'
+            with open(partie, 'wb') as f:
+                # chaque partie reçoit des tranches jusqu'à atteindre sa part
+                # du fichier, éventuellement compressé
+                while no == flux or source.lus() < source.taille * no // flux:
+                    tranche = next(tranches, None)
+                    if tranche is None:
+                        break
+                    f.write(tranche)
+
+            resultat.append(Flux(table, copier_controle(controle, f'{base}.{no}.ctl', partie), partie,
+                                 f'{base}.{no}.bad', f'{base}.{no}.log', 0))
+    return resultat
+
+
+def commande(sqlldr: str, connexion: str, flux: Flux, direct: bool, parallele: bool) -> typing.List[str]:
+    '''
+    Retourne la ligne de commande de SQL*Loader chargeant un flux.
+    '''
+    arguments = [ sqlldr, connexion, f'BAD={flux.rejets}', f'CONTROL={flux.controle}', f'LOG={flux.journal}',
+                  f'skip={flux.entete}' ]
+    if direct:
+        arguments.append('DIRECT=TRUE')
+    if parallele:
+        arguments += [ 'PARALLEL=TRUE', 'SKIP_INDEX_MAINTENANCE=TRUE' ]
+    return arguments
+
+
+def executer(arguments: typing.List[str], flux: Flux) -> int:
+    '''
+    Exécute SQL*Loader sur un flux, après avoir supprimé ses fichiers de rejets
+    et de journal d'une exécution précédente, et retourne son code de retour.
+    '''
+    supprimer(flux.rejets, flux.journal)
+    return subprocess.run(arguments, stdout=subprocess.DEVNULL).returncode
+
+
+def charger(schema: typing.Dict[str, parse.TableSql], flux: typing.Dict[str, typing.List[Flux]],
+            arguments: typing.Callable[[Flux], typing.List[str]], jobs: int) -> typing.Dict[str, Resultat]:
+    '''
+    Charge les tables dans l'ordre de leurs clés étrangères, une table étant
+    chargée dès que les tables qu'elle référence l'ont été, en même temps que
+    les autres tables prêtes, et tous ses flux en parallèle, dans la limite de
+    `jobs` exécutions simultanées de SQL*Loader.
+    Une table en échec n'interrompt pas le chargement des tables qui n'en
+    dépendent pas ; celles qui en dépendent ne sont pas chargées.
+    '''
+    ordre = graphlib.TopologicalSorter({ table: schema[table].references for table in flux })
+    ordre.prepare()
+
+    resultats: typing.Dict[str, Resultat] = {}
+    debuts:    typing.Dict[str, float] = {}
+    codes:     typing.Dict[str, typing.List[int]] = {}
+    en_cours:  typing.Dict[concurrent.futures.Future, Flux] = {}
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executeur:
+        while True:
+            for table in ordre.get_ready():
+                debuts[table] = time.monotonic()
+                codes[table]  = []
+                for f in flux[table]:
+                    en_cours[executeur.submit(executer, arguments(f), f)] = f
+            if not en_cours:
+                break
+
+            finis, _ = concurrent.futures.wait(en_cours, return_when=concurrent.futures.FIRST_COMPLETED)
+            for futur in finis:
+                table = en_cours.pop(futur).table
+                codes[table].append(futur.result())
+                if len(codes[table]) < len(flux[table]):
+                    continue
+
+                code = max(codes[table])
+                resultats[table] = Resultat(table, len(flux[table]), code,
+                                            additionner(lire_journal(f.journal) for f in flux[table]),
+                                            time.monotonic() - debuts[table])
+                if code in (EX_SUCC, EX_WARN):
+                    ordre.done(table)
+    return resultats
+
+
+def ecrire_apres_chargement(schema: typing.Dict[str, parse.TableSql], directes: typing.List[str],
+                            paralleles: typing.List[str], index: str) -> None:
+    '''
+    Écrit les instructions à exécuter après un chargement : en chargement
+    direct, SQL*Loader désactive les clés étrangères et contraintes CHECK des
+    tables chargées, et laisse inutilisables les index de clé primaire et
+    d'unicité des tables chargées en parallèle, qui doivent être reconstruits
+    en premier ; les index du script `index` sont ensuite créés, puis les
+    synthèses des requêtes rafraîchies avec les lignes chargées.
+    '''
+    instructions = []
+    for table in paralleles:
+        for nom, nature in _motif_contrainte.findall(schema[table].creation):
+            if nature in ('PRIMARY KEY', 'UNIQUE'):
+                instructions.append(f'ALTER INDEX {nom} REBUILD;')
+    for table in directes:
+        for nom, nature in _motif_contrainte.findall(schema[table].creation):
+            if nature not in ('PRIMARY KEY', 'UNIQUE'):
+                instructions.append(f'ALTER TABLE {table} ENABLE VALIDATE CONSTRAINT {nom};')
+    # chemin relatif au fichier des instructions, pour la commande @@ de
+    # SQL*Plus
+    instructions.append(f'@@{os.path.relpath(index, REPERTOIRE)}')
+    instructions.append('EXECUTE rafraichir_syntheses;')
+
+    with open(FICHIER_APRES_CHARGEMENT, 'w', encoding='utf-8') as f:
+        f.writelines(f'{instruction}\n' for instruction in instructions)
+
+
+def afficher(resultats: typing.Dict[str, Resultat], tables: typing.Iterable[str]) -> None:
+    '''
+    Affiche le chargement de chaque table, dans l'ordre des clés étrangères.
+    '''
+    def duree(secondes: typing.Optional[float]) -> str:
+        return '-' if secondes is None else f'{secondes:.1f}'
+
+    tables  = list(tables)
+    largeur = max(map(len, tables), default=0)
+    print(f'{"table":<{largeur}} {"flux":>4} {"chargées":>10} {"rejetées":>9} {"écartées":>9} {"durée (s)":>9} '
+          f'{"sqlldr (s)":>10} {"cpu (s)":>8}')
+    for table in tables:
+        if table not in resultats:
+            print(f'{table:<{largeur}} non chargée, une table référencée ne l\'ayant pas été')
+            continue
+        r = resultats[table]
+        etat = '' if r.code in (EX_SUCC, EX_WARN) else f' échec (code {r.code}), voir les journaux {REPERTOIRE}/{table}*'
+        print(f'{table:<{largeur}} {r.flux:>4} {r.journal.charges:>10} {r.journal.rejetes:>9} {r.journal.ecartes:>9} '
+              f'{r.duree:>9.1f} {duree(r.journal.duree):>10} {duree(r.journal.cpu):>8}{etat}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Charge les fichiers produits par parse.py avec SQL*Loader.')
+    parser.add_argument('connexion',
+                        help='accès à la base de données, par exemple user/user@localhost:1521/XEPDB1')
+    parser.add_argument('--sqlldr', default='sqlldr', metavar='EXECUTABLE',
+                        help='exécutable de SQL*Loader (défaut : sqlldr)')
+    parser.add_argument('--jobs', type=int, default=4, metavar='N',
+                        help="nombre maximal d'exécutions simultanées de SQL*Loader (défaut : 4)")
+    parser.add_argument('--direct', action='store_true',
+                        help='chargement direct (DIRECT=TRUE), les clés étrangères et contraintes CHECK devant '
+                             'être réactivées ensuite')
+    parser.add_argument('--streams', type=int, default=1, metavar='N',
+                        help='nombre de flux de chargement direct parallèle des fichiers volumineux (défaut : 1)')
+    parser.add_argument('--split-size', type=int, default=TAILLE_DECOUPAGE, metavar='MO',
+                        help=f'taille au delà de laquelle un fichier est réparti entre plusieurs flux '
+                             f'(défaut : {TAILLE_DECOUPAGE})')
+    parser.add_argument('--schema', default='init.sql', metavar='FICHIER',
+                        help='script de création des tables, dont les clés étrangères ordonnent le chargement '
+                             '(défaut : init.sql)')
+    parser.add_argument('--index', default='index.sql', metavar='FICHIER',
+                        help='script de création des index, exécuté après le chargement (défaut : index.sql)')
+    args = parser.parse_args()
+
+    if args.jobs < 1 or args.streams < 1:
+        parser.error('--jobs et --streams doivent être strictement positifs')
+    if shutil.which(args.sqlldr) is None:
+        parser.error(f'exécutable "{args.sqlldr}" introuvable')
+    if not os.path.exists(args.index):
+        parser.error(f'fichier "{args.index}" introuvable')
+
+    schema = parse.lire_schema(args.schema)
+    flux: typing.Dict[str, typing.List[Flux]] = {}
+    for table in schema:
+        # une table sans fichier de contrôle ne serait pas chargée, mais les
+        # tables qui la référencent le seraient
+        if not os.path.exists(os.path.join(REPERTOIRE, f'{table}.ctl')):
+            parser.error(f'fichier de contrôle "{REPERTOIRE}/{table}.ctl" introuvable')
+        # les partitions d'une table sont chargées en parallèle, chacune en un
+        # ou plusieurs flux
+        partitions: typing.List[typing.Tuple[typing.Optional[str], str]] = []
+        partitions.extend(trouver_partitions(table))
+        if not partitions:
+            fichier = trouver_donnees(table)
+            if fichier is None:
+                parser.error(f'fichier "{REPERTOIRE}/{table}.csv" introuvable')
+            partitions.append((None, fichier))
+        flux[table] = []
+        for partition, fichier in partitions:
+            n = args.streams if os.path.getsize(fichier) > args.split_size * 2 ** 20 else 1
+            flux[table].extend(preparer_flux(table, fichier, n, partition))
+
+    def arguments(f: Flux) -> typing.List[str]:
+        parallele = len(flux[f.table]) > 1
+        return commande(args.sqlldr, args.connexion, f, args.direct or parallele, parallele)
+
+    resultats = charger(schema, flux, arguments, args.jobs)
+    afficher(resultats, flux)
+
+    paralleles = [ table for table in resultats if resultats[table].flux > 1 ]
+    directes   = list(resultats) if args.direct else paralleles
+    if resultats:
+        ecrire_apres_chargement(schema, directes, paralleles, args.index)
+        print(f'Instructions à exécuter après le chargement : {FICHIER_APRES_CHARGEMENT}')
+
+    # les parties des fichiers découpés ou décompressés, et les copies des
+    # fichiers de contrôle, ne sont conservées qu'en cas d'échec, pour en
+    # examiner le chargement
+    for table, r in resultats.items():
+        if r.code in (EX_SUCC, EX_WARN):
+            for f in flux[table]:
+                if not f.entete:
+                    supprimer(f.donnees)
+                if f.controle != os.path.join(REPERTOIRE, f'{table}.ctl'):
+                    supprimer(f.controle)
+
+    if any(r.code not in (EX_SUCC, EX_WARN) for r in resultats.values()) or len(resultats) < len(flux):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
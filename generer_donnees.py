@@ -0,0 +1,397 @@
+import argparse
+import csv
+import random
+import sys
+import typing
+
+
+# Les champs du fichier source utilisés par parse.py, sous leur nom dans
+# l'export de l'ADEME.
+CHAMPS = [
+    'N°DPE', 'Date_réception_DPE', 'Date_établissement_DPE', 'Date_visite_diagnostiqueur', 'Date_fin_validité_DPE',
+    'Version_DPE', 'N°_DPE_remplacé', 'Appartement_non_visité_(0/1)', 'N°_immatriculation_copropriété',
+    'Invariant_fiscal_logement', 'Etiquette_GES', 'Etiquette_DPE', 'Type_ventilation', 'Surface_ventilée',
+    'Production_électricité_PV_(kWhep/an)', 'Electricité_PV_autoconsommée', 'Surface_totale_capteurs_photovoltaïque',
+    'Catégorie_ENR', 'Type_bâtiment', 'Année_construction', 'Type_installation_chauffage',
+    'Type_installation_ECS_(général)', 'Hauteur_sous-plafond', 'Nombre_niveau_logement', 'Nombre_niveau_immeuble',
+    'Surface_habitable_logement', 'Nombre_appartement', 'Surface_habitable_immeuble', 'Classe_inertie_bâtiment',
+    'Typologie_logement', 'Identifiant__BAN', 'Adresse_brute', 'Code_INSEE_(BAN)', 'Nom__commune_(BAN)',
+    'Nom__commune_(Brut)', 'Code_postal_(BAN)', 'Code_postal_(brut)', 'N°_département_(BAN)', 'N°_région_(BAN)',
+    'Zone_climatique_', 'Description_installation_ECS', 'Type_installation_ECS', 'Configuration_installation_ECS',
+    'Type_installation_solaire', 'Facteur_couverture_solaire'
+] + [
+    champ
+    for no_installation in range(1, 3)
+    for champ in [
+        f'Description_installation_chauffage_n°{no_installation}',
+        f'Type_installation_chauffage_n°{no_installation}',
+        f'Configuration_installation_chauffage_n°{no_installation}',
+        f'Surface_chauffée_installation_chauffage_n°{no_installation}',
+        f'Type_émetteur_installation_chauffage_n°{no_installation}'
+    ] + [
+        champ
+        for no_generateur in range(1, 3)
+        for champ in [
+            f'Conso_chauffage_générateur_n°{no_generateur}_installation_n°{no_installation}',
+            f'Conso_chauffage_dépensier_générateur_n°{no_generateur}_installation_n°{no_installation}',
+            f'Description_générateur_chauffage_n°{no_generateur}_installation_n°{no_installation}',
+            f'Type_énergie_générateur_n°{no_generateur}_installation_n°{no_installation}',
+            f'Type_générateur_n°{no_generateur}_installation_n°{no_installation}',
+            f'Usage_générateur_n°{no_generateur}_installation_n°{no_installation}'
+        ]
+    ]
+] + [
+    champ
+    for no_generateur in range(1, 3)
+    for champ in [
+        f'Conso_é_finale_générateur_ECS_n°{no_generateur}',
+        f'Conso_é_finale_dépensier_générateur_ECS_n°{no_generateur}',
+        f'Description_générateur_ECS_n°{no_generateur}',
+        f'Date_installation_générateur_ECS_n°{no_generateur}',
+        f'Type_énergie_générateur_ECS_n°{no_generateur}',
+        f'Type_générateur_ECS_n°{no_generateur}',
+        f'Usage_générateur_ECS_n°{no_generateur}'
+    ]
+]
+
+# Des champs de l'export non utilisés par parse.py, qui n'y sont que découpés
+# ou ignorés : ils sont remplis de valeurs quelconques, numériques pour la
+# plupart.
+CHAMPS_INUTILISES = [
+    'Méthode_application_DPE', 'Modèle_DPE', 'Date_derniere_modification_DPE', 'Statut_géocodage', 'Score_BAN',
+    'Nom__rue_(BAN)', 'N°_voie_(BAN)', 'Coordonnée_cartographique_X_(BAN)', 'Coordonnée_cartographique_Y_(BAN)',
+    'Conso_5_usages_é_finale', 'Conso_5_usages_par_m²_é_primaire', 'Emission_GES_5_usages',
+    'Emission_GES_5_usages_par_m²', 'Conso_chauffage_é_finale', 'Conso_ECS_é_finale', 'Conso_éclairage_é_finale',
+    'Conso_refroidissement_é_finale', 'Conso_auxiliaires_é_finale', 'Coût_total_5_usages', 'Coût_chauffage',
+    'Coût_ECS', 'Besoin_chauffage', 'Besoin_ECS', 'Deperditions_enveloppe', 'Déperditions_murs',
+    'Déperditions_baies_vitrées', 'Déperditions_planchers_bas', 'Déperditions_planchers_hauts',
+    'Déperditions_ponts_thermiques', 'Déperditions_portes', 'Déperditions_renouvellement_air', 'Ubat_W/m²_K',
+    'Qualité_isolation_enveloppe', 'Qualité_isolation_murs', 'Qualité_isolation_menuiseries',
+    'Qualité_isolation_plancher_bas', 'Indicateur_confort_été', 'Type_énergie_principale_chauffage',
+    'Type_énergie_principale_ECS', 'Type_énergie_n°1'
+]
+
+# le nombre de champs d'une ligne générée par défaut, de l'ordre de celui de
+# l'export, complété au besoin par des champs numérotés
+LARGEUR = 230
+
+# départements : numéro, région et zone climatique, les départements corses,
+# rejetés faute d'un numéro entier, étant aussi rares que dans l'export
+DEPARTEMENTS = [
+    ('01', '84', 'H1c'), ('06', '93', 'H3'), ('13', '93', 'H3'), ('29', '53', 'H2a'), ('33', '75', 'H2c'),
+    ('59', '32', 'H1a'), ('67', '44', 'H1b'), ('69', '84', 'H1c'), ('75', '11', 'H1a'), ('974', '04', 'H3')
+]
+DEPARTEMENTS_CORSES = [ ('2A', '94', 'H3'), ('2B', '94', 'H3') ]
+
+# un logement : identifiant BAN, adresse brute, département et numéro de commune
+Logement = typing.Tuple[str, str, typing.Tuple[str, str, str], int]
+
+ENERGIES = ['Électricité', 'Gaz naturel', 'Fioul domestique', 'Bois – Bûches', 'GPL', 'Réseau de Chauffage urbain']
+
+GENERATEURS_CHAUFFAGE = [
+    ('Chaudière gaz à condensation 2001-2015', 'Gaz naturel'), ('Chaudière gaz standard', 'Gaz naturel'),
+    ('PAC air/eau installée après 2014', 'Électricité'), ('Convecteur électrique NFC, NF** et NF***', 'Électricité'),
+    ('Chaudière fioul standard', 'Fioul domestique'), ('Poêle à bois bûche', 'Bois – Bûches'),
+    ('Réseau de chaleur', 'Réseau de Chauffage urbain')
+]
+
+GENERATEURS_ECS = [
+    ('Ballon électrique à accumulation vertical Catégorie C ou 3 étoiles', 'Électricité'),
+    ('Chauffe-eau gaz instantané', 'Gaz naturel'), ('CET sur air extérieur', 'Électricité')
+]
+
+TYPES_INSTALLATION = [
+    'installation individuelle', 'installation collective',
+    'installation collective multi-bâtiment : modélisée comme un réseau de chaleur',
+    'installation hybride collective-individuelle (chauffage base + appoint individuel ou convecteur bi-jonction)'
+]
+
+# des valeurs invalides, par type de champ optionnel ou dont l'absence lève une
+# GenError, rejetant le DPE
+INVALIDES = {
+    'surface': ['', 'NC', '-12.5', '123456'],
+    'conso': ['', 'NC', '0', '-3.2'],
+    'code': ['', '1000', 'ABCDE'],
+    'str': [''],
+    'type_batiment': ['', 'bateau', 'Maison'],
+    'type_installation': ['', 'autre', 'Installation individuelle'],
+    'facteur': ['', '2', '1.5', 'NC'],
+    'hauteur_sous_plafond': ['', 'haut', '100', '2,5']
+}
+
+
+def entrelacer(champs: typing.List[str], inutilises: typing.List[str]) -> typing.List[str]:
+    '''
+    Répartit régulièrement les champs inutilisés entre les champs utilisés,
+    pour que le dernier de ceux-ci soit, comme dans l'export, proche de la fin
+    d'une ligne.
+    '''
+    entete = []
+    for i, champ in enumerate(champs):
+        entete += inutilises[i * len(inutilises) // len(champs):(i + 1) * len(inutilises) // len(champs)]
+        entete.append(champ)
+    return entete
+
+
+def generer_entete(largeur: int = LARGEUR) -> typing.List[str]:
+    '''
+    Génère l'en-tête d'un fichier source d'au moins `largeur` champs.
+    '''
+    inutilises = CHAMPS_INUTILISES + [ f'Champ_supplémentaire_n°{i}' for i in range(1, largeur - len(CHAMPS) - len(CHAMPS_INUTILISES) + 1) ]
+    return entrelacer(CHAMPS, inutilises)
+
+
+class Generateur:
+    '''
+    Génère les lignes d'un fichier source fictif, à l'image de l'export de
+    l'ADEME.
+
+    `doublons` est la proportion de DPE portant sur un logement déjà
+    diagnostiqué, `invalides` celle des champs dont la valeur est invalide,
+    `sans_installation` celle des DPE sans installation de chauffage ni d'ECS,
+    rejetés, et `combines` celle des générateurs de chauffage servant aussi à
+    l'ECS, associés à un générateur d'ECS de même usage.
+    '''
+    def __init__(self, noms: typing.Sequence[str], graine: int = 0, doublons: float = .3, invalides: float = .01,
+                 sans_installation: float = .02, combines: float = .2) -> None:
+        self.noms              = list(noms)
+        self.aleatoire         = random.Random(graine)
+        self.doublons          = doublons
+        self.invalides         = invalides
+        self.sans_installation = sans_installation
+        self.combines          = combines
+        # les logements déjà diagnostiqués
+        self.logements: typing.List[Logement] = []
+
+        manquants = [ nom for nom in CHAMPS if nom not in self.noms ]
+        if manquants:
+            raise ValueError(f'Champs absents de l\'en-tête : {", ".join(manquants)}')
+
+    def probable(self, proportion: float) -> bool:
+        return self.aleatoire.random() < proportion
+
+    def valeur(self, type_champ: str, valeur: str) -> str:
+        '''
+        Retourne `valeur`, ou une valeur invalide de son type.
+        '''
+        if self.probable(self.invalides):
+            return self.aleatoire.choice(INVALIDES[type_champ])
+        return valeur
+
+    def date(self, debut: int = 2021, fin: int = 2024) -> str:
+        a = self.aleatoire
+        return f'{a.randint(debut, fin)}-{a.randint(1, 12):02}-{a.randint(1, 28):02}'
+
+    def reel(self, minimum: float, maximum: float, decimales: int = 1) -> str:
+        return f'{self.aleatoire.uniform(minimum, maximum):.{decimales}f}'
+
+    def logement(self) -> Logement:
+        '''
+        Choisit un logement déjà diagnostiqué, ou en crée un nouveau.
+        '''
+        a = self.aleatoire
+        if self.logements and self.probable(self.doublons):
+            id_ban, adresse, departement, commune = a.choice(self.logements)
+            # la même adresse, à la casse et aux espaces près
+            if a.random() < .3:
+                adresse = ' '.join(adresse.upper().split())
+            return id_ban, adresse, departement, commune
+
+        n = len(self.logements)
+        departement = a.choice(DEPARTEMENTS_CORSES if a.random() < .005 else DEPARTEMENTS)
+        commune     = a.randrange(1, 60)
+        id_ban      = f'{departement[0]}{commune:03}_{a.randrange(10000):04}_{n:05}'
+        adresse     = f'{n % 250 + 1} rue des "Lilas" {n} Commune {commune}'
+        if a.random() < .1:
+            adresse += f'\nBâtiment {n % 3}'
+        logement = (id_ban, adresse, departement, commune)
+        self.logements.append(logement)
+        return logement
+
+    def ligne(self, no: int) -> typing.Dict[str, str]:
+        '''
+        Génère les champs d'une ligne du fichier source.
+        '''
+        a = self.aleatoire
+        v = self.valeur
+        r: typing.Dict[str, str] = {}
+
+        r['N°DPE'] = f'23{a.choice("0123456789ABCDEF")}{no:010}'
+        # les champs requis dont l'absence lève une CastError, interrompant le
+        # traitement, ne sont jamais invalides
+        for champ in ('Date_réception_DPE', 'Date_établissement_DPE', 'Date_visite_diagnostiqueur'):
+            r[champ] = self.date()
+        r['Date_fin_validité_DPE'] = self.date(2031, 2034)
+        r['Version_DPE']           = a.choice(['2', '2.1', '2.2', '2.3'])
+        if no and a.random() < .05:
+            r['N°_DPE_remplacé'] = f'23{a.choice("0123456789ABCDEF")}{a.randrange(no):010}'
+        r['Appartement_non_visité_(0/1)']   = a.choice(['0', '0', '1', ''])
+        r['N°_immatriculation_copropriété'] = a.choice(['', '', f'AB{a.randrange(10 ** 7):07}', 'Non connu'])
+        r['Invariant_fiscal_logement']      = a.choice(['', '0000000000', f'{a.randrange(10 ** 10):010}'])
+        r['Etiquette_GES']                  = a.choice('ABCDEFG')
+        r['Etiquette_DPE']                  = a.choice('ABCDEFG')
+
+        if a.random() < .6:
+            r['Type_ventilation'] = a.choice(['VMC SF Auto réglable après 2012', 'Ventilation par ouverture des fenêtres', 'VMC DF individuelle avec échangeur'])
+            r['Surface_ventilée'] = v('surface', self.reel(10, 300))
+        if a.random() < .15:
+            r['Production_électricité_PV_(kWhep/an)']   = v('conso', self.reel(100, 8000))
+            r['Electricité_PV_autoconsommée']           = a.choice(['', self.reel(10, 3000)])
+            r['Surface_totale_capteurs_photovoltaïque'] = a.choice(['', str(a.randint(5, 40))])
+            r['Catégorie_ENR'] = a.choice(['panneaux photovoltaïques', 'Il existe plusieurs descriptifs ENR', ''])
+
+        id_ban, adresse, departement, commune = self.logement()
+        no_departement, no_region, zone = departement
+        code = f'{no_departement}{commune:03}'[:5].zfill(5) if no_departement.isdigit() else f'20{commune:03}'
+        type_batiment = v('type_batiment', a.choices(['maison', 'appartement', 'immeuble'], [45, 50, 5])[0])
+
+        r['Type_bâtiment']                   = type_batiment
+        r['Année_construction']              = a.choice(['', str(a.randint(1700, 2023))])
+        r['Type_installation_chauffage']     = a.choice(['individuel', 'individuel', 'collectif', 'mixte (collectif-individuel)', ''])
+        r['Type_installation_ECS_(général)'] = a.choice(['individuel', 'individuel', 'collectif', ''])
+        r['Hauteur_sous-plafond']            = v('hauteur_sous_plafond', a.choice(['2.5', '2.5', '2.7', '3', '2.4']))
+        r['Classe_inertie_bâtiment']         = a.choice(['Moyenne', 'Lourde', 'Légère', 'Très légère', ''])
+        if type_batiment == 'appartement':
+            r['Nombre_niveau_logement'] = a.choice(['', '1', '1', '2'])
+            r['Nombre_niveau_immeuble'] = a.choice(['', '1', '4', '7'])
+            r['Typologie_logement']     = a.choice(['T1', 'T2', 'T3', 'T4', 'T7 ou plus', ''])
+            r['Nombre_appartement']     = a.choice(['1', str(a.randint(2, 80)), ''])
+            r['Surface_habitable_immeuble'] = a.choice(['', self.reel(200, 5000)])
+        r['Surface_habitable_logement'] = v('surface', self.reel(9, 300))
+
+        if a.random() < .9:
+            r['Identifiant__BAN'] = id_ban
+        r['Adresse_brute']        = adresse
+        r['Code_INSEE_(BAN)']     = v('code', code)
+        r['Nom__commune_(BAN)']   = a.choice([f'Commune {commune}', f'Commune {commune}', ''])
+        r['Nom__commune_(Brut)']  = f'COMMUNE {commune}'
+        r['Code_postal_(BAN)']    = v('code', code)
+        r['Code_postal_(brut)']   = code
+        r['N°_département_(BAN)'] = no_departement
+        r['N°_région_(BAN)']      = no_region
+        r['Zone_climatique_']     = zone
+
+        sans_installation = self.probable(self.sans_installation)
+
+        # installation d'ECS, dont les générateurs peuvent être associés à
+        # ceux de chauffage de même usage
+        ecs_combines: typing.List[typing.Tuple[str, str]] = []
+        if not sans_installation and a.random() < .85:
+            r['Description_installation_ECS']   = a.choice(['', 'Ballon électrique à accumulation vertical'])
+            r['Type_installation_ECS']          = v('type_installation', a.choice(TYPES_INSTALLATION[:2]))
+            r['Configuration_installation_ECS'] = 'un seul système'
+            for no_generateur in range(1, 3 if a.random() < .2 else 2):
+                combine = self.probable(self.combines)
+                type_generateur, energie = a.choice(GENERATEURS_CHAUFFAGE if combine else GENERATEURS_ECS)
+                r[f'Conso_é_finale_générateur_ECS_n°{no_generateur}']           = v('conso', self.reel(100, 6000, 2))
+                r[f'Conso_é_finale_dépensier_générateur_ECS_n°{no_generateur}'] = v('conso', self.reel(100, 8000, 2))
+                r[f'Description_générateur_ECS_n°{no_generateur}']      = a.choice(['', type_generateur])
+                r[f'Date_installation_générateur_ECS_n°{no_generateur}'] = a.choice(['', '', str(a.randint(1980, 2023))])
+                r[f'Type_énergie_générateur_ECS_n°{no_generateur}']     = v('str', energie)
+                r[f'Type_générateur_ECS_n°{no_generateur}']             = v('str', type_generateur)
+                r[f'Usage_générateur_ECS_n°{no_generateur}']            = 'chauffage + ecs' if combine else 'ecs'
+                if combine:
+                    ecs_combines.append((type_generateur, energie))
+        if not sans_installation and a.random() < .05:
+            r['Type_installation_solaire']  = v('str', 'Chauffe-eau solaire')
+            r['Facteur_couverture_solaire'] = v('facteur', a.choice(['0.3', '0.55', '1']))
+
+        for no_installation in range(1, 3):
+            if sans_installation or a.random() >= (.95 if no_installation == 1 else .15):
+                continue
+            r[f'Description_installation_chauffage_n°{no_installation}']      = a.choice(['', 'Chaudière individuelle gaz\n(2010)'])
+            r[f'Type_installation_chauffage_n°{no_installation}']             = v('type_installation', a.choice(TYPES_INSTALLATION))
+            r[f'Configuration_installation_chauffage_n°{no_installation}']    = 'Installation de chauffage simple'
+            r[f'Surface_chauffée_installation_chauffage_n°{no_installation}'] = v('surface', self.reel(9, 300))
+            r[f'Type_émetteur_installation_chauffage_n°{no_installation}']    = a.choice(['Radiateur monotube', 'Plancher chauffant', 'Convecteur'])
+            for no_generateur in range(1, 3 if a.random() < .25 else 2):
+                if ecs_combines:
+                    # même type de générateur, ou au moins même énergie
+                    type_generateur, energie = ecs_combines.pop()
+                    if a.random() < .3:
+                        type_generateur = a.choice(GENERATEURS_CHAUFFAGE)[0]
+                    usage = 'chauffage + ecs'
+                else:
+                    type_generateur, energie = a.choice(GENERATEURS_CHAUFFAGE)
+                    usage = 'chauffage + ecs' if self.probable(self.combines / 4) else 'chauffage'
+                suffixe = f'n°{no_generateur}_installation_n°{no_installation}'
+                r[f'Conso_chauffage_générateur_{suffixe}']           = v('conso', self.reel(100, 30000))
+                r[f'Conso_chauffage_dépensier_générateur_{suffixe}'] = v('conso', self.reel(100, 40000))
+                r[f'Description_générateur_chauffage_{suffixe}']     = a.choice(['', type_generateur])
+                r[f'Type_énergie_générateur_{suffixe}']              = v('str', energie)
+                r[f'Type_générateur_{suffixe}']                      = v('str', type_generateur)
+                r[f'Usage_générateur_{suffixe}']                     = usage
+
+        return r
+
+    def lignes(self, n: int) -> typing.Iterator[typing.List[str]]:
+        '''
+        Génère `n` lignes du fichier source, dans l'ordre de l'en-tête.
+        '''
+        a = self.aleatoire
+        utilises   = [ nom in CHAMPS for nom in self.noms ]
+        inutilises = utilises.count(False)
+        # les champs inutilisés sont pris d'une suite de valeurs quelconques, à
+        # partir d'une position aléatoire
+        remplissage = [ a.choice(['', '', self.reel(0, 10000, 2), 'Moyenne']) for _ in range(4096 + inutilises) ]
+        for no in range(n):
+            r = self.ligne(no)
+            valeurs = iter(remplissage[a.randrange(4096):])
+            yield [ r.get(nom, '') if utilise else next(valeurs) for nom, utilise in zip(self.noms, utilises) ]
+
+
+def ecrire(sortie: typing.TextIO, noms: typing.List[str], lignes: typing.Iterable[typing.List[str]]) -> None:
+    '''
+    Écrit un fichier source, comme l'export : en UTF-8 avec BOM et fins de
+    ligne CRLF.
+    '''
+    sortie.write('\ufeff')
+    ecrivain = csv.writer(sortie, lineterminator='\r\n')
+    ecrivain.writerow(noms)
+    ecrivain.writerows(lignes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Génère un fichier source fictif, à l'image de l'export DPE de l'ADEME.")
+    parser.add_argument('destination',
+                        help='fichier produit, "-" pour la sortie standard')
+    parser.add_argument('--rows', type=int, default=100000, metavar='N',
+                        help='nombre de lignes (défaut : 100000)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='graine du générateur pseudo-aléatoire (défaut : 0)')
+    parser.add_argument('--header', metavar='FICHIER',
+                        help="reprend l'en-tête d'un export réel, les champs non utilisés étant remplis de valeurs quelconques")
+    parser.add_argument('--columns', type=int, default=LARGEUR, metavar='N',
+                        help=f"nombre de champs de l'en-tête généré (défaut : {LARGEUR})")
+    parser.add_argument('--duplicate-rate', type=float, default=.3, metavar='PROPORTION',
+                        help='proportion de DPE portant sur un logement déjà diagnostiqué (défaut : 0.3)')
+    parser.add_argument('--invalid-rate', type=float, default=.01, metavar='PROPORTION',
+                        help='proportion de champs invalides (défaut : 0.01)')
+    parser.add_argument('--missing-installation-rate', type=float, default=.02, metavar='PROPORTION',
+                        help="proportion de DPE sans installation de chauffage ni d'ECS (défaut : 0.02)")
+    parser.add_argument('--combined-rate', type=float, default=.2, metavar='PROPORTION',
+                        help="proportion de générateurs d'ECS servant aussi au chauffage (défaut : 0.2)")
+    args = parser.parse_args()
+
+    if args.header:
+        with open(args.header, encoding='utf-8-sig', newline='') as f:
+            noms = next(csv.reader(f))
+    else:
+        noms = generer_entete(args.columns)
+
+    try:
+        generateur = Generateur(noms, args.seed, args.duplicate_rate, args.invalid_rate,
+                                args.missing_installation_rate, args.combined_rate)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.destination == '-':
+        sys.stdout.reconfigure(encoding='utf-8', newline='')
+        ecrire(sys.stdout, noms, generateur.lignes(args.rows))
+    else:
+        with open(args.destination, 'w', encoding='utf-8', newline='') as sortie:
+            ecrire(sortie, noms, generateur.lignes(args.rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+-- index dérivés des requêtes de query/ et des synthèses qu'elles lisent, à
+-- créer après le chargement des tables (voir data/apres_chargement.sql) pour
+-- ne pas le ralentir
+
+DROP INDEX idx_communes_departements;
+DROP INDEX idx_logements_communes;
+DROP INDEX idx_dpes_logements;
+DROP INDEX idx_generateurs_installations_chauffage;
+DROP INDEX idx_generateurs_installations_ecs;
+DROP INDEX idx_generateurs_installations_solaire;
+DROP INDEX bix_departements_zone_climatique;
+DROP INDEX bix_dpes_etiquette_dpe;
+DROP INDEX bix_dpes_etiquette_ges;
+DROP INDEX bix_dpes_dpe_remplace;
+DROP INDEX bix_generateurs_code_type_energie;
+
+-- clés étrangères suivies par les jointures des synthèses et par les
+-- suppressions en cascade des DPE modifiés, complétées des colonnes lues pour
+-- que les jointures n'aient pas à accéder aux tables
+
+CREATE INDEX idx_communes_departements               ON communes    (no_departement, code_insee);
+CREATE INDEX idx_logements_communes                  ON logements   (code_insee, type_installation_chauffage);
+CREATE INDEX idx_dpes_logements                      ON dpes        (id_logement, date_etablissement);
+CREATE INDEX idx_generateurs_installations_chauffage ON generateurs (no_dpe, no_installation_chauffage);
+CREATE INDEX idx_generateurs_installations_ecs       ON generateurs (no_dpe, no_installation_ecs);
+CREATE INDEX idx_generateurs_installations_solaire   ON generateurs (no_dpe, no_installation_solaire);
+
+-- colonnes de peu de valeurs, filtrées ou regroupées par les synthèses, les
+-- index bitmap des tables partitionnées étant locaux
+
+CREATE BITMAP INDEX bix_departements_zone_climatique  ON departements (zone_climatique);
+CREATE BITMAP INDEX bix_dpes_etiquette_dpe            ON dpes         (etiquette_dpe)     LOCAL;
+CREATE BITMAP INDEX bix_dpes_etiquette_ges            ON dpes         (etiquette_ges)     LOCAL;
+CREATE BITMAP INDEX bix_dpes_dpe_remplace             ON dpes         (dpe_remplace)      LOCAL;
+CREATE BITMAP INDEX bix_generateurs_code_type_energie ON generateurs  (code_type_energie) LOCAL;
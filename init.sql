@@ -1,13 +1,29 @@
 CLEAR SCREEN;
 
-DROP TABLE generateurs             CASCADE CONSTRAINTS PURGE;
-DROP TABLE installations_solaire   CASCADE CONSTRAINTS PURGE;
-DROP TABLE installations_ecs       CASCADE CONSTRAINTS PURGE;
-DROP TABLE installations_chauffage CASCADE CONSTRAINTS PURGE;
-DROP TABLE dpes                    CASCADE CONSTRAINTS PURGE;
-DROP TABLE logements               CASCADE CONSTRAINTS PURGE;
-DROP TABLE communes                CASCADE CONSTRAINTS PURGE;
-DROP TABLE departements            CASCADE CONSTRAINTS PURGE;
+DROP MATERIALIZED VIEW synthese_generateurs_energies;
+DROP MATERIALIZED VIEW synthese_generateurs_typologies;
+DROP MATERIALIZED VIEW synthese_generateurs_departements;
+DROP MATERIALIZED VIEW synthese_dpes_annees;
+DROP MATERIALIZED VIEW synthese_dpes_etiquettes;
+DROP MATERIALIZED VIEW synthese_installations_chauffage;
+DROP MATERIALIZED VIEW synthese_installations_ecs;
+DROP MATERIALIZED VIEW synthese_installations_solaire;
+DROP MATERIALIZED VIEW synthese_logements_zones;
+
+DROP TABLE generateurs                           CASCADE CONSTRAINTS PURGE;
+DROP TABLE types_generateur                      CASCADE CONSTRAINTS PURGE;
+DROP TABLE types_energie                         CASCADE CONSTRAINTS PURGE;
+DROP TABLE descriptions_generateur               CASCADE CONSTRAINTS PURGE;
+DROP TABLE installations_solaire                 CASCADE CONSTRAINTS PURGE;
+DROP TABLE installations_ecs                     CASCADE CONSTRAINTS PURGE;
+DROP TABLE installations_chauffage               CASCADE CONSTRAINTS PURGE;
+DROP TABLE types_emetteur_chauffage              CASCADE CONSTRAINTS PURGE;
+DROP TABLE configurations_installation_chauffage CASCADE CONSTRAINTS PURGE;
+DROP TABLE dpes                                  CASCADE CONSTRAINTS PURGE;
+DROP TABLE identifiants_logements                CASCADE CONSTRAINTS PURGE;
+DROP TABLE logements                             CASCADE CONSTRAINTS PURGE;
+DROP TABLE communes                              CASCADE CONSTRAINTS PURGE;
+DROP TABLE departements                          CASCADE CONSTRAINTS PURGE;
 
 CREATE TABLE departements
     ( no_departement  NUMBER(3) CONSTRAINT pk_departements                 PRIMARY KEY
@@ -21,10 +37,13 @@ CREATE TABLE communes
                                   CONSTRAINT fk_communes_departements   REFERENCES departements ON DELETE CASCADE
     , nom_commune    VARCHAR2(50) CONSTRAINT nn_communes_nom_commune    NOT NULL
     , code_postal    NUMBER(5)    CONSTRAINT nn_communes_code_postal    NOT NULL
+    )
+    PARTITION BY LIST (no_departement) AUTOMATIC
+    ( PARTITION communes_1 VALUES (1)
     );
 
 CREATE TABLE logements
-    ( id_logement                 VARCHAR2(300) CONSTRAINT pk_logements                      PRIMARY KEY
+    ( id_logement                 NUMBER(10)    CONSTRAINT pk_logements                      PRIMARY KEY
     , code_insee                                CONSTRAINT nn_logements_code_insee           NOT NULL
                                                 CONSTRAINT fk_logements_communes             REFERENCES communes ON DELETE CASCADE
     , annee_construction          NUMBER(4)
@@ -36,7 +55,19 @@ CREATE TABLE logements
     , surface_habitable           NUMBER(6,1)   CONSTRAINT nn_logements_surface_habitable    NOT NULL
     , classe_inertie              VARCHAR2(15)
     , typologie                   CHAR(2)
-    );
+    )
+    PARTITION BY REFERENCE (fk_logements_communes);
+
+CREATE TABLE identifiants_logements
+    ( id_logement                CONSTRAINT pk_identifiants_logements           PRIMARY KEY
+                                 CONSTRAINT fk_identifiants_logements_logements REFERENCES logements ON DELETE CASCADE
+    , id_ban        VARCHAR2(300)
+    , adresse_brute VARCHAR2(300)
+    
+    , CONSTRAINT chk_identifiants_logements CHECK (id_ban IS NOT NULL AND adresse_brute IS     NULL
+                                                OR id_ban IS     NULL AND adresse_brute IS NOT NULL)
+    )
+    PARTITION BY REFERENCE (fk_identifiants_logements_logements);
 
 CREATE TABLE dpes
     ( no_dpe                         CHAR(13)     CONSTRAINT pk_dpes                    PRIMARY KEY
@@ -63,59 +94,266 @@ CREATE TABLE dpes
                                           OR type_ventilation IS     NULL AND surface_ventilee IS     NULL)
     , CONSTRAINT chk_dpes_enr         CHECK (conso_enr IS NOT NULL AND production_enr IS NOT NULL AND surface_capteurs_pv IS NOT NULL
                                           OR conso_enr IS     NULL AND production_enr IS     NULL AND surface_capteurs_pv IS     NULL AND type_enr IS NULL)
+    )
+    PARTITION BY RANGE (date_etablissement) INTERVAL (NUMTOYMINTERVAL(1, 'YEAR'))
+    ( PARTITION dpes_2021 VALUES LESS THAN (DATE '2022-01-01')
+    );
+
+CREATE TABLE configurations_installation_chauffage
+    ( code_configuration_installation_chauffage NUMBER(6)     CONSTRAINT pk_configurations_installation_chauffage                                      PRIMARY KEY
+    , configuration_installation_chauffage      VARCHAR2(200) CONSTRAINT nn_configurations_installation_chauffage_configuration_installation_chauffage NOT NULL
+                                                              CONSTRAINT uq_configurations_installation_chauffage_configuration_installation_chauffage UNIQUE
+    );
+
+CREATE TABLE types_emetteur_chauffage
+    ( code_type_emetteur_chauffage NUMBER(6)     CONSTRAINT pk_types_emetteur_chauffage                         PRIMARY KEY
+    , type_emetteur_chauffage      VARCHAR2(150) CONSTRAINT nn_types_emetteur_chauffage_type_emetteur_chauffage NOT NULL
+                                                 CONSTRAINT uq_types_emetteur_chauffage_type_emetteur_chauffage UNIQUE
     );
 
 CREATE TABLE installations_chauffage
-    ( no_dpe                                              CONSTRAINT fk_installations_chauffage_dpes                                 REFERENCES dpes ON DELETE CASCADE
-    , no_installation_chauffage            NUMBER(1)
-    , description_installation_chauffage   VARCHAR2(1000)
-    , type_installation_chauffage          VARCHAR2(12)   CONSTRAINT nn_installations_chauffage_type_installation_chauffage          NOT NULL
-    , configuration_installation_chauffage VARCHAR2(200)  CONSTRAINT nn_installations_chauffage_configuration_installation_chauffage NOT NULL
-    , surface_chauffee                     NUMBER(6,1)    CONSTRAINT nn_installations_chauffage_surface_chauffee                     NOT NULL
-    , type_emetteur_chauffage              VARCHAR2(150)  CONSTRAINT nn_installations_chauffage_type_emetteur_chauffage              NOT NULL
+    ( no_dpe                                                   CONSTRAINT nn_installations_chauffage_no_dpe                                    NOT NULL
+                                                               CONSTRAINT fk_installations_chauffage_dpes                                      REFERENCES dpes ON DELETE CASCADE
+    , no_installation_chauffage                 NUMBER(1)
+    , description_installation_chauffage        VARCHAR2(1000)
+    , type_installation_chauffage               VARCHAR2(12)   CONSTRAINT nn_installations_chauffage_type_installation_chauffage               NOT NULL
+    , code_configuration_installation_chauffage                CONSTRAINT nn_installations_chauffage_code_configuration_installation_chauffage NOT NULL
+                                                               CONSTRAINT fk_installations_chauffage_configurations_installation_chauffage     REFERENCES configurations_installation_chauffage
+    , surface_chauffee                          NUMBER(6,1)    CONSTRAINT nn_installations_chauffage_surface_chauffee                          NOT NULL
+    , code_type_emetteur_chauffage                             CONSTRAINT nn_installations_chauffage_code_type_emetteur_chauffage              NOT NULL
+                                                               CONSTRAINT fk_installations_chauffage_types_emetteur_chauffage                  REFERENCES types_emetteur_chauffage
     
     , CONSTRAINT pk_installations_chauffage PRIMARY KEY (no_dpe, no_installation_chauffage)
-    );
+    )
+    PARTITION BY REFERENCE (fk_installations_chauffage_dpes);
 
 CREATE TABLE installations_ecs
-    ( no_dpe                                        CONSTRAINT fk_installations_ecs_dpes                           REFERENCES dpes ON DELETE CASCADE
+    ( no_dpe                                        CONSTRAINT nn_installations_ecs_no_dpe                         NOT NULL
+                                                    CONSTRAINT fk_installations_ecs_dpes                           REFERENCES dpes ON DELETE CASCADE
     , no_installation_ecs            NUMBER(1)
     , description_installation_ecs   VARCHAR2(1000)
     , type_installation_ecs          VARCHAR2(12)   CONSTRAINT nn_installations_ecs_type_installation_ecs          NOT NULL
     , configuration_installation_ecs VARCHAR2(200)  CONSTRAINT nn_installations_ecs_configuration_installation_ecs NOT NULL
     
     , CONSTRAINT pk_installations_ecs PRIMARY KEY (no_dpe, no_installation_ecs)
-    );
+    )
+    PARTITION BY REFERENCE (fk_installations_ecs_dpes);
 
 CREATE TABLE installations_solaire
-    ( no_dpe                                  CONSTRAINT fk_installations_solaire_dpes                       REFERENCES dpes ON DELETE CASCADE
+    ( no_dpe                                  CONSTRAINT nn_installations_solaire_no_dpe                     NOT NULL
+                                              CONSTRAINT fk_installations_solaire_dpes                       REFERENCES dpes ON DELETE CASCADE
     , no_installation_solaire    NUMBER(1)
     , type_installation_solaire  VARCHAR2(30) CONSTRAINT nn_installations_solaire_type_installation_solaire  NOT NULL
     , facteur_couverture_solaire NUMBER(2,1)  CONSTRAINT nn_installations_solaire_facteur_couverture_solaire NOT NULL
     
     , CONSTRAINT pk_installations_solaire PRIMARY KEY (no_dpe, no_installation_solaire)
+    )
+    PARTITION BY REFERENCE (fk_installations_solaire_dpes);
+
+CREATE TABLE descriptions_generateur
+    ( code_description_generateur NUMBER(6)     CONSTRAINT pk_descriptions_generateur                        PRIMARY KEY
+    , description_generateur      VARCHAR2(150) CONSTRAINT nn_descriptions_generateur_description_generateur NOT NULL
+                                                CONSTRAINT uq_descriptions_generateur_description_generateur UNIQUE
+    );
+
+CREATE TABLE types_energie
+    ( code_type_energie NUMBER(6)     CONSTRAINT pk_types_energie              PRIMARY KEY
+    , type_energie      VARCHAR2(100) CONSTRAINT nn_types_energie_type_energie NOT NULL
+                                      CONSTRAINT uq_types_energie_type_energie UNIQUE
+    );
+
+CREATE TABLE types_generateur
+    ( code_type_generateur NUMBER(6)     CONSTRAINT pk_types_generateur                 PRIMARY KEY
+    , type_generateur      VARCHAR2(150) CONSTRAINT nn_types_generateur_type_generateur NOT NULL
+                                         CONSTRAINT uq_types_generateur_type_generateur UNIQUE
     );
 
 CREATE TABLE generateurs
-    ( no_dpe                                     CONSTRAINT fk_generateurs_dpes                      REFERENCES dpes ON DELETE CASCADE
+    ( no_dpe                                    CONSTRAINT nn_generateurs_no_dpe                    NOT NULL
+                                                CONSTRAINT fk_generateurs_dpes                      REFERENCES dpes ON DELETE CASCADE
     , no_generateur                NUMBER(1)
     , no_installation_chauffage
     , no_installation_ecs
     , no_installation_solaire
-    , conso_chauffage              NUMBER(8,1)   CONSTRAINT nn_generateurs_conso_chauffage           NOT NULL
-    , conso_chauffage_depensier    NUMBER(8,1)   CONSTRAINT nn_generateurs_conso_chauffage_depensier NOT NULL
-    , conso_ecs                    NUMBER(8,1)   CONSTRAINT nn_generateurs_conso_ecs                 NOT NULL
-    , conso_ecs_depensier          NUMBER(8,1)   CONSTRAINT nn_generateurs_conso_ecs_depensier       NOT NULL
-    , description_generateur       VARCHAR2(150)
+    , conso_chauffage              NUMBER(8,1)  CONSTRAINT nn_generateurs_conso_chauffage           NOT NULL
+    , conso_chauffage_depensier    NUMBER(8,1)  CONSTRAINT nn_generateurs_conso_chauffage_depensier NOT NULL
+    , conso_ecs                    NUMBER(8,1)  CONSTRAINT nn_generateurs_conso_ecs                 NOT NULL
+    , conso_ecs_depensier          NUMBER(8,1)  CONSTRAINT nn_generateurs_conso_ecs_depensier       NOT NULL
+    , code_description_generateur               CONSTRAINT fk_generateurs_descriptions_generateur   REFERENCES descriptions_generateur
     , date_installation_generateur VARCHAR2(20)
-    , type_energie                 VARCHAR2(100) CONSTRAINT nn_generateurs_type_energie              NOT NULL
-    , type_generateur              VARCHAR2(150) CONSTRAINT nn_generateurs_type_generateur           NOT NULL
+    , code_type_energie                         CONSTRAINT nn_generateurs_code_type_energie         NOT NULL
+                                                CONSTRAINT fk_generateurs_types_energie             REFERENCES types_energie
+    , code_type_generateur                      CONSTRAINT nn_generateurs_code_type_generateur      NOT NULL
+                                                CONSTRAINT fk_generateurs_types_generateur          REFERENCES types_generateur
     
     , CONSTRAINT pk_generateurs                         PRIMARY KEY (no_dpe, no_generateur)
     , CONSTRAINT fk_generateurs_installations_chauffage FOREIGN KEY (no_dpe, no_installation_chauffage) REFERENCES installations_chauffage ON DELETE CASCADE
     , CONSTRAINT fk_generateurs_installations_ecs       FOREIGN KEY (no_dpe, no_installation_ecs)       REFERENCES installations_ecs       ON DELETE CASCADE
     , CONSTRAINT fk_generateurs_installations_solaire   FOREIGN KEY (no_dpe, no_installation_solaire)   REFERENCES installations_solaire   ON DELETE CASCADE
-    );
+    )
+    PARTITION BY REFERENCE (fk_generateurs_dpes);
+
+-- journaux des modifications des tables, pour que les synthèses des requêtes
+-- de query/ ne soient rafraîchies qu'avec les lignes ajoutées ou supprimées
+-- depuis leur dernier rafraîchissement
+
+CREATE MATERIALIZED VIEW LOG ON departements
+    WITH ROWID, SEQUENCE (no_departement, no_region, zone_climatique)
+    INCLUDING NEW VALUES;
+
+CREATE MATERIALIZED VIEW LOG ON communes
+    WITH ROWID, SEQUENCE (code_insee, no_departement)
+    INCLUDING NEW VALUES;
+
+CREATE MATERIALIZED VIEW LOG ON logements
+    WITH ROWID, SEQUENCE (id_logement, code_insee, type_batiment, type_installation_chauffage, classe_inertie, typologie)
+    INCLUDING NEW VALUES;
+
+CREATE MATERIALIZED VIEW LOG ON dpes
+    WITH ROWID, SEQUENCE (no_dpe, id_logement, date_etablissement, dpe_remplace, etiquette_ges, etiquette_dpe, conso_enr)
+    INCLUDING NEW VALUES;
+
+CREATE MATERIALIZED VIEW LOG ON installations_chauffage
+    WITH ROWID, SEQUENCE (no_dpe, no_installation_chauffage)
+    INCLUDING NEW VALUES;
+
+CREATE MATERIALIZED VIEW LOG ON installations_ecs
+    WITH ROWID, SEQUENCE (no_dpe, no_installation_ecs)
+    INCLUDING NEW VALUES;
+
+CREATE MATERIALIZED VIEW LOG ON installations_solaire
+    WITH ROWID, SEQUENCE (no_dpe, no_installation_solaire)
+    INCLUDING NEW VALUES;
+
+CREATE MATERIALIZED VIEW LOG ON generateurs
+    WITH ROWID, SEQUENCE (no_dpe, code_type_energie, conso_chauffage, conso_ecs)
+    INCLUDING NEW VALUES;
+
+-- synthèses lues par les requêtes de query/ : des sommes et des nombres, les
+-- moyennes, rangs et regroupements (ROLLUP, CUBE, GROUPING SETS) étant
+-- calculés par les requêtes, pour que les synthèses puissent être
+-- rafraîchies incrémentalement
+
+CREATE MATERIALIZED VIEW synthese_generateurs_energies
+    REFRESH FAST ON DEMAND
+    AS SELECT code_type_energie
+            , COUNT(*)               AS nb_generateurs
+            , SUM(conso_chauffage)   AS somme_conso_chauffage
+            , COUNT(conso_chauffage) AS nb_conso_chauffage
+            , SUM(conso_ecs)         AS somme_conso_ecs
+            , COUNT(conso_ecs)       AS nb_conso_ecs
+
+       FROM generateurs
+
+       GROUP BY code_type_energie;
+
+CREATE MATERIALIZED VIEW synthese_generateurs_typologies
+    REFRESH FAST ON DEMAND
+    AS SELECT l.typologie, l.classe_inertie
+            , COUNT(*)                 AS nb_generateurs
+            , SUM(g.conso_chauffage)   AS somme_conso_chauffage
+            , COUNT(g.conso_chauffage) AS nb_conso_chauffage
+            , SUM(g.conso_ecs)         AS somme_conso_ecs
+            , COUNT(g.conso_ecs)       AS nb_conso_ecs
+            , SUM(d.conso_enr)         AS somme_conso_enr
+            , COUNT(d.conso_enr)       AS nb_conso_enr
+
+       FROM generateurs g, dpes d, logements l
+
+       WHERE g.no_dpe      = d.no_dpe
+         AND d.id_logement = l.id_logement
+
+       GROUP BY l.typologie, l.classe_inertie;
+
+CREATE MATERIALIZED VIEW synthese_generateurs_departements
+    REFRESH FAST ON DEMAND
+    AS SELECT c.no_departement, dep.zone_climatique, g.code_type_energie
+            , COUNT(*)                               AS nb_generateurs
+            , SUM(g.conso_chauffage + g.conso_ecs)   AS somme_conso
+            , COUNT(g.conso_chauffage + g.conso_ecs) AS nb_conso
+
+       FROM generateurs g, dpes d, logements l, communes c, departements dep
+
+       WHERE g.no_dpe         = d.no_dpe
+         AND d.id_logement    = l.id_logement
+         AND l.code_insee     = c.code_insee
+         AND c.no_departement = dep.no_departement
+
+       GROUP BY c.no_departement, dep.zone_climatique, g.code_type_energie;
+
+CREATE MATERIALIZED VIEW synthese_dpes_annees
+    REFRESH FAST ON DEMAND
+    AS SELECT l.type_batiment
+            , EXTRACT(YEAR FROM d.date_etablissement) AS annee
+            , COUNT(*) AS nb_dpes
+
+       FROM dpes d, logements l
+
+       WHERE d.id_logement = l.id_logement
+
+       GROUP BY l.type_batiment, EXTRACT(YEAR FROM d.date_etablissement);
+
+CREATE MATERIALIZED VIEW synthese_dpes_etiquettes
+    REFRESH FAST ON DEMAND
+    AS SELECT dpe_remplace, etiquette_ges, etiquette_dpe
+            , COUNT(*) AS nb_dpes
+
+       FROM dpes
+
+       GROUP BY dpe_remplace, etiquette_ges, etiquette_dpe;
+
+CREATE MATERIALIZED VIEW synthese_installations_chauffage
+    REFRESH FAST ON DEMAND
+    AS SELECT no_installation_chauffage
+            , COUNT(*) AS nb_installations
+
+       FROM installations_chauffage
+
+       GROUP BY no_installation_chauffage;
+
+CREATE MATERIALIZED VIEW synthese_installations_ecs
+    REFRESH FAST ON DEMAND
+    AS SELECT no_installation_ecs
+            , COUNT(*) AS nb_installations
+
+       FROM installations_ecs
+
+       GROUP BY no_installation_ecs;
+
+CREATE MATERIALIZED VIEW synthese_installations_solaire
+    REFRESH FAST ON DEMAND
+    AS SELECT no_installation_solaire
+            , COUNT(*) AS nb_installations
+
+       FROM installations_solaire
+
+       GROUP BY no_installation_solaire;
+
+CREATE MATERIALIZED VIEW synthese_logements_zones
+    REFRESH FAST ON DEMAND
+    AS SELECT dep.zone_climatique, dep.no_region, l.type_installation_chauffage
+            , COUNT(*) AS nb_logements
+
+       FROM logements l, communes c, departements dep
+
+       WHERE l.code_insee     = c.code_insee
+         AND c.no_departement = dep.no_departement
+
+       GROUP BY dep.zone_climatique, dep.no_region, l.type_installation_chauffage;
+
+-- rafraîchit les synthèses avec les seules modifications journalisées depuis
+-- le précédent rafraîchissement, à exécuter après chaque chargement
+CREATE OR REPLACE PROCEDURE rafraichir_syntheses IS
+BEGIN
+    DBMS_MVIEW.REFRESH( list   => 'synthese_generateurs_energies, synthese_generateurs_typologies, '
+                              || 'synthese_generateurs_departements, synthese_dpes_annees, '
+                              || 'synthese_dpes_etiquettes, synthese_installations_chauffage, '
+                              || 'synthese_installations_ecs, synthese_installations_solaire, '
+                              || 'synthese_logements_zones'
+                      , method => 'FFFFFFFFF'
+                      );
+END;
+/
 
 CREATE OR REPLACE FUNCTION test_role(p_role IN VARCHAR2) RETURN NUMBER IS
     nb NUMBER;
@@ -139,40 +377,76 @@ CREATE ROLE dpe_diagnostiqueur;
 CREATE ROLE dpe_proprietaire;
 CREATE ROLE dpe_base;
 
-GRANT ALL ON departements            TO dpe_admin;
-GRANT ALL ON communes                TO dpe_admin;
-GRANT ALL ON logements               TO dpe_admin;
-GRANT ALL ON dpes                    TO dpe_admin;
-GRANT ALL ON installations_chauffage TO dpe_admin;
-GRANT ALL ON installations_ecs       TO dpe_admin;
-GRANT ALL ON installations_solaire   TO dpe_admin;
-GRANT ALL ON generateurs             TO dpe_admin;
-
-GRANT SELECT, INSERT ON departements            TO dpe_diagnostiqueur;
-GRANT SELECT, INSERT ON communes                TO dpe_diagnostiqueur;
-GRANT SELECT, INSERT ON logements               TO dpe_diagnostiqueur;
-GRANT SELECT, INSERT ON dpes                    TO dpe_diagnostiqueur;
-GRANT SELECT, INSERT ON installations_chauffage TO dpe_diagnostiqueur;
-GRANT SELECT, INSERT ON installations_ecs       TO dpe_diagnostiqueur;
-GRANT SELECT, INSERT ON installations_solaire   TO dpe_diagnostiqueur;
-GRANT SELECT, INSERT ON generateurs             TO dpe_diagnostiqueur;
-
-GRANT SELECT ON departements            TO dpe_proprietaire;
-GRANT SELECT ON communes                TO dpe_proprietaire;
-GRANT SELECT ON logements               TO dpe_proprietaire;
-GRANT SELECT ON dpes                    TO dpe_proprietaire;
-GRANT SELECT ON installations_chauffage TO dpe_proprietaire;
-GRANT SELECT ON installations_ecs       TO dpe_proprietaire;
-GRANT SELECT ON installations_solaire   TO dpe_proprietaire;
-GRANT SELECT ON generateurs             TO dpe_proprietaire;
-
-GRANT SELECT ON departements            TO dpe_base;
-GRANT SELECT ON communes                TO dpe_base;
-GRANT SELECT ON logements               TO dpe_base;
-GRANT SELECT ON dpes                    TO dpe_base;
-GRANT SELECT ON installations_chauffage TO dpe_base;
-GRANT SELECT ON installations_ecs       TO dpe_base;
-GRANT SELECT ON installations_solaire   TO dpe_base;
-GRANT SELECT ON generateurs             TO dpe_base;
+GRANT ALL ON departements                          TO dpe_admin;
+GRANT ALL ON communes                              TO dpe_admin;
+GRANT ALL ON logements                             TO dpe_admin;
+GRANT ALL ON identifiants_logements                TO dpe_admin;
+GRANT ALL ON dpes                                  TO dpe_admin;
+GRANT ALL ON configurations_installation_chauffage TO dpe_admin;
+GRANT ALL ON types_emetteur_chauffage              TO dpe_admin;
+GRANT ALL ON installations_chauffage               TO dpe_admin;
+GRANT ALL ON installations_ecs                     TO dpe_admin;
+GRANT ALL ON installations_solaire                 TO dpe_admin;
+GRANT ALL ON descriptions_generateur               TO dpe_admin;
+GRANT ALL ON types_energie                         TO dpe_admin;
+GRANT ALL ON types_generateur                      TO dpe_admin;
+GRANT ALL ON generateurs                           TO dpe_admin;
+
+GRANT SELECT, INSERT ON departements                          TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON communes                              TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON logements                             TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON identifiants_logements                TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON dpes                                  TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON configurations_installation_chauffage TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON types_emetteur_chauffage              TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON installations_chauffage               TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON installations_ecs                     TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON installations_solaire                 TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON descriptions_generateur               TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON types_energie                         TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON types_generateur                      TO dpe_diagnostiqueur;
+GRANT SELECT, INSERT ON generateurs                           TO dpe_diagnostiqueur;
+
+GRANT SELECT ON departements                          TO dpe_proprietaire;
+GRANT SELECT ON communes                              TO dpe_proprietaire;
+GRANT SELECT ON logements                             TO dpe_proprietaire;
+GRANT SELECT ON identifiants_logements                TO dpe_proprietaire;
+GRANT SELECT ON dpes                                  TO dpe_proprietaire;
+GRANT SELECT ON configurations_installation_chauffage TO dpe_proprietaire;
+GRANT SELECT ON types_emetteur_chauffage              TO dpe_proprietaire;
+GRANT SELECT ON installations_chauffage               TO dpe_proprietaire;
+GRANT SELECT ON installations_ecs                     TO dpe_proprietaire;
+GRANT SELECT ON installations_solaire                 TO dpe_proprietaire;
+GRANT SELECT ON descriptions_generateur               TO dpe_proprietaire;
+GRANT SELECT ON types_energie                         TO dpe_proprietaire;
+GRANT SELECT ON types_generateur                      TO dpe_proprietaire;
+GRANT SELECT ON generateurs                           TO dpe_proprietaire;
+
+GRANT SELECT ON departements                          TO dpe_base;
+GRANT SELECT ON communes                              TO dpe_base;
+GRANT SELECT ON logements                             TO dpe_base;
+GRANT SELECT ON identifiants_logements                TO dpe_base;
+GRANT SELECT ON dpes                                  TO dpe_base;
+GRANT SELECT ON configurations_installation_chauffage TO dpe_base;
+GRANT SELECT ON types_emetteur_chauffage              TO dpe_base;
+GRANT SELECT ON installations_chauffage               TO dpe_base;
+GRANT SELECT ON installations_ecs                     TO dpe_base;
+GRANT SELECT ON installations_solaire                 TO dpe_base;
+GRANT SELECT ON descriptions_generateur               TO dpe_base;
+GRANT SELECT ON types_energie                         TO dpe_base;
+GRANT SELECT ON types_generateur                      TO dpe_base;
+GRANT SELECT ON generateurs                           TO dpe_base;
+
+GRANT SELECT ON synthese_generateurs_energies     TO dpe_admin, dpe_diagnostiqueur, dpe_proprietaire, dpe_base;
+GRANT SELECT ON synthese_generateurs_typologies   TO dpe_admin, dpe_diagnostiqueur, dpe_proprietaire, dpe_base;
+GRANT SELECT ON synthese_generateurs_departements TO dpe_admin, dpe_diagnostiqueur, dpe_proprietaire, dpe_base;
+GRANT SELECT ON synthese_dpes_annees              TO dpe_admin, dpe_diagnostiqueur, dpe_proprietaire, dpe_base;
+GRANT SELECT ON synthese_dpes_etiquettes          TO dpe_admin, dpe_diagnostiqueur, dpe_proprietaire, dpe_base;
+GRANT SELECT ON synthese_installations_chauffage  TO dpe_admin, dpe_diagnostiqueur, dpe_proprietaire, dpe_base;
+GRANT SELECT ON synthese_installations_ecs        TO dpe_admin, dpe_diagnostiqueur, dpe_proprietaire, dpe_base;
+GRANT SELECT ON synthese_installations_solaire    TO dpe_admin, dpe_diagnostiqueur, dpe_proprietaire, dpe_base;
+GRANT SELECT ON synthese_logements_zones          TO dpe_admin, dpe_diagnostiqueur, dpe_proprietaire, dpe_base;
+
+GRANT EXECUTE ON rafraichir_syntheses TO dpe_admin, dpe_diagnostiqueur;
 
 -- GRANT  TO testuser;
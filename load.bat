@@ -1,8 +0,0 @@
-call load_one %1 departements
-call load_one %1 communes
-call load_one %1 logements
-call load_one %1 dpes
-call load_one %1 installations_chauffage
-call load_one %1 installations_ecs
-call load_one %1 installations_solaire
-call load_one %1 generateurs
\ No newline at end of file
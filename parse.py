@@ -1,14 +1,93 @@
+import abc
+import argparse
+import collections
+import contextlib
+import cProfile
 import csv
+import functools
+import glob
+import graphlib
+import gzip
+import hashlib
+import inspect
+import io
 import itertools
-import math
+import json
+import mmap
+import multiprocessing
+import multiprocessing.pool
+import operator
+import os
+import queue
 import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
 import typing
+import zipfile
+
+try:
+    import resource
+except ImportError:
+    # indisponible sous Windows
+    resource = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # optionnel, pour le format Parquet
+    pyarrow = None
+
+try:
+    import zstandard
+except ImportError:
+    # optionnel, pour les fichiers compressés au format zstd
+    zstandard = None
 
 
 fichier_src = 'dpe-v2-logements-existants.csv'
 
+# taille approximative des tranches du fichier source réparties entre processus
+TAILLE_TRANCHE = 2 ** 22
+
+# budget mémoire par défaut de chaque registre des enregistrements émis, en Mo
+BUDGET_REGISTRE = 256.
+
+# intervalle par défaut entre deux points de reprise, en secondes
+INTERVALLE_REPRISE = 300.
+
+# nombre de tranches lues en avance sur l'analyse
+TRANCHES_EN_AVANCE = 4
+
+# nombre de lignes des lots transmis aux étages d'écriture, et nombre de lots
+# en attente dans chacun
+TAILLE_LOT = 1024
+LOTS_EN_ATTENTE = 8
+
+# nombre de lignes par défaut des lots insérés dans une base de données, et
+# entre deux validations
+TAILLE_LOT_BASE = 1000
+INTERVALLE_COMMIT = 100000
+
+# nombre de lignes des groupes écrits dans les fichiers Parquet
+TAILLE_GROUPE = 2 ** 17
+
+# les formats des fichiers produits
+FORMATS = ('csv', 'parquet')
+
+# les formats de compression des fichiers CSV produits
+COMPRESSIONS = ('gz', 'zst')
+
+# les partitionnements des fichiers des tables de faits : par année
+# d'établissement du DPE, ou par département
+PARTITIONNEMENTS = ('annee', 'departement')
+
 
 Ligne = typing.Mapping[str, typing.Any]
+LigneSource = typing.Sequence[str]
 
 
 class CastError(Exception):
@@ -17,405 +96,818 @@ class CastError(Exception):
     '''
     def __init__(self, type: str, value: typing.Any, *args: object) -> None:
         super().__init__(f'Cannot cast "{value}" into {type}', *args)
+        self.type  = type
+        self.value = value
+
+    def __reduce__(self):
+        # pour être transmise entre processus
+        return (self.__class__, (self.type, self.value, *self.args[1:]))
 
 
 class GenError(Exception):
     '''
-    Une erreur de génération d'un enregistrement CSV.
+    Une erreur de génération d'un enregistrement CSV, rejetant le DPE : l'étape
+    où elle est survenue (l'enregistrement généré), le code de sa raison (la
+    colonne invalide) et la valeur en cause.
+    '''
+    def __init__(self, message: str = '', etape: typing.Optional[str] = None, code: typing.Optional[str] = None,
+                 valeur: typing.Any = None) -> None:
+        super().__init__(message)
+        self.etape  = etape
+        self.code   = code
+        self.valeur = valeur
+
+    def __reduce__(self):
+        # pour être transmise entre processus
+        return (self.__class__, (*self.args, self.etape, self.code, self.valeur))
+
+
+class _Absent:
+    '''
+    La valeur d'un champ CSV manquant ou invalide.
     '''
-    pass
+    def __repr__(self) -> str:
+        return 'ABSENT'
 
+    def __reduce__(self):
+        # unique, y compris une fois transmise entre processus
+        return 'ABSENT'
+
+ABSENT: typing.Any = _Absent()
+
+
+# Les conversions retournent ABSENT au lieu de lever une exception, les champs
+# manquants ou invalides étant le cas courant : les motifs sont compilés une
+# fois pour toutes.
+
+_motif_annee                     = re.compile('^[0-9]{4}$').match
+_motif_classe_inertie            = re.compile('^(Moyenne|(Très l|L)(égère|ourde))$').match
+_motif_code                      = re.compile('^[0-9]{5}$').match
+_motif_date                      = re.compile('^[0-9]{4}-[0-9]{2}-[0-9]{2}$').match
+_motif_etiquette                 = re.compile('^[A-G]$').match
+_motif_facteur                   = re.compile('^(1|0(\\.[0-9]+)?)$').match
+_motif_float                     = re.compile('^[0-9]+(\\.[0-9]+)?$').match
+_motif_hauteur_sous_plafond      = re.compile('^([0-9]{1,2})(?:\\.([0-9]))?$').match
+_motif_invariant_fiscal_logement = re.compile('^[0-9]{10}$').match
+_motif_no_immatriculation        = re.compile('^[A-Z]{2}[0-9]{7}$').match
+_motif_nombre                    = re.compile('^[0-9]+$').match
+_motif_surface                   = re.compile('^[0-9]{1,5}(\\.[0-9]+)?$').match
+_motif_typologie                 = re.compile('T[1-6]').match
+_motif_zone_climatique           = re.compile('H[1-3][a-d]?').match
 
 def cast_annee(x: str) -> int:
     '''
     Convertit un champ CSV en année.
     '''
-    if re.match('^[0-9]{4}$', x):
-        return int(x)
-    raise CastError('annee', x)
+    return int(x) if _motif_annee(x) else ABSENT
 
 def cast_bool(x: str) -> int:
     '''
     Convertit un champ CSV en booléen.
     '''
-    if x == '1' or x == '0':
-        return int(x)
-    raise CastError('bool', x)
+    return int(x) if x == '1' or x == '0' else ABSENT
 
 def cast_classe_inertie(x: str) -> str:
     '''
     Convertit un champ CSV en classe d'inertie.
     '''
-    if re.match('^(Moyenne|(Très l|L)(égère|ourde))$', x):
-        return x.lower()
-    raise CastError('classe_inertie', x)
+    return x.lower() if _motif_classe_inertie(x) else ABSENT
 
 def cast_code(x: str) -> int:
     '''
     Convertit un champ CSV en code INSEE ou postal.
     '''
-    if re.match('^[0-9]{5}$', x):
-        return int(x)
-    raise CastError('code', x)
+    return int(x) if _motif_code(x) else ABSENT
 
 def cast_conso(x: str) -> str:
     '''
     Convertit un champ CSV en consommation électrique (en kWh/an).
     '''
-    if re.match('^[0-9]+(\.[0-9]+)?$', x) and float(x) > 1.:
-        return x
-    raise CastError('conso', x)
+    return x if _motif_float(x) and float(x) > 1. else ABSENT
 
 def cast_date(x: str) -> str:
     '''
     Convertit un champ CSV en date, au format "AAAA-MM-JJ".
     '''
-    if re.match('^[0-9]{4}-[0-9]{2}-[0-9]{2}$', x):
-        return x
-    raise CastError('date', x)
+    return x if _motif_date(x) else ABSENT
 
 def cast_etiquette(x: str) -> str:
     '''
     Convertit un champ CSV en étiquette A à G.
     '''
-    if re.match('^[A-G]$', x):
-        return x
-    raise CastError('etiquette', x)
+    return x if _motif_etiquette(x) else ABSENT
 
 def cast_facteur(x: str) -> str:
     '''
     Convertit un champ CSV en facteur multiplicateur.
     '''
-    if re.match('^(1|0(\.[0-9]+)?)$', x):
-        return x
-    raise CastError('facteur', x)
+    return x if _motif_facteur(x) else ABSENT
 
 def cast_float(x: str) -> str:
     '''
     Convertit un champ CSV en réel positif.
     '''
-    if re.match('^[0-9]+(\.[0-9]+)?$', x):
-        return x
-    raise CastError('float', x)
+    return x if _motif_float(x) else ABSENT
 
 def cast_hauteur_sous_plafond(x: str) -> str:
     '''
     Convertit un champ CSV en hauteur de sous-plafond.
     '''
-    m = re.match('^([0-9]{1,2})(?:\.([0-9]))?$', x)
-    if m:
-        return int(m.group(1) + (m.group(2) or ''))
-    raise CastError('hauteur_sous_plafond', x)
+    m = _motif_hauteur_sous_plafond(x)
+    return int(m.group(1) + (m.group(2) or '')) if m else ABSENT
 
 def cast_invariant_fiscal_logement(x: str) -> int:
     '''
     Convertit un champ CSV en invariant fiscal de logement.
     '''
-    if re.match('^[0-9]{10}$', x) and x != '0000000000':
-        return int(x)
-    raise CastError('invariant_fiscal_logement', x)
+    return int(x) if _motif_invariant_fiscal_logement(x) and x != '0000000000' else ABSENT
 
 def cast_no_immatriculation(x: str) -> str:
     '''
     Convertit un champ CSV en numéro d'immatriculation de copropriété.
     '''
-    if re.match('^[A-Z]{2}[0-9]{7}$', x):
-        return x
-    raise CastError('no_immatriculation', x)
+    return x if _motif_no_immatriculation(x) else ABSENT
 
 def cast_nombre(x: str) -> int:
     '''
     Convertit un champ CSV en entier naturel.
     '''
-    if re.match('^[0-9]+$', x):
-        return int(x)
-    raise CastError('nombre', x)
+    return int(x) if _motif_nombre(x) else ABSENT
 
 def cast_str(x: str) -> str:
     '''
     Convertit un champ CSV en chaîne de caractères non vide.
     '''
-    if x != '':
-        return x.replace('\ufffd', 'é')
-    raise CastError('str', x)
+    return x.replace('\ufffd', 'é') if x != '' else ABSENT
 
 def cast_surface(x: str) -> str:
     '''
     Convertit un champ CSV en surface.
     '''
-    if re.match('^[0-9]{1,5}(\.[0-9]+)?$', x):
-        return x
-    raise CastError('surface', x)
+    return x if _motif_surface(x) else ABSENT
+
+_types_batiment = {
+    'maison': 'maison',
+    'appartement': 'appartement',
+    'immeuble': 'immeuble'
+}
 
 def cast_type_batiment(x: str) -> str:
     '''
     Convertit un champ CSV en type de logement.
     '''
-    if x == 'maison' or x == 'appartement' or x == 'immeuble':
-        return x
-    raise CastError('type_batiment', x)
+    return _types_batiment.get(x, ABSENT)
+
+_types_installation_general = {
+    'collectif': 'collectif',
+    'individuel': 'individuel',
+    'mixte (collectif-individuel)': 'mixte'
+}
 
 def cast_type_installation_general(x: str) -> str:
     '''
     Convertit un champ CSV en type d'installations.
     '''
-    if x == 'collectif' or x == 'individuel':
-        return x
-    if x == 'mixte (collectif-individuel)':
-        return 'mixte'
-    raise CastError('type_installation_general', x)
+    return _types_installation_general.get(x, ABSENT)
+
+_types_installation = {
+    'installation collective': 'collective',
+    'installation collective multi-bâtiment : modélisée comme un réseau de chaleur': 'collective',
+    'installation individuelle': 'individuelle',
+    'installation hybride collective-individuelle (chauffage base + appoint individuel ou convecteur bi-jonction)': 'mixte'
+}
 
 def cast_type_installation(x: str) -> str:
     '''
     Convertit un champ CSV en type d'installation.
     '''
-    if x == 'installation collective' or x == 'installation collective multi-bâtiment : modélisée comme un réseau de chaleur':
-        return 'collective'
-    if x == 'installation individuelle':
-        return 'individuelle'
-    if x == 'installation hybride collective-individuelle (chauffage base + appoint individuel ou convecteur bi-jonction)':
-        return 'mixte'
-    raise CastError('type_installation', x)
+    return _types_installation.get(x, ABSENT)
 
 def cast_typologie(x: str) -> str:
     '''
     Convertit un champ CSV en typologie de logement.
     '''
-    if re.match('T[1-6]', x):
+    if _motif_typologie(x):
         return x
-    if x == 'T7 ou plus':
-        return 'T7'
-    raise CastError('typologie', x)
+    return 'T7' if x == 'T7 ou plus' else ABSENT
 
 def cast_zone_climatique(x: str) -> str:
     '''
     Convertit un champ CSV en zone climatique.
     '''
-    if re.match('H[1-3][a-d]?', x):
-        return x
-    raise CastError('zone_climatique', x)
-
-
-departements: typing.Dict[int, Ligne] = {}
-
-def generer_departement(ligne: Ligne) -> Ligne:
-    '''
-    Extrait, ou récupère en cache, les données d'un département.
+    return x if _motif_zone_climatique(x) else ABSENT
+
+
+CONVERSIONS: typing.Dict[str, typing.Callable[[str], typing.Any]] = {
+    'annee': cast_annee,
+    'bool': cast_bool,
+    'classe_inertie': cast_classe_inertie,
+    'code': cast_code,
+    'conso': cast_conso,
+    'date': cast_date,
+    'etiquette': cast_etiquette,
+    'facteur': cast_facteur,
+    'float': cast_float,
+    'hauteur_sous_plafond': cast_hauteur_sous_plafond,
+    'invariant_fiscal_logement': cast_invariant_fiscal_logement,
+    'no_immatriculation': cast_no_immatriculation,
+    'nombre': cast_nombre,
+    'str': cast_str,
+    'surface': cast_surface,
+    'type_batiment': cast_type_batiment,
+    'type_installation_general': cast_type_installation_general,
+    'type_installation': cast_type_installation,
+    'typologie': cast_typologie,
+    'zone_climatique': cast_zone_climatique
+}
+
+
+class Colonne(typing.NamedTuple):
+    '''
+    La description d'une colonne d'un enregistrement : le champ source dont
+    elle est extraite, sa conversion, un éventuel champ de repli si le premier
+    est manquant ou invalide, et si elle est requise.
+    Une colonne optionnelle est omise si elle est manquante ou invalide, et une
+    colonne requise lève une GenError de message `requis`, ou une CastError si
+    `requis` vaut True.
+    Les champs sources peuvent dépendre des numéros d'installation et de
+    générateur, `{no_installation}` et `{no_generateur}`.
+    '''
+    nom: str
+    source: str
+    conversion: str
+    requis: typing.Union[bool, str] = False
+    repli: typing.Optional[str] = None
+
+
+# Les colonnes directement extraites du fichier source, dans l'ordre de leur
+# extraction, qui détermine l'erreur levée lorsque plusieurs sont invalides.
+# Les colonnes dont l'extraction dépend d'autres champs sont extraites par les
+# fonctions generer_*.
+SCHEMA: typing.Dict[str, typing.List[Colonne]] = {
+    'departement': [
+        Colonne('no_region'      , 'N°_région_(BAN)' , 'nombre'         , requis=True),
+        Colonne('zone_climatique', 'Zone_climatique_', 'zone_climatique', requis=True)
+    ],
+    'commune': [
+        Colonne('nom_commune', 'Nom__commune_(BAN)', 'str' , requis=True, repli='Nom__commune_(Brut)'),
+        Colonne('code_postal', 'Code_postal_(BAN)' , 'code', requis=True, repli='Code_postal_(brut)')
+    ],
+    'logement': [
+        Colonne('annee_construction'         , 'Année_construction'             , 'annee'),
+        Colonne('type_batiment'              , 'Type_bâtiment'                  , 'type_batiment'            , requis='Type de bâtiment invalide'),
+        Colonne('type_installation_chauffage', 'Type_installation_chauffage'    , 'type_installation_general'),
+        Colonne('type_instalation_ecs'       , 'Type_installation_ECS_(général)', 'type_installation_general'),
+        Colonne('hauteur_sous_plafond'       , 'Hauteur_sous-plafond'           , 'hauteur_sous_plafond'     , requis='Hauteur de sous-plafond invalide'),
+        Colonne('classe_inertie'             , 'Classe_inertie_bâtiment'        , 'classe_inertie')
+    ],
+    'dpe': [
+        Colonne('date_reception'                , 'Date_réception_DPE'             , 'date'                     , requis=True),
+        Colonne('date_etablissement'            , 'Date_établissement_DPE'         , 'date'                     , requis=True),
+        Colonne('date_visite'                   , 'Date_visite_diagnostiqueur'     , 'date'                     , requis=True),
+        Colonne('date_fin_validite'             , 'Date_fin_validité_DPE'          , 'date'                     , requis=True),
+        Colonne('version'                       , 'Version_DPE'                    , 'str'                      , requis=True),
+        Colonne('appartement_non_visite'        , 'Appartement_non_visité_(0/1)'   , 'bool'),
+        Colonne('no_immatriculation_copropriete', 'N°_immatriculation_copropriété' , 'no_immatriculation'),
+        Colonne('invariant_fiscal_logement'     , 'Invariant_fiscal_logement'      , 'invariant_fiscal_logement'),
+        Colonne('etiquette_ges'                 , 'Etiquette_GES'                  , 'etiquette'                , requis=True),
+        Colonne('etiquette_dpe'                 , 'Etiquette_DPE'                  , 'etiquette'                , requis=True)
+    ],
+    'installation_chauffage': [
+        Colonne('description_installation_chauffage'  , 'Description_installation_chauffage_n°{no_installation}'     , 'str'),
+        Colonne('type_installation_chauffage'         , 'Type_installation_chauffage_n°{no_installation}'            , 'type_installation', requis="Type d'installation de chauffage invalide"),
+        Colonne('configuration_installation_chauffage', 'Configuration_installation_chauffage_n°{no_installation}'   , 'str'              , requis=True),
+        Colonne('surface_chauffee'                    , 'Surface_chauffée_installation_chauffage_n°{no_installation}', 'surface'          , requis='Surface chauffée invalide'),
+        Colonne('type_emetteur_chauffage'             , 'Type_émetteur_installation_chauffage_n°{no_installation}'   , 'str'              , requis=True)
+    ],
+    'installation_ecs': [
+        Colonne('description_installation_ecs'  , 'Description_installation_ECS'  , 'str'),
+        Colonne('type_installation_ecs'         , 'Type_installation_ECS'         , 'type_installation', requis="Type d'installation d'ECS invalide"),
+        Colonne('configuration_installation_ecs', 'Configuration_installation_ECS', 'str'              , requis=True)
+    ],
+    'installation_solaire': [
+        Colonne('type_installation_solaire' , 'Type_installation_solaire' , 'str'    , requis="Type d'installation solaire invalide"),
+        Colonne('facteur_couverture_solaire', 'Facteur_couverture_solaire', 'facteur', requis='Facteur de couverture solaire invalide')
+    ],
+    'generateur_chauffage': [
+        Colonne('description_generateur', 'Description_générateur_chauffage_n°{no_generateur}_installation_n°{no_installation}', 'str'),
+        Colonne('type_energie'          , 'Type_énergie_générateur_n°{no_generateur}_installation_n°{no_installation}'        , 'str', requis="Type d'énergie de chauffage manquant"),
+        Colonne('type_generateur'       , 'Type_générateur_n°{no_generateur}_installation_n°{no_installation}'                , 'str', requis='Type de générateur de chauffage manquant'),
+        Colonne('usage'                 , 'Usage_générateur_n°{no_generateur}_installation_n°{no_installation}'               , 'str', requis="Type d'usage invalide")
+    ],
+    'generateur_ecs': [
+        Colonne('description_generateur'      , 'Description_générateur_ECS_n°{no_generateur}'      , 'str'),
+        Colonne('date_installation_generateur', 'Date_installation_générateur_ECS_n°{no_generateur}', 'str'),
+        Colonne('type_energie'                , 'Type_énergie_générateur_ECS_n°{no_generateur}'     , 'str', requis="Type d'énergie d'ECS manquant"),
+        Colonne('type_generateur'             , 'Type_générateur_ECS_n°{no_generateur}'             , 'str', requis="Type de générateur d'ECS manquant"),
+        Colonne('usage'                       , 'Usage_générateur_ECS_n°{no_generateur}'            , 'str', requis="Type d'usage invalide")
+    ]
+}
+
+
+Extracteur = typing.Callable[[LigneSource], typing.Any]
+
+def compiler_colonne(colonne: Colonne, etape: str, entete: 'Entete', **numeros: int) -> Extracteur:
+    '''
+    Compile la description d'une colonne d'un enregistrement en une fonction
+    extrayant sa valeur d'une ligne du fichier source, ou ABSENT si elle est
+    optionnelle.
+    '''
+    source     = entete.position(colonne.source.format(**numeros))
+    repli      = entete.position(colonne.repli.format(**numeros)) if colonne.repli else None
+    conversion = CONVERSIONS[colonne.conversion]
+    requis     = colonne.requis
+
+    if not requis and repli is None:
+        return lambda ligne: conversion(ligne[source])
+
+    def extraire(ligne: LigneSource) -> typing.Any:
+        valeur = conversion(ligne[source])
+        if valeur is ABSENT and repli is not None:
+            valeur = conversion(ligne[repli])
+        if valeur is ABSENT and requis:
+            if requis is True:
+                raise CastError(colonne.conversion, ligne[source if repli is None else repli])
+            raise GenError(requis, etape, colonne.nom, ligne[source if repli is None else repli])
+        return valeur
+
+    return extraire
+
+def compiler_schema(etape: str, entete: 'Entete', **numeros: int) -> typing.List[typing.Tuple[str, Extracteur]]:
+    '''
+    Compile les descriptions des colonnes d'un enregistrement.
+    '''
+    return [ (colonne.nom, compiler_colonne(colonne, etape, entete, **numeros)) for colonne in SCHEMA[etape] ]
+
+def extraire_colonnes(enregistrement: Ligne, colonnes: typing.List[typing.Tuple[str, Extracteur]], ligne: LigneSource) -> Ligne:
+    '''
+    Extrait les colonnes compilées d'un enregistrement d'une ligne du fichier
+    source, en omettant les colonnes optionnelles absentes.
+    '''
+    for nom, extraire in colonnes:
+        valeur = extraire(ligne)
+        if valeur is not ABSENT:
+            enregistrement[nom] = valeur
+    return enregistrement
+
+
+class Entete:
+    '''
+    L'en-tête du fichier source : les positions dans une ligne des champs
+    utilisés, y compris ceux de chaque installation et générateur, résolues une
+    fois pour toutes, et les colonnes du schéma compilées d'après celles-ci.
+
+    Seuls les champs utilisés sont conservés des lignes lues : leurs positions
+    sont celles d'une ligne projetée par `projeter`.
+    '''
+    def __init__(self, noms: typing.Sequence[str]) -> None:
+        self.noms       = list(noms)
+        self.positions  = { nom: i for i, nom in enumerate(self.noms) }
+        self.projection: typing.Dict[int, int] = {}
+
+        self.no_dpe                     = self.position('N°DPE')
+        self.no_departement             = self.position('N°_département_(BAN)')
+        self.code_insee                 = self.position('Code_INSEE_(BAN)')
+        self.identifiant_ban            = self.position('Identifiant__BAN')
+        self.adresse_brute              = self.position('Adresse_brute')
+        self.type_batiment              = self.position('Type_bâtiment')
+        self.nombre_niveau_logement     = self.position('Nombre_niveau_logement')
+        self.nombre_niveau_immeuble     = self.position('Nombre_niveau_immeuble')
+        self.surface_habitable_logement = self.position('Surface_habitable_logement')
+        self.nombre_appartement         = self.position('Nombre_appartement')
+        self.surface_habitable_immeuble = self.position('Surface_habitable_immeuble')
+        self.typologie_logement         = self.position('Typologie_logement')
+        self.no_dpe_remplace            = self.position('N°_DPE_remplacé')
+        self.type_ventilation           = self.position('Type_ventilation')
+        self.surface_ventilee           = self.position('Surface_ventilée')
+        self.production_enr             = self.position('Production_électricité_PV_(kWhep/an)')
+        self.conso_enr                  = self.position('Electricité_PV_autoconsommée')
+        self.surface_capteurs_pv        = self.position('Surface_totale_capteurs_photovoltaïque')
+        self.categorie_enr              = self.position('Catégorie_ENR')
+
+        self.conso_chauffage = {
+            (no_installation, no_generateur): (
+                self.position(f'Conso_chauffage_générateur_n°{no_generateur}_installation_n°{no_installation}'),
+                self.position(f'Conso_chauffage_dépensier_générateur_n°{no_generateur}_installation_n°{no_installation}')
+            )
+            for no_installation in range(1, 3)
+            for no_generateur in range(1, 3)
+        }
+        self.conso_ecs = {
+            no_generateur: (
+                self.position(f'Conso_é_finale_générateur_ECS_n°{no_generateur}'),
+                self.position(f'Conso_é_finale_dépensier_générateur_ECS_n°{no_generateur}')
+            )
+            for no_generateur in range(1, 3)
+        }
+
+        self.colonnes_departement          = compiler_schema('departement', self)
+        self.colonnes_commune              = compiler_schema('commune', self)
+        self.colonnes_logement             = compiler_schema('logement', self)
+        self.colonnes_dpe                  = compiler_schema('dpe', self)
+        self.colonnes_installation_ecs     = compiler_schema('installation_ecs', self)
+        self.colonnes_installation_solaire = compiler_schema('installation_solaire', self)
+        self.colonnes_installation_chauffage = {
+            no_installation: compiler_schema('installation_chauffage', self, no_installation=no_installation)
+            for no_installation in range(1, 3)
+        }
+        self.colonnes_generateur_chauffage = {
+            (no_installation, no_generateur): compiler_schema('generateur_chauffage', self, no_installation=no_installation, no_generateur=no_generateur)
+            for no_installation in range(1, 3)
+            for no_generateur in range(1, 3)
+        }
+        self.colonnes_generateur_ecs = {
+            no_generateur: compiler_schema('generateur_ecs', self, no_generateur=no_generateur)
+            for no_generateur in range(1, 3)
+        }
+
+        # les champs utilisés, dans l'ordre de la projection, les champs suivant
+        # le dernier d'entre eux n'étant pas découpés
+        self.projeter = operator.itemgetter(*self.projection)
+        self.decoupes = max(self.projection) + 1
+
+    def position(self, nom: str) -> int:
+        '''
+        Retourne la position d'un champ dans une ligne projetée du fichier
+        source, en l'ajoutant aux champs utilisés.
+        '''
+        if nom not in self.positions:
+            raise ValueError(f'Champ "{nom}" absent du fichier source')
+        return self.projection.setdefault(self.positions[nom], len(self.projection))
+
+
+# l'en-tête du fichier source en cours de traitement, indexé dans chaque processus
+entete: Entete
+
+def indexer_entete(noms: typing.Sequence[str]) -> None:
+    '''
+    Indexe l'en-tête du fichier source en cours de traitement.
+    '''
+    global entete
+    entete = Entete(noms)
+
+
+class Registre:
+    '''
+    Les clés des enregistrements déjà émis d'une table, chacune associée à
+    l'identifiant canonique de son enregistrement.
+
+    Seule une empreinte de 64 bits de chaque clé est conservée en mémoire ; au
+    delà du budget mémoire, les empreintes sont déversées dans une base SQLite,
+    où elles sont ensuite recherchées. Cette base est temporaire, sauf si le
+    registre est ouvert sur une base de travail, où les empreintes sont
+    enregistrées à chaque point de reprise.
+    '''
+    # taille approximative en mémoire d'une empreinte et de son entrée
+    TAILLE_ENTREE = 100
+
+    def __init__(self, nom: str, budget: float = BUDGET_REGISTRE, repertoire: typing.Optional[str] = None) -> None:
+        self.nom        = nom
+        self.budget     = budget
+        self.repertoire = repertoire
+
+        # les empreintes en mémoire, dont celles à enregistrer dans la base
+        self.empreintes: typing.Dict[int, typing.Any] = {}
+        self.a_valider: typing.List[int] = []
+        self.taille = 0
+
+        # la base ne contient que des empreintes aussi en mémoire tant qu'elle
+        # est complète, et n'a alors pas à être consultée
+        self.fichier: typing.Optional[str] = None
+        self.base: typing.Optional[sqlite3.Connection] = None
+        self.temporaire = True
+        self.complet    = True
+
+        # recherches de clés déjà émises, ou non
+        self.trouves = 0
+        self.manques = 0
+
+    @staticmethod
+    def empreinte(cle: typing.Union[int, str]) -> int:
+        '''
+        Calcule l'empreinte d'une clé, stable d'une exécution à l'autre : un
+        entier est sa propre empreinte.
+        '''
+        if isinstance(cle, int):
+            return cle
+        return int.from_bytes(hashlib.blake2b(cle.encode(), digest_size=8).digest(), 'big', signed=True)
+
+    def __contains__(self, cle: typing.Union[int, str]) -> bool:
+        return self.get(cle) is not None
+
+    def __enter__(self) -> 'Registre':
+        return self
+
+    def __exit__(self, *exc: typing.Any) -> None:
+        self.fermer()
+
+    def ouvrir(self, base: sqlite3.Connection) -> None:
+        '''
+        Ouvre le registre sur une base de travail, dans une table de son nom
+        dont les empreintes déjà enregistrées sont reprises.
+        '''
+        self.fermer()
+        self.base       = base
+        self.temporaire = False
+        base.execute(f'CREATE TABLE IF NOT EXISTS {self.nom} (empreinte INTEGER PRIMARY KEY, valeur)')
+        self.complet = base.execute(f'SELECT 1 FROM {self.nom} LIMIT 1').fetchone() is None
+
+    def get(self, cle: typing.Union[int, str]) -> typing.Any:
+        '''
+        Retourne l'identifiant canonique de l'enregistrement d'une clé, la clé
+        elle-même par défaut, ou None si elle n'a pas été émise.
+        '''
+        empreinte = self.empreinte(cle)
+        if empreinte in self.empreintes:
+            valeur = self.empreintes[empreinte]
+        elif not self.complet and (trouve := self.base.execute(f'SELECT valeur FROM {self.nom} WHERE empreinte = ?', (empreinte,)).fetchone()) is not None:
+            valeur = trouve[0]
+        else:
+            self.manques += 1
+            return None
+        self.trouves += 1
+        return cle if valeur is None else valeur
+
+    def ajouter(self, cle: typing.Union[int, str], valeur: typing.Any = None) -> None:
+        '''
+        Enregistre l'émission d'une clé, et l'identifiant canonique de son
+        enregistrement s'il ne s'agit pas de la clé elle-même.
+        '''
+        if valeur == cle:
+            valeur = None
+        empreinte = self.empreinte(cle)
+        self.empreintes[empreinte] = valeur
+        self.a_valider.append(empreinte)
+        self.taille += self.TAILLE_ENTREE if valeur is None else self.TAILLE_ENTREE + sys.getsizeof(valeur)
+        if self.taille > self.budget * 2 ** 20:
+            self.deverser()
+
+    def valider(self) -> None:
+        '''
+        Enregistre dans la base les empreintes ajoutées depuis le dernier
+        enregistrement, en les gardant en mémoire. La transaction en cours
+        n'est validée que pour une base temporaire.
+        '''
+        if not self.a_valider:
+            return
+        if self.base is None:
+            descripteur, self.fichier = tempfile.mkstemp(suffix='.sqlite', prefix=f'registre-{self.nom}-', dir=self.repertoire)
+            os.close(descripteur)
+            self.base = sqlite3.connect(self.fichier)
+            self.base.execute('PRAGMA journal_mode = OFF')
+            self.base.execute('PRAGMA synchronous = OFF')
+            self.base.execute(f'CREATE TABLE {self.nom} (empreinte INTEGER PRIMARY KEY, valeur)')
+
+        self.base.executemany(f'INSERT OR REPLACE INTO {self.nom} VALUES (?, ?)',
+                              ( (empreinte, self.empreintes[empreinte]) for empreinte in self.a_valider ))
+        if self.temporaire:
+            self.base.commit()
+        self.a_valider.clear()
+
+    def deverser(self) -> None:
+        '''
+        Déverse les empreintes en mémoire dans la base, créée au premier
+        déversement si elle est temporaire.
+        '''
+        self.valider()
+        self.empreintes.clear()
+        self.taille  = 0
+        self.complet = False
+
+    def fermer(self) -> None:
+        '''
+        Abandonne les empreintes en mémoire, et ferme et supprime la base si
+        elle est temporaire.
+        '''
+        if self.base is not None and self.temporaire:
+            self.base.close()
+            os.remove(self.fichier)
+        self.base       = None
+        self.temporaire = True
+        self.complet    = True
+        self.empreintes.clear()
+        self.a_valider.clear()
+        self.taille = 0
+
+
+class Numerotation(Registre):
+    '''
+    Un registre dont les enregistrements sont numérotés dans l'ordre de leur
+    émission à partir de 1, l'identifiant canonique de chaque clé étant son
+    numéro : la numérotation se poursuit à partir du plus grand numéro
+    enregistré dans la base de travail.
+    '''
+    def __init__(self, nom: str, budget: float = BUDGET_REGISTRE, repertoire: typing.Optional[str] = None) -> None:
+        super().__init__(nom, budget, repertoire)
+        # le numéro du prochain enregistrement émis
+        self.suivant = 1
+
+    def ouvrir(self, base: sqlite3.Connection) -> None:
+        super().ouvrir(base)
+        self.suivant = (base.execute(f'SELECT MAX(valeur) FROM {self.nom}').fetchone()[0] or 0) + 1
+
+    def ajouter(self, cle: typing.Union[int, str], valeur: typing.Any = None) -> None:
+        super().ajouter(cle, valeur)
+        self.suivant = max(self.suivant, valeur + 1)
+
+    def fermer(self) -> None:
+        super().fermer()
+        self.suivant = 1
+
+
+class Dictionnaire(Numerotation):
+    '''
+    Les valeurs distinctes d'une colonne de chaînes de caractères répétées,
+    numérotées dans l'ordre de leur première émission : les lignes produites
+    portent le numéro de leur valeur, écrite une seule fois dans une table de
+    correspondance. Ces valeurs étant peu nombreuses, leurs numéros sont aussi
+    gardés en mémoire, sans calcul d'empreinte.
+    '''
+    def __init__(self, nom: str, colonne: str) -> None:
+        super().__init__(nom)
+        self.colonne = colonne
+        self.codes: typing.Dict[str, int] = {}
+
+    def coder(self, valeur: typing.Optional[str]) -> typing.Tuple[typing.Optional[int], bool]:
+        '''
+        Retourne le numéro d'une valeur, et si elle est émise pour la première
+        fois.
+        '''
+        if valeur is None:
+            return None, False
+        code = self.codes.get(valeur)
+        if code is not None:
+            return code, False
+
+        code     = self.get(valeur)
+        nouvelle = code is None
+        if nouvelle:
+            code = self.suivant
+            self.ajouter(valeur, code)
+        self.codes[valeur] = code
+        return code, nouvelle
+
+    def fermer(self) -> None:
+        super().fermer()
+        self.codes.clear()
+
+
+departements = Registre('departements')
+
+def cle_departement(ligne: LigneSource) -> int:
+    '''
+    Extrait le numéro d'un département, sous lequel il est enregistré.
+    '''
+    no_departement = cast_nombre(ligne[entete.no_departement])
+    if no_departement is ABSENT:
+        raise GenError("Numéro de département invalide", 'departement', 'no_departement', ligne[entete.no_departement])
+    return no_departement
+
+def generer_departement(ligne: LigneSource, no_departement: int) -> Ligne:
+    '''
+    Extrait les données d'un département.
     '''
-    try:
-        no_departement = cast_nombre(ligne['N°_département_(BAN)'])
-        if no_departement in departements:
-            return departements[no_departement]
-    except CastError:
-        raise GenError("Numéro de département invalide")
-
     departement: Ligne = { 'no_departement': no_departement }
 
-    departement['no_region'] = cast_nombre(ligne['N°_région_(BAN)'])
-
-    departement['zone_climatique'] = cast_zone_climatique(ligne['Zone_climatique_'])
+    return extraire_colonnes(departement, entete.colonnes_departement, ligne)
 
-    return departement
 
+communes = Registre('communes')
 
-communes: typing.Dict[int, Ligne] = {}
-
-def generer_commune(ligne: Ligne, departement: Ligne) -> Ligne:
+def cle_commune(ligne: LigneSource) -> int:
     '''
-    Extrait, ou récupère en cache, les données d'une commune.
+    Extrait le code INSEE d'une commune, sous lequel elle est enregistrée.
     '''
-    try:
-        code_insee = cast_code(ligne['Code_INSEE_(BAN)'])
-        if code_insee in communes:
-            return communes[code_insee]
-    except CastError:
-        raise GenError("Code INSEE invalide")
+    code_insee = cast_code(ligne[entete.code_insee])
+    if code_insee is ABSENT:
+        raise GenError("Code INSEE invalide", 'commune', 'code_insee', ligne[entete.code_insee])
+    return code_insee
 
+def generer_commune(ligne: LigneSource, code_insee: int, no_departement: int) -> Ligne:
+    '''
+    Extrait les données d'une commune.
+    '''
     commune: Ligne = {
         'code_insee': code_insee,
-        'no_departement': departement['no_departement']
+        'no_departement': no_departement
     }
 
-    try:
-        commune['nom_commune'] = cast_str(ligne['Nom__commune_(BAN)'])
-    except CastError:
-        commune['nom_commune'] = cast_str(ligne['Nom__commune_(Brut)'])
+    return extraire_colonnes(commune, entete.colonnes_commune, ligne)
 
-    try:
-        commune['code_postal'] = cast_code(ligne['Code_postal_(BAN)'])
-    except CastError:
-        commune['code_postal'] = cast_code(ligne['Code_postal_(brut)'])
 
-    return commune
+# les logements sont numérotés, leur identifiant BAN ou leur adresse brute
+# n'étant écrit que dans la table identifiants_logements
+logements = Numerotation('logements')
 
+def cle_logement(ligne: LigneSource) -> typing.Tuple[typing.Optional[str], typing.Optional[str]]:
+    '''
+    Extrait l'identifiant BAN d'un logement ou, à défaut, son adresse brute.
+    '''
+    id_ban = cast_str(ligne[entete.identifiant_ban])
+    if id_ban is not ABSENT:
+        return id_ban, None
+
+    adresse_brute = cast_str(ligne[entete.adresse_brute])
+    if adresse_brute is not ABSENT:
+        return None, adresse_brute
 
-logements: typing.Dict[str, Ligne] = {}
-logements_par_id_ban: typing.Dict[str, str] = {}
-logements_par_adresse_brute: typing.Dict[str, str] = {}
+    raise GenError("Pas d'adresse", 'logement', 'adresse', ligne[entete.adresse_brute])
+
+def normaliser_cle_logement(id_ban: typing.Optional[str], adresse_brute: typing.Optional[str]) -> str:
+    '''
+    Normalise la clé d'un logement dans le registre des logements émis :
+    l'identifiant BAN ou, à défaut, l'adresse brute, sans distinction de casse
+    ni d'espaces superflus.
+    '''
+    return ' '.join((id_ban or adresse_brute).split()).casefold()
 
-def generer_logement(ligne: Ligne, commune: Ligne) -> Ligne:
+def generer_logement(ligne: LigneSource, id_logement: typing.Optional[int], code_insee: int) -> Ligne:
     '''
-    Extrait, ou récupère en cache, les données d'un logement.
+    Extrait les données d'un logement.
     ATTENTION : les appartements d'un même immeuble ne sont pas distingués, et
                 ne semblent pas pouvoir clairement l'être avec les données mises
                 à disposition.
     '''
-    try:
-        id_ban = cast_str(ligne['Identifiant__BAN'])
-        if id_ban in logements_par_id_ban:
-            print('\tEXISTE')
-            return logements[logements_par_id_ban[id_ban]]
-    except CastError:
-        try:
-            id_ban = None
-            adresse_brute = cast_str(ligne['Adresse_brute'])
-            if adresse_brute in logements_par_adresse_brute:
-                print('\tEXISTE (brut)')
-                return logements[logements_par_adresse_brute[adresse_brute]]
-        except CastError:
-            raise GenError("Pas d'adresse")
-
     logement: Ligne = {
-        'id_logement': id_ban or adresse_brute,
-        'code_insee': commune['code_insee']
+        'id_logement': id_logement,
+        'code_insee': code_insee
     }
 
-    try:
-        logement['annee_construction'] = cast_annee(ligne['Année_construction'])
-    except CastError:
-        pass
-
-    try:
-        type_batiment =\
-        logement['type_batiment'] = cast_type_batiment(ligne['Type_bâtiment'])
-    except CastError:
-        raise GenError("Type de bâtiment invalide")
-
-    try:
-        logement['type_installation_chauffage'] = cast_type_installation_general(ligne['Type_installation_chauffage'])
-    except CastError:
-        pass
-
-    try:
-        logement['type_instalation_ecs'] = cast_type_installation_general(ligne['Type_installation_ECS_(général)'])
-    except CastError:
-        pass
-
-    try:
-        logement['hauteur_sous_plafond'] = cast_hauteur_sous_plafond(ligne['Hauteur_sous-plafond'])
-    except CastError:
-        raise GenError('Hauteur de sous-plafond invalide')
+    extraire_colonnes(logement, entete.colonnes_logement, ligne)
+    type_batiment = logement['type_batiment']
 
     if type_batiment == 'appartement':
-        try:
-            nb_niveau = cast_nombre(ligne['Nombre_niveau_logement'])
-            if nb_niveau < 1000:
-                # nos remerciements à la copropriété des Valladiers pour obliger à cette vérification ridicule.
-                logement['nb_niveau'] = nb_niveau
-        except CastError:
-            try:
-                # niveau 1 si l'immeuble n'a qu'un niveau
-                if cast_nombre(ligne['Nombre_niveau_immeuble']) == 1:
-                    logement['nb_niveau'] = 1
-            except CastError:
-                pass
-
-    try:
-        logement['surface_habitable'] = cast_surface(ligne['Surface_habitable_logement'])
-    except CastError:
-        try:
-            # s'il n'y a qu'un appartement, sa surface est celle de l'immeuble
-            if cast_nombre(ligne['Nombre_appartement']) == 1:
-                logement['surface_habitable'] = cast_surface(ligne['Surface_habitable_immeuble'])
-        except CastError:
-            raise GenError('Surface habitable invalide')
-
-    try:
-        logement['classe_inertie'] = cast_classe_inertie(ligne['Classe_inertie_bâtiment'])
-    except CastError:
-        pass
+        nb_niveau = cast_nombre(ligne[entete.nombre_niveau_logement])
+        if nb_niveau is ABSENT:
+            # niveau 1 si l'immeuble n'a qu'un niveau
+            if cast_nombre(ligne[entete.nombre_niveau_immeuble]) == 1:
+                logement['nb_niveau'] = 1
+        elif nb_niveau < 1000:
+            # nos remerciements à la copropriété des Valladiers pour obliger à cette vérification ridicule.
+            logement['nb_niveau'] = nb_niveau
+
+    surface_habitable = cast_surface(ligne[entete.surface_habitable_logement])
+    if surface_habitable is ABSENT:
+        # s'il n'y a qu'un appartement, sa surface est celle de l'immeuble
+        nb_appartement = cast_nombre(ligne[entete.nombre_appartement])
+        if nb_appartement == 1:
+            surface_habitable = cast_surface(ligne[entete.surface_habitable_immeuble])
+        if nb_appartement is ABSENT or nb_appartement == 1 and surface_habitable is ABSENT:
+            raise GenError('Surface habitable invalide', 'logement', 'surface_habitable', ligne[entete.surface_habitable_logement])
+    if surface_habitable is not ABSENT:
+        logement['surface_habitable'] = surface_habitable
 
     if type_batiment == 'appartement':
-        try:
-            logement['typologie'] = cast_typologie(ligne['Typologie_logement'])
-        except CastError:
-            pass
+        typologie = cast_typologie(ligne[entete.typologie_logement])
+        if typologie is not ABSENT:
+            logement['typologie'] = typologie
 
     return logement
 
 
-def generer_dpe(ligne: Ligne, no_dpe: str, logement: Ligne) -> Ligne:
+# les DPE émis, et ceux rejetés ou ignorés (immeubles), associés à l'empreinte
+# de leur ligne, et les numéros des DPE remplacés, conservés d'une exécution à
+# l'autre en mode incrémental
+dpes           = Registre('dpes')
+dpes_ecartes   = Registre('dpes_ecartes')
+dpes_remplaces = Registre('dpes_remplaces')
+
+def generer_dpe(ligne: LigneSource, no_dpe: str, id_logement: typing.Optional[int]) -> Ligne:
     '''
     Extrait les données d'un DPE.
     '''
     dpe: Ligne = { 'no_dpe': no_dpe }
 
-    dpe['id_logement'] = logement['id_logement']
+    dpe['id_logement'] = id_logement
 
-    dpe['date_reception']     = cast_date(ligne['Date_réception_DPE'])
-    dpe['date_etablissement'] = cast_date(ligne['Date_établissement_DPE'])
-    dpe['date_visite']        = cast_date(ligne['Date_visite_diagnostiqueur'])
+    extraire_colonnes(dpe, entete.colonnes_dpe, ligne)
 
-    try:
-        cast_str(ligne['N°_DPE_remplacé'])
-        dpe['dpe_remplace'] = 1
-    except CastError:
-        dpe['dpe_remplace'] = 0
-        pass
-
-    dpe['date_fin_validite'] = cast_date(ligne['Date_fin_validité_DPE'])
+    dpe['dpe_remplace'] = 0 if cast_str(ligne[entete.no_dpe_remplace]) is ABSENT else 1
 
-    dpe['version'] = cast_str(ligne['Version_DPE'])
-
-    try:
-        dpe['appartement_non_visite'] = cast_bool(ligne['Appartement_non_visité_(0/1)'])
-    except CastError:
-        pass
-
-    try:
-        dpe['no_immatriculation_copropriete'] = cast_no_immatriculation(ligne['N°_immatriculation_copropriété'])
-    except CastError:
-        pass
-
-    try:
-        dpe['invariant_fiscal_logement'] = cast_invariant_fiscal_logement(ligne['Invariant_fiscal_logement'])
-    except CastError:
-        pass
-
-    dpe['etiquette_ges'] = cast_etiquette(ligne['Etiquette_GES'])
-    dpe['etiquette_dpe'] = cast_etiquette(ligne['Etiquette_DPE'])
-
-    try:
-        type_ventilation = cast_str(ligne['Type_ventilation'])
-        surface_ventilee = cast_surface(ligne['Surface_ventilée'])
+    type_ventilation = cast_str(ligne[entete.type_ventilation])
+    surface_ventilee = cast_surface(ligne[entete.surface_ventilee])
+    if type_ventilation is not ABSENT and surface_ventilee is not ABSENT:
         dpe['type_ventilation'] = type_ventilation
         dpe['surface_ventilee'] = surface_ventilee
-    except CastError:
-        pass
 
-    try:
-        dpe['production_enr'] = cast_conso(ligne['Production_électricité_PV_(kWhep/an)'])
+    production_enr = cast_conso(ligne[entete.production_enr])
+    if production_enr is not ABSENT:
+        dpe['production_enr'] = production_enr
 
-        try:
-            dpe['conso_enr'] = cast_conso(ligne['Electricité_PV_autoconsommée'])
-        except CastError:
-            dpe['conso_enr'] = 0
+        conso_enr = cast_conso(ligne[entete.conso_enr])
+        dpe['conso_enr'] = 0 if conso_enr is ABSENT else conso_enr
 
-        try:
-            dpe['surface_capteurs_pv'] = cast_conso(ligne['Surface_totale_capteurs_photovoltaïque'])
-        except CastError:
-            dpe['surface_capteurs_pv'] = 0
+        surface_capteurs_pv = cast_conso(ligne[entete.surface_capteurs_pv])
+        dpe['surface_capteurs_pv'] = 0 if surface_capteurs_pv is ABSENT else surface_capteurs_pv
 
-        type_enr = cast_str(ligne['Catégorie_ENR'])
-        if type_enr != 'Il existe plusieurs descriptifs ENR':
+        type_enr = cast_str(ligne[entete.categorie_enr])
+        if type_enr is not ABSENT and type_enr != 'Il existe plusieurs descriptifs ENR':
             dpe['type_enr'] = type_enr
-    except CastError:
-        pass
 
     return dpe
 
 
-def generer_installation_chauffage(ligne: Ligne, dpe: Ligne, no_installation: int) -> Ligne:
+def generer_installation_chauffage(ligne: LigneSource, dpe: Ligne, no_installation: int) -> Ligne:
     '''
     Extrait les données d'une installation de chauffage.
     '''
@@ -424,29 +916,10 @@ def generer_installation_chauffage(ligne: Ligne, dpe: Ligne, no_installation: in
         'no_installation_chauffage': no_installation
     }
 
-    try:
-        installation['description_installation_chauffage'] = cast_str(ligne[f'Description_installation_chauffage_n°{no_installation}'])
-    except CastError:
-        pass
-
-    try:
-        installation['type_installation_chauffage'] = cast_type_installation(ligne[f'Type_installation_chauffage_n°{no_installation}'])
-    except CastError:
-        raise GenError("Type d'installation de chauffage invalide")
-
-    installation['configuration_installation_chauffage'] = cast_str(ligne[f'Configuration_installation_chauffage_n°{no_installation}'])
-
-    try:
-        installation['surface_chauffee'] = cast_surface(ligne[f'Surface_chauffée_installation_chauffage_n°{no_installation}'])
-    except CastError:
-        raise GenError("Surface chauffée invalide")
+    return extraire_colonnes(installation, entete.colonnes_installation_chauffage[no_installation], ligne)
 
-    installation['type_emetteur_chauffage'] = cast_str(ligne[f'Type_émetteur_installation_chauffage_n°{no_installation}'])
 
-    return installation
-
-
-def generer_installation_ecs(ligne: Ligne, dpe: Ligne) -> Ligne:
+def generer_installation_ecs(ligne: LigneSource, dpe: Ligne) -> Ligne:
     '''
     Extrait les données d'une installation d'ECS.
     '''
@@ -455,22 +928,10 @@ def generer_installation_ecs(ligne: Ligne, dpe: Ligne) -> Ligne:
         'no_installation_ecs': 1
     }
 
-    try:
-        installation['description_installation_ecs'] = cast_str(ligne['Description_installation_ECS'])
-    except CastError:
-        pass
+    return extraire_colonnes(installation, entete.colonnes_installation_ecs, ligne)
 
-    try:
-        installation['type_installation_ecs'] = cast_type_installation(ligne['Type_installation_ECS'])
-    except CastError:
-        raise GenError("Type d'installation d'ECS invalide")
 
-    installation['configuration_installation_ecs'] = cast_str(ligne['Configuration_installation_ECS'])
-
-    return installation
-
-
-def generer_installation_solaire(ligne: Ligne, dpe: Ligne) -> Ligne:
+def generer_installation_solaire(ligne: LigneSource, dpe: Ligne) -> Ligne:
     '''
     Extrait les données d'une installation solaire, pour ECS.
     '''
@@ -479,70 +940,42 @@ def generer_installation_solaire(ligne: Ligne, dpe: Ligne) -> Ligne:
         'no_installation_solaire': 1
     }
 
-    try:
-        installation['type_installation_solaire'] = cast_str(ligne['Type_installation_solaire'])
-    except CastError:
-        raise GenError("Type d'installation solaire invalide")
-
-    try:
-        installation['facteur_couverture_solaire'] = cast_facteur(ligne['Facteur_couverture_solaire'])
-    except CastError:
-        raise GenError('Facteur de couverture solaire invalide')
-
-    return installation
+    return extraire_colonnes(installation, entete.colonnes_installation_solaire, ligne)
 
 
-def generer_generateur_chauffage(ligne: Ligne, installation_chauffage: Ligne, no_generateur: int) -> Ligne:
+def generer_generateur_chauffage(ligne: LigneSource, installation_chauffage: Ligne, no_generateur: int) -> Ligne:
     '''
     Extrait les données de chauffage d'un générateur.
     '''
     no_installation = installation_chauffage['no_installation_chauffage']
     generateur: Ligne = {
-        'no_dpe': dpe['no_dpe'],
+        'no_dpe': installation_chauffage['no_dpe'],
         'no_generateur': 2 * no_installation - no_generateur,
         'no_installation_chauffage': no_installation
     }
 
-    try:
-        generateur['conso_chauffage']           = cast_conso(ligne[f'Conso_chauffage_générateur_n°{no_generateur}_installation_n°{no_installation}'])
-        generateur['conso_chauffage_depensier'] = cast_conso(ligne[f'Conso_chauffage_dépensier_générateur_n°{no_generateur}_installation_n°{no_installation}'])
-    except CastError:
-        generateur['conso_chauffage']           = 0
-        generateur['conso_chauffage_depensier'] = 0
+    position, position_depensier = entete.conso_chauffage[no_installation, no_generateur]
+    conso_chauffage           = cast_conso(ligne[position])
+    conso_chauffage_depensier = cast_conso(ligne[position_depensier])
+    if conso_chauffage is ABSENT or conso_chauffage_depensier is ABSENT:
+        conso_chauffage           = 0
+        conso_chauffage_depensier = 0
+    generateur['conso_chauffage']           = conso_chauffage
+    generateur['conso_chauffage_depensier'] = conso_chauffage_depensier
 
     generateur['conso_ecs']           = 0
     generateur['conso_ecs_depensier'] = 0
 
-    try:
-        generateur['description_generateur'] = cast_str(ligne[f'Description_générateur_chauffage_n°{no_generateur}_installation_n°{no_installation}'])
-    except CastError:
-        pass
-
-    try:
-        generateur['type_energie'] = cast_str(ligne[f'Type_énergie_générateur_n°{no_generateur}_installation_n°{no_installation}'])
-    except CastError:
-        raise GenError("Type d'énergie de chauffage manquant")
-
-    try:
-        generateur['type_generateur'] = cast_str(ligne[f'Type_générateur_n°{no_generateur}_installation_n°{no_installation}'])
-    except CastError:
-        raise GenError('Type de générateur de chauffage manquant')
-
-    try:
-        generateur['usage'] = cast_str(ligne[f"Usage_générateur_n°{no_generateur}_installation_n°{no_installation}"])
-    except CastError:
-        raise GenError("Type d'usage invalide")
-
-    return generateur
+    return extraire_colonnes(generateur, entete.colonnes_generateur_chauffage[no_installation, no_generateur], ligne)
 
 
-def generer_generateur_ecs(ligne: Ligne, installation_ecs: Ligne, no_generateur: int) -> Ligne:
+def generer_generateur_ecs(ligne: LigneSource, installation_ecs: Ligne, no_generateur: int) -> Ligne:
     '''
     Extrait les données d'ECS d'un générateur.
     '''
     no_installation = installation_ecs['no_installation_ecs']
     generateur: Ligne = {
-        'no_dpe': dpe['no_dpe'],
+        'no_dpe': installation_ecs['no_dpe'],
         'no_generateur': 3 + no_generateur,
         'no_installation_ecs': no_installation
     }
@@ -550,39 +983,16 @@ def generer_generateur_ecs(ligne: Ligne, installation_ecs: Ligne, no_generateur:
     generateur['conso_chauffage']           = 0
     generateur['conso_chauffage_depensier'] = 0
 
-    try:
-        generateur['conso_ecs']           = cast_conso(ligne[f'Conso_é_finale_générateur_ECS_n°{no_generateur}'])
-        generateur['conso_ecs_depensier'] = cast_conso(ligne[f'Conso_é_finale_dépensier_générateur_ECS_n°{no_generateur}'])
-    except CastError:
-        generateur['conso_ecs']           = 0
-        generateur['conso_ecs_depensier'] = 0
-
-    try:
-        generateur['description_generateur'] = cast_str(ligne[f'Description_générateur_ECS_n°{no_generateur}'])
-    except CastError:
-        pass
-
-    try:
-        generateur['date_installation_generateur'] = cast_str(ligne[f'Date_installation_générateur_ECS_n°{no_generateur}'])
-    except CastError:
-        pass
+    position, position_depensier = entete.conso_ecs[no_generateur]
+    conso_ecs           = cast_conso(ligne[position])
+    conso_ecs_depensier = cast_conso(ligne[position_depensier])
+    if conso_ecs is ABSENT or conso_ecs_depensier is ABSENT:
+        conso_ecs           = 0
+        conso_ecs_depensier = 0
+    generateur['conso_ecs']           = conso_ecs
+    generateur['conso_ecs_depensier'] = conso_ecs_depensier
 
-    try:
-        generateur['type_energie'] = cast_str(ligne[f'Type_énergie_générateur_ECS_n°{no_generateur}'])
-    except CastError:
-        raise GenError("Type d'énergie d'ECS manquant")
-
-    try:
-        generateur['type_generateur'] = cast_str(ligne[f'Type_générateur_ECS_n°{no_generateur}'])
-    except CastError:
-        raise GenError("Type de générateur d'ECS manquant")
-
-    try:
-        generateur['usage'] = cast_str(ligne[f"Usage_générateur_ECS_n°{no_generateur}"])
-    except CastError:
-        raise GenError("Type d'usage invalide")
-
-    return generateur
+    return extraire_colonnes(generateur, entete.colonnes_generateur_ecs[no_generateur], ligne)
 
 
 def combiner_generateurs(generateurs_chauffage: list[Ligne], generateurs_ecs: list[Ligne]) -> list[Ligne]:
@@ -626,42 +1036,649 @@ def combiner_generateurs(generateurs_chauffage: list[Ligne], generateurs_ecs: li
     return generateurs
 
 
-with open(fichier_src, 'rb') as f:
-    def _make_gen(reader):
+class Diagnostic(typing.NamedTuple):
+    '''
+    Les enregistrements propres à un DPE : le DPE lui-même, ses installations
+    et ses générateurs.
+    '''
+    dpe: Ligne
+    installations_chauffage: list[Ligne]
+    installations_ecs: list[Ligne]
+    installation_solaire: typing.Optional[Ligne]
+    generateurs: list[Ligne]
+    no_dpe_remplace: typing.Optional[str] = None
+
+
+def generer_diagnostic(ligne: LigneSource, no_dpe: str, id_logement: typing.Optional[int]) -> Diagnostic:
+    '''
+    Extrait les données d'un DPE, de ses installations et de ses générateurs.
+    '''
+    dpe = generer_dpe(ligne, no_dpe, id_logement)
+
+    installations_chauffage = []
+    generateurs_chauffage   = []
+    for no_installation in range(1, 3):
+        try:
+            installation_chauffage = generer_installation_chauffage(ligne, dpe, no_installation)
+
+            generateurs_installation_chauffage = []
+            for no_generateur in range(1, 3):
+                try:
+                    generateurs_installation_chauffage.append(generer_generateur_chauffage(ligne, installation_chauffage, no_generateur))
+                except GenError:
+                    pass
+            if not generateurs_installation_chauffage:
+                raise GenError()
+
+            installations_chauffage.append(installation_chauffage)
+            generateurs_chauffage += generateurs_installation_chauffage
+        except GenError:
+            pass
+
+    installations_ecs = []
+    generateurs_ecs   = []
+    try:
+        installation_ecs = generer_installation_ecs(ligne, dpe)
+
+        generateurs_installation_ecs = []
+        for no_generateur in range(1, 3):
+            try:
+                generateurs_installation_ecs.append(generer_generateur_ecs(ligne, installation_ecs, no_generateur))
+            except GenError:
+                pass
+        if not generateurs_installation_ecs:
+            raise GenError()
+
+        installations_ecs.append(installation_ecs)
+        generateurs_ecs += generateurs_installation_ecs
+    except GenError:
+        pass
+
+    try:
+        installation_solaire = generer_installation_solaire(ligne, dpe)
+        for generateur_ecs in generateurs_ecs:
+            generateur_ecs['no_installation_solaire'] = 1
+    except GenError:
+        installation_solaire = None
+        pass
+
+    generateurs = combiner_generateurs(generateurs_chauffage, generateurs_ecs)
+
+    if not generateurs:
+        raise GenError("Installations et générateurs invalides", 'generateur', 'aucun_generateur')
+
+    no_dpe_remplace = cast_str(ligne[entete.no_dpe_remplace])
+
+    return Diagnostic(dpe, installations_chauffage, installations_ecs, installation_solaire, generateurs,
+                      None if no_dpe_remplace is ABSENT else no_dpe_remplace)
+
+
+Resultat = typing.Union[typing.Any, Exception]
+
+
+def _tenter(fonction: typing.Callable[..., typing.Any], *args: typing.Any) -> Resultat:
+    '''
+    Appelle une fonction, et retourne l'exception levée au lieu de la propager.
+    '''
+    try:
+        return fonction(*args)
+    except Exception as e:
+        return e
+
+def _valeur(resultat: Resultat) -> typing.Any:
+    '''
+    Retourne la valeur d'un résultat, ou lève l'exception qu'il contient.
+    '''
+    if isinstance(resultat, Exception):
+        raise resultat
+    return resultat
+
+
+class Analyse(typing.NamedTuple):
+    '''
+    L'analyse d'une ligne du fichier source, indépendante des lignes déjà
+    traitées : chaque champ contient une clé ou un enregistrement candidat, ou
+    l'exception levée lors de son extraction.
+    Les champs suivant une clé invalide ne sont pas analysés, et le diagnostic
+    peut être différé, auquel cas la ligne est conservée pour l'extraire lors de
+    la résolution.
+    L'empreinte des champs utilisés de la ligne n'est calculée que pour le mode
+    incrémental, afin de reconnaître les DPE inchangés.
+    Une ligne d'immeuble est signalée dès l'analyse, pour être ignorée même si
+    son logement a déjà été émis.
+    '''
+    no_dpe: Resultat
+    no_departement: Resultat = None
+    departement: Resultat = None
+    code_insee: Resultat = None
+    commune: Resultat = None
+    cle_logement: Resultat = None
+    logement: Resultat = None
+    diagnostic: Resultat = None
+    ligne: typing.Optional[LigneSource] = None
+    empreinte: typing.Optional[int] = None
+    immeuble: bool = False
+
+
+def empreinte_ligne(ligne: LigneSource) -> int:
+    '''
+    Calcule l'empreinte des champs utilisés d'une ligne du fichier source.
+    '''
+    return Registre.empreinte('\x1f'.join(ligne))
+
+
+def analyser_ligne(ligne: LigneSource, differer: bool = False, empreinter: bool = False) -> Analyse:
+    '''
+    Analyse une ligne du fichier source, sans consulter ni modifier les
+    registres. Cette étape peut ainsi être répartie entre plusieurs processus.
+    Si `differer`, seules les clés sont extraites : les enregistrements non
+    encore émis le seront lors de la résolution.
+    Si `empreinter`, l'empreinte de la ligne est calculée.
+    '''
+    no_dpe = cast_str(ligne[entete.no_dpe])
+    if no_dpe is ABSENT:
+        return Analyse(CastError('str', ligne[entete.no_dpe]))
+
+    immeuble = cast_type_batiment(ligne[entete.type_batiment]) == 'immeuble'
+
+    if differer:
+        return Analyse(no_dpe,
+                       no_departement = _tenter(cle_departement, ligne),
+                       code_insee     = _tenter(cle_commune, ligne),
+                       cle_logement   = _tenter(cle_logement, ligne),
+                       ligne          = ligne,
+                       empreinte      = empreinte_ligne(ligne) if empreinter else None,
+                       immeuble       = immeuble)
+
+    no_departement = _tenter(cle_departement, ligne)
+    if isinstance(no_departement, Exception):
+        return Analyse(no_dpe, no_departement)
+    departement = _tenter(generer_departement, ligne, no_departement)
+
+    code_insee = _tenter(cle_commune, ligne)
+    if isinstance(code_insee, Exception):
+        return Analyse(no_dpe, no_departement, departement, code_insee)
+    commune = _tenter(generer_commune, ligne, code_insee, no_departement)
+
+    cle = _tenter(cle_logement, ligne)
+    if isinstance(cle, Exception):
+        return Analyse(no_dpe, no_departement, departement, code_insee, commune, cle)
+    # le numéro du logement n'est attribué qu'à la résolution
+    logement = _tenter(generer_logement, ligne, None, code_insee)
+
+    diagnostic = _tenter(generer_diagnostic, ligne, no_dpe, None)
+
+    return Analyse(no_dpe, no_departement, departement, code_insee, commune, cle, logement, diagnostic,
+                   empreinte = empreinte_ligne(ligne) if empreinter else None,
+                   immeuble  = immeuble)
+
+
+class Enregistrements(typing.NamedTuple):
+    '''
+    Les enregistrements extraits d'une ligne du fichier source, le département,
+    la commune et le logement étant None s'ils ont déjà été émis.
+    '''
+    departement: typing.Optional[Ligne]
+    commune: typing.Optional[Ligne]
+    logement: typing.Optional[Ligne]
+    diagnostic: Diagnostic
+
+
+def resoudre_analyse(analyse: Analyse) -> typing.Optional[Enregistrements]:
+    '''
+    Résout l'analyse d'une ligne, dans l'ordre du fichier source : le
+    département, la commune et le logement ne sont pas générés s'ils ont déjà
+    été émis, et les erreurs de l'analyse sont levées sinon. Un logement déjà
+    émis n'est ainsi pas validé à nouveau, et le DPE est rattaché à son
+    numéro.
+    Retourne None si la ligne concerne un immeuble.
+    '''
+    ligne = analyse.ligne
+
+    no_departement = _valeur(analyse.no_departement)
+    if no_departement in departements:
+        departement = None
+    elif ligne is not None:
+        departement = generer_departement(ligne, no_departement)
+    else:
+        departement = _valeur(analyse.departement)
+
+    code_insee = _valeur(analyse.code_insee)
+    if code_insee in communes:
+        commune = None
+    elif ligne is not None:
+        commune = generer_commune(ligne, code_insee, no_departement)
+    else:
+        commune = _valeur(analyse.commune)
+
+    id_logement = logements.get(normaliser_cle_logement(*_valeur(analyse.cle_logement)))
+    if id_logement is not None:
+        # le logement émis est celui d'un appartement ou d'une maison de même
+        # adresse, auquel un DPE d'immeuble ne doit pas être rattaché
+        if analyse.immeuble:
+            return None
+        logement = None
+    else:
+        # le numéro suivant n'est consommé qu'à l'émission du logement
+        id_logement = logements.suivant
+        if ligne is not None:
+            logement = generer_logement(ligne, id_logement, code_insee)
+        else:
+            logement = _valeur(analyse.logement)
+            logement['id_logement'] = id_logement
+
+        if logement['type_batiment'] == 'immeuble':
+            return None
+
+    if ligne is not None:
+        diagnostic = generer_diagnostic(ligne, analyse.no_dpe, id_logement)
+    else:
+        diagnostic = _valeur(analyse.diagnostic)
+        diagnostic.dpe['id_logement'] = id_logement
+
+    return Enregistrements(departement, commune, logement, diagnostic)
+
+
+class Source:
+    '''
+    Le fichier source, éventuellement compressé au format gzip (.gz), zstd
+    (.zst) ou zip (.zip, dont le premier fichier CSV est lu) : il est alors
+    décompressé au fil de la lecture, sans fichier temporaire.
+    Sa taille et la position de lecture, qui mesurent l'avancement, sont celles
+    du fichier compressé.
+    Un fichier non compressé est aussi projeté en mémoire, pour que ses
+    tranches soient repérées par leurs positions sans être lues.
+    '''
+    def __init__(self, fichier: str) -> None:
+        self.fichier = fichier
+        self.taille  = os.path.getsize(fichier)
+        self.brut    = open(fichier, 'rb')
+        self.flux: typing.BinaryIO
+        self.carte: typing.Optional[mmap.mmap] = None
+
+        extension = os.path.splitext(fichier)[1].lower()
+        try:
+            if extension == '.gz':
+                self.flux = gzip.GzipFile(fileobj=self.brut)
+            elif extension == '.zst':
+                if zstandard is None:
+                    raise ImportError('la lecture des fichiers zstd nécessite le module zstandard')
+                self.flux = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(self.brut, read_across_frames=True))
+            elif extension == '.zip':
+                archive = zipfile.ZipFile(self.brut)
+                noms = [ nom for nom in archive.namelist() if nom.lower().endswith('.csv') ]
+                if not noms:
+                    raise ValueError(f'aucun fichier CSV dans "{fichier}"')
+                self.flux = archive.open(noms[0])
+            else:
+                self.flux = self.brut
+                if self.taille:
+                    self.carte = mmap.mmap(self.brut.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self.brut.close()
+            raise
+
+    def lus(self) -> int:
+        '''
+        Retourne la position de lecture dans le fichier, éventuellement
+        compressé.
+        '''
+        return self.brut.tell()
+
+    def __enter__(self) -> 'Source':
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        if self.carte is not None:
+            self.carte.close()
+        self.flux.close()
+        self.brut.close()
+
+
+def lire_tranches(f: typing.BinaryIO, taille: int) -> typing.Iterator[bytes]:
+    '''
+    Découpe la suite d'un fichier CSV en tranches d'au moins `taille` octets,
+    alignées sur les fins d'enregistrement : une fin de ligne ne termine un
+    enregistrement que si elle est précédée d'un nombre pair de guillemets, un
+    champ entre guillemets pouvant s'étendre sur plusieurs lignes.
+    '''
+    reste = b''
+    guillemets_reste = 0
+    while True:
+        bloc = f.read(taille)
+        if not bloc:
+            if reste:
+                yield reste
+            return
+
+        fin = bloc.rfind(b'\n')
+        guillemets = guillemets_reste + bloc.count(b'"', 0, fin)
+        while fin != -1 and guillemets % 2:
+            debut = bloc.rfind(b'\n', 0, fin)
+            guillemets -= bloc.count(b'"', debut + 1, fin)
+            fin = debut
+
+        if fin == -1:
+            reste += bloc
+            guillemets_reste += bloc.count(b'"')
+            continue
+
+        yield reste + bloc[:fin + 1]
+        reste = bloc[fin + 1:]
+        guillemets_reste = reste.count(b'"')
+
+
+def reperer_tranches(carte: mmap.mmap, debut: int, taille: int) -> typing.Iterator[typing.Tuple[int, int]]:
+    '''
+    Repère dans un fichier CSV projeté en mémoire, à partir de la fin
+    d'enregistrement `debut`, des tranches d'au moins `taille` octets alignées
+    sur les fins d'enregistrement comme celles de `lire_tranches`, et retourne
+    leurs positions de début et de fin sans les copier.
+    '''
+    longueur = len(carte)
+    while debut < longueur:
+        fin    = -1
+        limite = debut + taille
+        while fin == -1 and limite < longueur:
+            fin = carte.rfind(b'\n', debut, limite)
+            guillemets = carte[debut:fin].count(b'"') if fin != -1 else 0
+            while fin != -1 and guillemets % 2:
+                precedente = carte.rfind(b'\n', debut, fin)
+                if precedente != -1:
+                    guillemets -= carte[precedente + 1:fin].count(b'"')
+                fin = precedente
+            limite += taille
+
+        if fin == -1:
+            yield debut, longueur
+            return
+
+        yield debut, fin + 1
+        debut = fin + 1
+
+
+class Tranche(typing.NamedTuple):
+    '''
+    Une tranche du fichier source, formée d'enregistrements complets : sa
+    position de fin dans le fichier décompressé, ses données, et la position de
+    lecture atteinte dans le fichier, éventuellement compressé, une fois lue.
+    Les données d'une tranche d'un fichier projeté en mémoire peuvent n'être
+    que repérées par sa position de début, chaque processus auxiliaire les
+    copiant de sa propre projection.
+    '''
+    fin: int
+    donnees: bytes
+    lus: int = 0
+    debut: typing.Optional[int] = None
+
+
+# la projection en mémoire du fichier source, dans un processus auxiliaire
+carte: typing.Optional[mmap.mmap] = None
+
+def initialiser_processus(noms: typing.Sequence[str], fichier: typing.Optional[str], profiler: bool = False) -> None:
+    '''
+    Prépare un processus auxiliaire à l'analyse des tranches du fichier
+    source : le profil est activé si `profiler`, son en-tête est indexé et,
+    s'il est donné, le fichier non compressé est projeté en mémoire.
+    '''
+    global carte, profil
+    if profiler:
+        # un processus créé par fork hérite du profil déjà activé
+        if profil is None:
+            profil = Profil()
+            profil.activer()
+        profil.relever()
+    indexer_entete(noms)
+    if fichier is not None:
+        with open(fichier, 'rb') as f:
+            carte = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def decouper_enregistrement(enregistrement: str, decoupes: int) -> typing.Optional[typing.List[str]]:
+    '''
+    Découpe un enregistrement CSV contenant des guillemets en au moins
+    `decoupes` champs, les suivants n'étant pas découpés, ou retourne None s'il
+    n'est pas de la forme attendue, i.e. si un guillemet n'ouvre pas ou ne ferme
+    pas un champ.
+
+    Les morceaux entre guillemets sont ceux de rang impair, et un morceau vide
+    entre deux d'entre eux correspond à un guillemet doublé.
+    '''
+    morceaux = enregistrement.split('"')
+    dernier  = len(morceaux) - 1
+    champs   = morceaux[0].split(',', decoupes)
+    if len(champs) > decoupes:
+        return champs
+    if champs[-1]:
+        return None
+
+    for k in range(1, dernier, 2):
+        champs[-1] += morceaux[k]
+        suite = morceaux[k + 1]
+        if not suite:
+            if k + 1 < dernier:
+                champs[-1] += '"'
+            continue
+        if suite[0] != ',':
+            return None
+        autres = suite.split(',', decoupes + 1 - len(champs))
+        champs.extend(autres[1:])
+        if len(champs) > decoupes:
+            return champs
+        if autres[-1] and k + 1 < dernier:
+            return None
+
+    return champs
+
+
+def lire_lignes(tranche: Tranche) -> typing.Iterator[LigneSource]:
+    '''
+    Lit les lignes d'une tranche du fichier source, projetées sur les champs
+    utilisés.
+
+    Les enregistrements sans guillemets, les plus courants, sont découpés sans
+    passer par le module `csv`, et sans découper les champs suivant le dernier
+    champ utilisé ; les autres sont regroupés sur autant de lignes que
+    nécessaire pour que les guillemets soient appariés, et seuls ceux qui ne
+    sont pas de la forme attendue sont confiés au module `csv`.
+
+    Chaque enregistrement est décodé en entier, même s'il est rejeté : le
+    décoder prend une dizaine de fois moins de temps que le découper, et en
+    décoder séparément les champs utilisés coûterait davantage.
+    '''
+    projeter = entete.projeter
+    decoupes = entete.decoupes
+
+    # découpées comme à la lecture d'un fichier texte, sur "\n", "\r" et "\r\n"
+    lignes = iter(tranche.donnees.splitlines())
+    for octets in lignes:
+        if b'"' not in octets:
+            if octets:
+                yield projeter(octets.decode('utf-8').split(',', decoupes))
+            continue
+
+        while octets.count(b'"') % 2:
+            suite = next(lignes, None)
+            if suite is None:
+                break
+            octets += b'\n' + suite
+
+        ligne  = octets.decode('utf-8')
+        champs = decouper_enregistrement(ligne, decoupes)
+        if champs is not None:
+            yield projeter(champs)
+        else:
+            yield from ( projeter(champs) for champs in csv.reader(io.StringIO(ligne)) if champs )
+
+
+def analyser_tranche(tranche: Tranche, empreinter: bool = False) -> typing.Tuple[int, int, typing.List[Analyse], typing.Optional[typing.Dict[str, typing.List[float]]]]:
+    '''
+    Analyse les lignes d'une tranche du fichier source, dans un processus
+    auxiliaire, et relève les mesures du profil s'il est activé.
+    '''
+    if not tranche.donnees and carte is not None:
+        tranche = tranche._replace(donnees=carte[tranche.debut:tranche.fin])
+    analyses = [ analyser_ligne(ligne, empreinter=empreinter) for ligne in lire_lignes(tranche) ]
+    return tranche.fin, tranche.lus, analyses, profil.relever() if profil is not None else None
+
+
+def executer_en_ordre(pool: multiprocessing.pool.Pool, fonction: typing.Callable, taches: typing.Iterable, fenetre: int) -> typing.Iterator:
+    '''
+    Répartit des tâches entre les processus d'un pool, et en retourne les
+    résultats dans l'ordre, en limitant à `fenetre` le nombre de tâches en
+    cours pour borner la mémoire utilisée.
+    '''
+    en_cours: collections.deque = collections.deque()
+    for tache in taches:
+        en_cours.append(pool.apply_async(fonction, (tache,)))
+        if len(en_cours) >= fenetre:
+            yield en_cours.popleft().get()
+    while en_cours:
+        yield en_cours.popleft().get()
+
+
+class Etage:
+    '''
+    Un étage du traitement exécuté dans son propre fil : les lots qui lui sont
+    transmis attendent dans une file bornée, pour que la mémoire utilisée reste
+    constante, et sont traités par `traiter` dans l'ordre.
+    Le temps passé à traiter les lots est mesuré, en temps mural et CPU, ainsi
+    que celui passé par le fil principal à attendre une place dans la file, et
+    le nombre de lignes transmises est compté.
+    Une erreur survenue dans le fil est levée à nouveau dans le fil principal
+    lors de la transmission suivante.
+    '''
+    def __init__(self, nom: str, traiter: typing.Optional[typing.Callable[[typing.Any], None]], taille_file: int) -> None:
+        self.nom     = nom
+        self.traiter = traiter
+        self.file: queue.Queue = queue.Queue(taille_file)
+
+        self.occupation = 0.
+        self.cpu        = 0.
+        self.attente    = 0.
+        self.lignes     = 0
+        self.erreur: typing.Optional[BaseException] = None
+
+        self.fil = threading.Thread(target=self.executer, name=nom, daemon=True)
+        self.fil.start()
+
+    def executer(self) -> None:
+        '''
+        Traite les lots de la file jusqu'à la fin, signalée par None.
+        '''
+        while True:
+            lot = self.file.get()
+            try:
+                if lot is None:
+                    return
+                if self.erreur is None:
+                    debut, debut_cpu = time.perf_counter(), time.thread_time()
+                    try:
+                        self.traiter(lot)
+                    except BaseException as e:
+                        self.erreur = e
+                    self.occupation += time.perf_counter() - debut
+                    self.cpu        += time.thread_time() - debut_cpu
+            finally:
+                self.file.task_done()
+
+    def verifier(self) -> None:
+        '''
+        Lève à nouveau l'erreur survenue dans le fil de l'étage, le cas échéant.
+        '''
+        if self.erreur is not None:
+            raise self.erreur
+
+    def transmettre(self, lot: typing.Any, lignes: int = 0) -> None:
+        '''
+        Transmet un lot de `lignes` lignes à l'étage, en attendant une place dans
+        sa file.
+        '''
+        self.verifier()
+        debut = time.perf_counter()
+        self.file.put(lot)
+        self.attente += time.perf_counter() - debut
+        self.lignes  += lignes
+
+    def attendre(self) -> None:
+        '''
+        Attend que tous les lots transmis aient été traités.
+        '''
+        self.file.join()
+        self.verifier()
+
+    def terminer(self) -> None:
+        '''
+        Attend que tous les lots transmis aient été traités, puis arrête le fil.
+        '''
+        self.file.put(None)
+        self.fil.join()
+        self.verifier()
+
+    def metriques(self) -> typing.Dict[str, typing.Any]:
+        '''
+        Retourne la profondeur de la file et le temps d'occupation de l'étage.
+        '''
+        return {
+            'file': self.file.qsize(),
+            'occupation': round(self.occupation, 1)
+        }
+
+
+class EtageLecture(Etage):
+    '''
+    Un étage produisant dans son propre fil les éléments d'un itérable, en
+    avance sur leur consommation par le fil principal, qui les obtient en
+    itérant sur l'étage.
+    '''
+    def __init__(self, nom: str, elements: typing.Iterable, taille_file: int) -> None:
+        self.elements = elements
+        super().__init__(nom, None, taille_file)
+
+    def executer(self) -> None:
+        '''
+        Produit les éléments dans la file, puis None pour en signaler la fin.
+        '''
+        try:
+            iterateur = iter(self.elements)
+            while True:
+                debut, debut_cpu = time.perf_counter(), time.thread_time()
+                element = next(iterateur, None)
+                self.occupation += time.perf_counter() - debut
+                self.cpu        += time.thread_time() - debut_cpu
+                if element is None:
+                    break
+                self.file.put(element)
+        except BaseException as e:
+            self.erreur = e
+        finally:
+            self.file.put(None)
+
+    def __iter__(self) -> typing.Iterator:
         while True:
-            b = reader(2 ** 16)
-            if not b: break
-            yield b
-    nb_lignes = sum(buf.count(b"\n") for buf in _make_gen(f.raw.read))
-nb_lignes      -= 1
-nb_lignes_log10 = 1 + int(math.log10(nb_lignes))
-
-with open(fichier_src, 'r', encoding='utf-8-sig') as src, \
-     open('data/departements.csv'           , 'w', newline='') as out_departement, \
-     open('data/communes.csv'               , 'w', newline='') as out_commune, \
-     open('data/logements.csv'              , 'w', newline='') as out_logement, \
-     open('data/dpes.csv'                   , 'w', newline='') as out_dpe, \
-     open('data/installations_chauffage.csv', 'w', newline='') as out_installation_chauffage, \
-     open('data/installations_ecs.csv'      , 'w', newline='') as out_installation_ecs, \
-     open('data/installations_solaire.csv'  , 'w', newline='') as out_installation_solaire, \
-     open('data/generateurs.csv'            , 'w', newline='') as out_generateur:
-
-    table_departement = csv.DictWriter(out_departement, [
+            debut = time.perf_counter()
+            element = self.file.get()
+            self.attente += time.perf_counter() - debut
+            if element is None:
+                self.verifier()
+                return
+            yield element
+
+
+# les tables produites et leurs colonnes, dans l'ordre des clés étrangères
+TABLES: typing.Dict[str, typing.List[str]] = {
+    'departements': [
         'no_departement',
         'no_region',
         'zone_climatique'
-    ])
-    table_departement.writeheader()
-
-    table_commune = csv.DictWriter(out_commune, [
+    ],
+    'communes': [
         'code_insee',
         'no_departement',
         'nom_commune',
         'code_postal'
-    ])
-    table_commune.writeheader()
-
-    table_logement = csv.DictWriter(out_logement, [
+    ],
+    'logements': [
         'id_logement',
         'code_insee',
         'annee_construction',
@@ -673,10 +1690,13 @@ with open(fichier_src, 'r', encoding='utf-8-sig') as src, \
         'surface_habitable',
         'classe_inertie',
         'typologie',
-    ])
-    table_logement.writeheader()
-
-    table_dpe = csv.DictWriter(out_dpe, [
+    ],
+    'identifiants_logements': [
+        'id_logement',
+        'id_ban',
+        'adresse_brute'
+    ],
+    'dpes': [
         'no_dpe',
         'id_logement',
         'date_reception',
@@ -696,38 +1716,50 @@ with open(fichier_src, 'r', encoding='utf-8-sig') as src, \
         'conso_enr',
         'production_enr',
         'surface_capteurs_pv'
-    ])
-    table_dpe.writeheader()
-
-    table_installation_chauffage = csv.DictWriter(out_installation_chauffage, [
+    ],
+    'configurations_installation_chauffage': [
+        'code_configuration_installation_chauffage',
+        'configuration_installation_chauffage'
+    ],
+    'types_emetteur_chauffage': [
+        'code_type_emetteur_chauffage',
+        'type_emetteur_chauffage'
+    ],
+    'installations_chauffage': [
         'no_dpe',
         'no_installation_chauffage',
         'description_installation_chauffage',
         'type_installation_chauffage',
-        'configuration_installation_chauffage',
+        'code_configuration_installation_chauffage',
         'surface_chauffee',
-        'type_emetteur_chauffage'
-    ])
-    table_installation_chauffage.writeheader()
-
-    table_installation_ecs = csv.DictWriter(out_installation_ecs, [
+        'code_type_emetteur_chauffage'
+    ],
+    'installations_ecs': [
         'no_dpe',
         'no_installation_ecs',
         'description_installation_ecs',
         'type_installation_ecs',
         'configuration_installation_ecs'
-    ])
-    table_installation_ecs.writeheader()
-
-    table_installation_solaire = csv.DictWriter(out_installation_solaire, [
+    ],
+    'installations_solaire': [
         'no_dpe',
         'no_installation_solaire',
         'type_installation_solaire',
         'facteur_couverture_solaire'
-    ])
-    table_installation_solaire.writeheader()
-
-    table_generateur = csv.DictWriter(out_generateur, [
+    ],
+    'descriptions_generateur': [
+        'code_description_generateur',
+        'description_generateur'
+    ],
+    'types_energie': [
+        'code_type_energie',
+        'type_energie'
+    ],
+    'types_generateur': [
+        'code_type_generateur',
+        'type_generateur'
+    ],
+    'generateurs': [
         'no_dpe',
         'no_generateur',
         'no_installation_chauffage',
@@ -737,112 +1769,1799 @@ with open(fichier_src, 'r', encoding='utf-8-sig') as src, \
         'conso_chauffage_depensier',
         'conso_ecs',
         'conso_ecs_depensier',
-        'description_generateur',
+        'code_description_generateur',
         'date_installation_generateur',
-        'type_energie',
-        'type_generateur'
-    ])
-    table_generateur.writeheader()
+        'code_type_energie',
+        'code_type_generateur'
+    ],
+    # les DPE déjà émis dont la ligne a changé depuis, à supprimer avant le
+    # chargement des nouvelles données en mode incrémental
+    'dpes_modifies': [
+        'no_dpe'
+    ]
+}
+
+# les tables de faits, dont les fichiers peuvent être partitionnés d'après le
+# DPE de chaque ligne
+TABLES_PARTITIONNEES = ('dpes', 'installations_chauffage', 'installations_ecs', 'installations_solaire', 'generateurs')
+
+# les colonnes de chaînes de caractères répétées de chaque table, remplacées
+# dans les lignes produites par leur numéro dans une table de correspondance
+DICTIONNAIRES: typing.Dict[str, typing.List[Dictionnaire]] = {
+    'installations_chauffage': [
+        Dictionnaire('configurations_installation_chauffage', 'configuration_installation_chauffage'),
+        Dictionnaire('types_emetteur_chauffage', 'type_emetteur_chauffage')
+    ],
+    'generateurs': [
+        Dictionnaire('descriptions_generateur', 'description_generateur'),
+        Dictionnaire('types_energie', 'type_energie'),
+        Dictionnaire('types_generateur', 'type_generateur')
+    ]
+}
+
+def coder_lignes(nom: str, lignes: typing.Iterable[Ligne]) -> typing.Iterator[typing.Tuple[str, Ligne]]:
+    '''
+    Remplace dans les lignes d'une table les valeurs de ses colonnes de chaînes
+    répétées par leur numéro, et produit les lignes des tables de
+    correspondance des valeurs émises pour la première fois.
+    '''
+    for ligne in lignes:
+        for dictionnaire in DICTIONNAIRES[nom]:
+            valeur = ligne.pop(dictionnaire.colonne, None)
+            code, nouvelle = dictionnaire.coder(valeur)
+            ligne[f'code_{dictionnaire.colonne}'] = code
+            if nouvelle:
+                yield dictionnaire.nom, { f'code_{dictionnaire.colonne}': code, dictionnaire.colonne: valeur }
+
+
+class TableParLots:
+    '''
+    Une table écrite dans un fichier par un étage dédié, à qui les lignes sont
+    transmises par lots de `TAILLE_LOT`, avec les méthodes d'écriture de
+    `csv.DictWriter`.
+    '''
+    def __init__(self, fichier: str, ecrire: typing.Callable[[typing.List[Ligne]], None]) -> None:
+        self.lot: typing.List[Ligne] = []
+        self.etage = Etage(os.path.basename(fichier), ecrire, LOTS_EN_ATTENTE)
+
+    def writerow(self, ligne: Ligne) -> None:
+        self.lot.append(ligne)
+        if len(self.lot) >= TAILLE_LOT:
+            self.vider()
+
+    def writerows(self, lignes: typing.Iterable[Ligne]) -> None:
+        self.lot.extend(lignes)
+        if len(self.lot) >= TAILLE_LOT:
+            self.vider()
+
+    def vider(self) -> None:
+        '''
+        Transmet à l'étage le lot en cours.
+        '''
+        if self.lot:
+            self.etage.transmettre(self.lot, len(self.lot))
+            self.lot = []
+
+    def attendre(self) -> None:
+        '''
+        Attend que toutes les lignes aient été écrites.
+        '''
+        self.vider()
+        self.etage.attendre()
+
+    def terminer(self) -> None:
+        '''
+        Écrit les dernières lignes, puis arrête l'étage.
+        '''
+        self.vider()
+        self.etage.terminer()
+
+
+class TablePartitionnee(TableParLots):
+    '''
+    Une table écrite dans un fichier CSV par partition, <repertoire>/<partition>.csv,
+    ouvert à la première ligne de la partition : les lignes sont transmises
+    avec leur partition, et écrites par un seul étage quel que soit le nombre
+    de partitions.
+    '''
+    def __init__(self, repertoire: str, champs: typing.List[str], compression: typing.Optional[str]) -> None:
+        self.repertoire  = repertoire
+        self.champs      = champs
+        self.compression = compression
+        self.partitions: typing.Dict[str, csv.DictWriter] = {}
+        self.sorties: typing.List[typing.Union[typing.TextIO, SortieCompressee]] = []
+        os.makedirs(repertoire, exist_ok=True)
+        super().__init__(repertoire, self.ecrire)
+
+    def writerow(self, ligne: Ligne, partition: str = '') -> None:
+        self.lot.append((partition, ligne))
+        if len(self.lot) >= TAILLE_LOT:
+            self.vider()
+
+    def ecrire(self, lot: typing.List[typing.Tuple[str, Ligne]]) -> None:
+        '''
+        Écrit un lot, par suites de lignes d'une même partition.
+        '''
+        for partition, lignes in itertools.groupby(lot, operator.itemgetter(0)):
+            table = self.partitions.get(partition)
+            if table is None:
+                table = self.ouvrir(partition)
+            table.writerows(ligne for _, ligne in lignes)
+
+    def ouvrir(self, partition: str) -> csv.DictWriter:
+        '''
+        Ouvre le fichier d'une partition, et en écrit l'en-tête.
+        '''
+        fichier = os.path.join(self.repertoire, f'{partition}.csv')
+        if self.compression:
+            sortie: typing.Union[typing.TextIO, SortieCompressee] = SortieCompressee(f'{fichier}.{self.compression}', 'w', self.compression)
+        else:
+            sortie = open(fichier, 'w', newline='')
+        self.sorties.append(sortie)
+        table = self.partitions[partition] = csv.DictWriter(sortie, self.champs)
+        table.writeheader()
+        return table
 
-    for i, ligne in zip(itertools.count(1), csv.DictReader(src)):
-        try:
-            no_dpe = cast_str(ligne['N°DPE'])
-            #print(f'Traitement du DPE {no_dpe} ({f"{i}".rjust(nb_lignes_log10)}/{nb_lignes})...')
+    def terminer(self) -> None:
+        '''
+        Écrit les dernières lignes, arrête l'étage, puis ferme les fichiers.
+        '''
+        super().terminer()
+        for sortie in self.sorties:
+            sortie.close()
 
-            try:
-                departement = generer_departement(ligne)
-                commune     = generer_commune(ligne, departement)
-                logement    = generer_logement(ligne, commune)
 
-                if logement['type_batiment'] == 'immeuble':
-                    continue
+class TableCsv(TableParLots):
+    '''
+    Une table écrite dans un fichier CSV.
+    '''
+    def __init__(self, sortie: typing.TextIO, champs: typing.List[str]) -> None:
+        self.table = csv.DictWriter(sortie, champs)
+        super().__init__(sortie.name, self.table.writerows)
 
-                dpe = generer_dpe(ligne, no_dpe, logement)
+    def writeheader(self) -> None:
+        self.table.writeheader()
 
-                installations_chauffage = []
-                generateurs_chauffage   = []
-                for no_installation in range(1, 3):
-                    try:
-                        installation_chauffage = generer_installation_chauffage(ligne, dpe, no_installation)
-
-                        generateurs_installation_chauffage = []
-                        for no_generateur in range(1, 3):
-                            try:
-                                generateurs_installation_chauffage.append(generer_generateur_chauffage(ligne, installation_chauffage, no_generateur))
-                            except GenError:
-                                pass
-                        if not generateurs_installation_chauffage:
-                            raise GenError()
-
-                        installations_chauffage.append(installation_chauffage)
-                        generateurs_chauffage += generateurs_installation_chauffage
-                    except GenError:
-                        pass
-
-                installations_ecs = []
-                generateurs_ecs   = []
-                try:
-                    installation_ecs = generer_installation_ecs(ligne, dpe)
-
-                    generateurs_installation_ecs = []
-                    for no_generateur in range(1, 3):
-                        try:
-                            generateurs_installation_ecs.append(generer_generateur_ecs(ligne, installation_ecs, no_generateur))
-                        except GenError:
-                            pass
-                    if not generateurs_installation_ecs:
-                        raise GenError()
-
-                    installations_ecs.append(installation_ecs)
-                    generateurs_ecs += generateurs_installation_ecs
-                except GenError:
-                    pass
 
+class SortieCompressee:
+    '''
+    Un fichier produit compressé au format gzip ou zstd au fil de l'écriture,
+    avec les méthodes d'un fichier texte utilisées pour les tables CSV.
+    Vider le tampon du fichier termine le membre (gzip) ou la trame (zstd) en
+    cours, qui sont décompressés à la suite l'un de l'autre : le fichier,
+    tronqué à un point de reprise, reste ainsi valide.
+    '''
+    def __init__(self, fichier: str, mode: str, compression: str) -> None:
+        self.name        = fichier
+        self.compression = compression
+        self.brut        = open(fichier, mode + 'b')
+        self.texte: typing.Optional[io.TextIOWrapper] = None
+
+    def write(self, texte: str) -> int:
+        if self.texte is None:
+            if self.compression == 'gz':
+                flux = gzip.GzipFile(fileobj=self.brut, mode='wb', compresslevel=6, mtime=0)
+            else:
+                flux = zstandard.ZstdCompressor().stream_writer(self.brut, closefd=False)
+            self.texte = io.TextIOWrapper(flux, newline='')
+        return self.texte.write(texte)
+
+    def flush(self) -> None:
+        '''
+        Termine le membre ou la trame en cours, puis vide le tampon du fichier.
+        '''
+        if self.texte is not None:
+            self.texte.close()
+            self.texte = None
+        self.brut.flush()
+
+    def fileno(self) -> int:
+        return self.brut.fileno()
+
+    def tell(self) -> int:
+        return self.brut.tell()
+
+    def seek(self, position: int) -> int:
+        return self.brut.seek(position)
+
+    def truncate(self) -> int:
+        return self.brut.truncate()
+
+    def close(self) -> None:
+        self.flush()
+        self.brut.close()
+
+    def __enter__(self) -> 'SortieCompressee':
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+
+class Diffusion:
+    '''
+    Plusieurs tables aux mêmes lignes, écrites ensemble, avec les méthodes
+    d'écriture de `csv.DictWriter`.
+    '''
+    def __init__(self, tables: typing.List[TableParLots]) -> None:
+        self.tables = tables
+
+    def writerow(self, ligne: Ligne) -> None:
+        for table in self.tables:
+            table.writerow(ligne)
+
+    def writerows(self, lignes: typing.Iterable[Ligne]) -> None:
+        lignes = list(lignes)
+        for table in self.tables:
+            table.writerows(lignes)
+
+
+class TableJsonl(TableParLots):
+    '''
+    Une table écrite dans un fichier JSON Lines, à raison d'un objet par ligne.
+    '''
+    def __init__(self, sortie: typing.TextIO) -> None:
+        self.sortie = sortie
+        super().__init__(sortie.name, self.ecrire)
+
+    def ecrire(self, lignes: typing.List[Ligne]) -> None:
+        self.sortie.writelines(json.dumps(ligne, ensure_ascii=False) + '\n' for ligne in lignes)
+
+
+class JournalRejets:
+    '''
+    Le journal des DPE rejetés : chaque rejet est compté par raison (l'étape et
+    le code de l'erreur), et écrit dans une table avec la valeur en cause, ou
+    seulement le premier puis un sur `echantillonnage` de chaque raison (aucun
+    si `echantillonnage` vaut 0).
+    '''
+    CHAMPS = ['no_dpe', 'etape', 'code', 'message', 'valeur']
+
+    def __init__(self, table: TableParLots, echantillonnage: int = 1) -> None:
+        self.table           = table
+        self.echantillonnage = echantillonnage
+        self.nombres: typing.Dict[str, int] = {}
+        self.messages: typing.Dict[str, str] = {}
+
+    def ajouter(self, no_dpe: str, erreur: GenError) -> None:
+        '''
+        Compte le rejet d'un DPE, et l'écrit s'il fait partie de l'échantillon.
+        '''
+        raison = f'{erreur.etape}/{erreur.code}'
+        n = self.nombres.get(raison, 0)
+        self.nombres[raison] = n + 1
+        if not n:
+            self.messages[raison] = str(erreur)
+        if self.echantillonnage and not n % self.echantillonnage:
+            self.table.writerow({
+                'no_dpe': no_dpe,
+                'etape': erreur.etape,
+                'code': erreur.code,
+                'message': str(erreur),
+                'valeur': erreur.valeur
+            })
+
+    def etat(self) -> typing.Dict[str, typing.Any]:
+        '''
+        Retourne les nombres de rejets, à enregistrer avec un point de reprise.
+        '''
+        return { 'nombres': self.nombres, 'messages': self.messages }
+
+    def reprendre(self, etat: typing.Dict[str, typing.Any]) -> None:
+        '''
+        Reprend les nombres de rejets d'un point de reprise.
+        '''
+        self.nombres  = etat['nombres']
+        self.messages = etat['messages']
+
+    def afficher(self) -> None:
+        '''
+        Affiche les nombres de rejets par raison, du plus fréquent au moins
+        fréquent.
+        '''
+        for raison, n in sorted(self.nombres.items(), key=lambda r: (-r[1], r[0])):
+            print(f'{raison} : {n} DPE rejetés ({self.messages[raison]})')
+
+
+class TableSql(typing.NamedTuple):
+    '''
+    Une table du schéma de la base de données : son instruction de création,
+    sans son éventuel partitionnement, les types de ses colonnes (None pour
+    une clé étrangère, du type de la clé référencée), les tables qu'elle
+    référence et les colonnes de sa clé primaire.
+    '''
+    nom: str
+    creation: str
+    colonnes: typing.Dict[str, typing.Optional[str]]
+    references: typing.List[str]
+    cle_primaire: typing.List[str]
+
+
+_motif_creation_table = re.compile('(CREATE TABLE (\\w+)\\s*\\((.*?)\\n\\s*\\))\\s*(?:PARTITION BY [^;]*)?;', re.DOTALL)
+_motif_type_sql       = re.compile('\\b(NUMBER|VARCHAR2|CHAR|DATE)\\b(\\([0-9, ]+\\))?')
+_motif_reference      = re.compile('\\bREFERENCES (\\w+)')
+_motif_cle_primaire   = re.compile('\\bPRIMARY KEY\\s*\\(([^)]*)\\)')
+
+def decouper_elements(liste: str) -> typing.List[str]:
+    '''
+    Découpe une liste SQL aux virgules qui ne sont pas entre parenthèses.
+    '''
+    elements = []
+    debut = profondeur = 0
+    for i, c in enumerate(liste):
+        if c == '(':
+            profondeur += 1
+        elif c == ')':
+            profondeur -= 1
+        elif c == ',' and not profondeur:
+            elements.append(liste[debut:i].strip())
+            debut = i + 1
+    elements.append(liste[debut:].strip())
+    return [ element for element in elements if element ]
+
+def lire_schema(fichier: str = 'init.sql') -> typing.Dict[str, TableSql]:
+    '''
+    Lit les tables créées par un script SQL, dans l'ordre des clés étrangères.
+    '''
+    with open(fichier, encoding='utf-8') as f:
+        script = f.read()
+
+    tables = {}
+    for creation in _motif_creation_table.finditer(script):
+        instruction, nom, elements = creation.groups()
+        colonnes: typing.Dict[str, typing.Optional[str]] = {}
+        cle_primaire = []
+        for element in decouper_elements(elements):
+            if not element.startswith('CONSTRAINT '):
+                colonne, _, suite = element.partition(' ')
+                type_sql = _motif_type_sql.match(suite.lstrip())
+                colonnes[colonne] = type_sql.group(0) if type_sql else None
+                if 'PRIMARY KEY' in suite:
+                    cle_primaire.append(colonne)
+            else:
+                cle = _motif_cle_primaire.search(element)
+                if cle is not None:
+                    cle_primaire.extend(colonne.strip() for colonne in cle.group(1).split(','))
+        references = [ reference for reference in _motif_reference.findall(elements) if reference != nom ]
+        tables[nom] = TableSql(nom, instruction, colonnes, references, cle_primaire)
+
+    ordre = graphlib.TopologicalSorter({ nom: table.references for nom, table in tables.items() }).static_order()
+    return { nom: tables[nom] for nom in ordre }
+
+def type_colonne(schema: typing.Dict[str, TableSql], nom: str, colonne: str) -> typing.Optional[str]:
+    '''
+    Retourne le type SQL d'une colonne d'une table : celui de la colonne
+    référencée pour une clé étrangère, et celui de la première colonne du même
+    nom pour une table absente du schéma.
+    '''
+    table = schema.get(nom)
+    if table is not None and table.colonnes.get(colonne) is not None:
+        return table.colonnes[colonne]
+    candidates = schema.values() if table is None else [ schema[reference] for reference in table.references ]
+    for candidate in candidates:
+        if colonne in candidate.colonnes:
+            type_sql = type_colonne(schema, candidate.nom, colonne)
+            if type_sql is not None:
+                return type_sql
+    return None
+
+
+class BaseDeDonnees(abc.ABC):
+    '''
+    Une base de données, accédée par une connexion DB-API, dans laquelle les
+    enregistrements sont directement insérés, par lots de `taille_lot` lignes
+    transmis à un étage dédié, table par table dans l'ordre des clés
+    étrangères, et validés toutes les `intervalle_commit` lignes.
+    Comme SQL*Loader, les lignes rejetées par la base (doublons, contraintes)
+    sont ignorées, et comptées par table.
+    Les DPE modifiés en mode incrémental sont supprimés de la base avant
+    l'insertion des lignes du même lot.
+    '''
+    def __init__(self, connexion: typing.Any, taille_lot: int, intervalle_commit: int) -> None:
+        self.connexion         = connexion
+        self.taille_lot        = taille_lot
+        self.intervalle_commit = intervalle_commit
+        self.schema            = lire_schema()
+
+        self.requetes = {
+            nom: self.requete_insertion(nom, TABLES[nom]) for nom in self.schema if nom in TABLES
+        }
+        self.rejets: typing.Counter[str] = collections.Counter()
+
+        self.lots: typing.Dict[str, typing.List[Ligne]] = { nom: [] for nom in TABLES }
+        self.en_attente  = 0
+        self.non_valides = 0
+        self.etage = Etage('base', self.inserer, LOTS_EN_ATTENTE)
+
+    @abc.abstractmethod
+    def parametre(self, i: int) -> str:
+        '''
+        Retourne le marqueur du `i`-ième paramètre d'une requête.
+        '''
+
+    def requete_insertion(self, nom: str, champs: typing.List[str]) -> str:
+        '''
+        Retourne la requête d'insertion d'une ligne dans une table.
+        '''
+        return f"INSERT INTO {nom} ({', '.join(champs)}) VALUES ({', '.join(self.parametre(i) for i in range(len(champs)))})"
+
+    @abc.abstractmethod
+    def executer(self, curseur: typing.Any, requete: str, lignes: typing.List[typing.Tuple]) -> int:
+        '''
+        Insère des lignes dans une table, et retourne le nombre de lignes
+        rejetées.
+        '''
+
+    def table(self, nom: str) -> 'TableBase':
+        return TableBase(self, nom)
+
+    def ajouter(self, nom: str, lignes: typing.List[Ligne]) -> None:
+        '''
+        Ajoute des lignes d'une table au lot en cours.
+        '''
+        self.lots[nom].extend(lignes)
+        self.en_attente += len(lignes)
+        if self.en_attente >= self.taille_lot:
+            self.vider()
+
+    def vider(self) -> None:
+        '''
+        Transmet à l'étage le lot en cours.
+        '''
+        if self.en_attente:
+            self.etage.transmettre(self.lots, self.en_attente)
+            self.lots = { nom: [] for nom in TABLES }
+            self.en_attente = 0
+
+    def inserer(self, lots: typing.Dict[str, typing.List[Ligne]]) -> None:
+        '''
+        Insère un lot dans la base, dans le fil de l'étage.
+        '''
+        curseur = self.connexion.cursor()
+        if lots['dpes_modifies']:
+            curseur.executemany(f'DELETE FROM dpes WHERE no_dpe = {self.parametre(0)}',
+                                [ (ligne['no_dpe'],) for ligne in lots['dpes_modifies'] ])
+        for nom, requete in self.requetes.items():
+            if lots[nom]:
+                champs = TABLES[nom]
+                self.rejets[nom] += self.executer(curseur, requete, [ tuple(ligne.get(champ) for champ in champs) for ligne in lots[nom] ])
+                self.non_valides += len(lots[nom])
+        curseur.close()
+
+        if self.non_valides >= self.intervalle_commit:
+            self.connexion.commit()
+            self.non_valides = 0
+
+    def attendre(self) -> None:
+        '''
+        Attend que toutes les lignes aient été insérées.
+        '''
+        self.vider()
+        self.etage.attendre()
+
+    def rafraichir(self) -> None:
+        '''
+        Met à jour la base après la validation des lignes insérées.
+        '''
+
+    def terminer(self) -> None:
+        '''
+        Insère les dernières lignes, arrête l'étage, valide, met à jour la
+        base, puis ferme la connexion.
+        '''
+        self.vider()
+        self.etage.terminer()
+        self.connexion.commit()
+        self.rafraichir()
+        self.connexion.close()
+
+
+class TableBase:
+    '''
+    Une table de la base de données, avec les méthodes d'écriture de
+    `csv.DictWriter`.
+    '''
+    def __init__(self, base: BaseDeDonnees, nom: str) -> None:
+        self.base = base
+        self.nom  = nom
+
+    def writerow(self, ligne: Ligne) -> None:
+        self.base.ajouter(self.nom, [ligne])
+
+    def writerows(self, lignes: typing.Iterable[Ligne]) -> None:
+        self.base.ajouter(self.nom, list(lignes))
+
+
+# les types Oracle des colonnes et leurs équivalents SQLite
+_types_sqlite = {
+    'NUMBER': 'INTEGER',
+    'VARCHAR2': 'TEXT',
+    'CHAR': 'TEXT',
+    'DATE': 'TEXT'
+}
+
+class BaseSqlite(BaseDeDonnees):
+    '''
+    Une base SQLite, dont les tables sont créées d'après le schéma de
+    `init.sql`, les types Oracle étant remplacés par leurs équivalents SQLite.
+    Les tables existantes sont conservées si `completer`, et recréées sinon.
+    '''
+    def __init__(self, fichier: str, taille_lot: int, intervalle_commit: int, completer: bool = False) -> None:
+        os.makedirs(os.path.dirname(fichier) or '.', exist_ok=True)
+        # la connexion est utilisée par le fil de l'étage
+        super().__init__(sqlite3.connect(fichier, check_same_thread=False), taille_lot, intervalle_commit)
+
+        self.connexion.execute('PRAGMA foreign_keys = ON')
+        if not completer:
+            for nom in reversed(self.schema):
+                self.connexion.execute(f'DROP TABLE IF EXISTS {nom}')
+        for table in self.schema.values():
+            creation = _motif_type_sql.sub(self.convertir_type, table.creation)
+            self.connexion.execute(creation.replace('CREATE TABLE', 'CREATE TABLE IF NOT EXISTS', 1))
+        self.connexion.commit()
+
+    @staticmethod
+    def convertir_type(type_sql: re.Match) -> str:
+        if type_sql.group(1) == 'NUMBER' and type_sql.group(2) and ',' in type_sql.group(2):
+            return 'REAL'
+        return _types_sqlite[type_sql.group(1)]
+
+    def parametre(self, i: int) -> str:
+        return '?'
+
+    def requete_insertion(self, nom: str, champs: typing.List[str]) -> str:
+        return super().requete_insertion(nom, champs).replace('INSERT', 'INSERT OR IGNORE', 1)
+
+    def executer(self, curseur: sqlite3.Cursor, requete: str, lignes: typing.List[typing.Tuple]) -> int:
+        # les lignes en double ou invalides sont ignorées par la requête, mais
+        # une clé étrangère manquante interrompt le lot, alors repris ligne à
+        # ligne
+        curseur.execute('SAVEPOINT lot')
+        try:
+            avant = self.connexion.total_changes
+            curseur.executemany(requete, lignes)
+            rejets = len(lignes) - (self.connexion.total_changes - avant)
+        except sqlite3.IntegrityError:
+            curseur.execute('ROLLBACK TO lot')
+            rejets = 0
+            for ligne in lignes:
+                avant = self.connexion.total_changes
                 try:
-                    installation_solaire = generer_installation_solaire(ligne, dpe)
-                    for generateur_ecs in generateurs_ecs:
-                        generateur_ecs['no_installation_solaire'] = 1
-                except GenError:
-                    installation_solaire = None
+                    curseur.execute(requete, ligne)
+                except sqlite3.IntegrityError:
                     pass
+                rejets += 1 - (self.connexion.total_changes - avant)
+        curseur.execute('RELEASE lot')
+        return rejets
+
+
+class BaseOracle(BaseDeDonnees):
+    '''
+    Une base Oracle, accédée avec le module `oracledb`, dont le schéma doit
+    avoir été créé par `init.sql`.
+    Les dates et nombres sont convertis par la base, comme dans les fichiers
+    de contrôle de SQL*Loader.
+    '''
+    def __init__(self, dsn: str, taille_lot: int, intervalle_commit: int, completer: bool = False) -> None:
+        import oracledb
+
+        super().__init__(oracledb.connect(dsn), taille_lot, intervalle_commit)
+
+        with self.connexion.cursor() as curseur:
+            curseur.execute("ALTER SESSION SET NLS_DATE_FORMAT = 'YYYY-MM-DD'")
+            curseur.execute("ALTER SESSION SET NLS_NUMERIC_CHARACTERS = '.,'")
+
+    def parametre(self, i: int) -> str:
+        return f':{i + 1}'
+
+    def executer(self, curseur: typing.Any, requete: str, lignes: typing.List[typing.Tuple]) -> int:
+        curseur.executemany(requete, lignes, batcherrors=True)
+        return len(curseur.getbatcherrors())
+
+    def rafraichir(self) -> None:
+        '''
+        Rafraîchit les synthèses des requêtes avec les seules lignes insérées
+        ou supprimées.
+        '''
+        with self.connexion.cursor() as curseur:
+            curseur.callproc('rafraichir_syntheses')
+
+
+BASES: typing.Dict[str, typing.Type[BaseDeDonnees]] = {
+    'sqlite': BaseSqlite,
+    'oracle': BaseOracle
+}
+
+def ouvrir_base(url: str, taille_lot: int, intervalle_commit: int, completer: bool = False) -> BaseDeDonnees:
+    '''
+    Ouvre une base de données désignée par "<sgbd>:<connexion>", par exemple
+    "sqlite:data/dpe.sqlite" ou "oracle:user/user@localhost:1521/XEPDB1", à
+    compléter par une exécution incrémentale si `completer`.
+    '''
+    sgbd, _, connexion = url.partition(':')
+    if sgbd not in BASES or not connexion:
+        raise ValueError(f'base de données "{url}" invalide, "<{"|".join(BASES)}>:<connexion>" attendu')
+    return BASES[sgbd](connexion, taille_lot, intervalle_commit, completer)
+
+
+def type_arrow(type_sql: typing.Optional[str], cle: bool) -> typing.Any:
+    '''
+    Retourne le type Arrow d'une colonne de type SQL : les dates sont des
+    nombres de jours, les nombres décimaux des flottants, et les chaînes de
+    caractères, hors clés, sont encodées par dictionnaire.
+    '''
+    type_sql = type_sql or 'VARCHAR2'
+    if type_sql == 'DATE':
+        return pyarrow.date32()
+    if type_sql.startswith('NUMBER'):
+        return pyarrow.float64() if ',' in type_sql else pyarrow.int64()
+    return pyarrow.string() if cle else pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+
+
+class TableParquet(TableParLots):
+    '''
+    Une table écrite dans un fichier Parquet, dont les colonnes sont typées
+    d'après le schéma de `init.sql`, par groupes de `TAILLE_GROUPE` lignes.
+    '''
+    def __init__(self, fichier: str, nom: str, champs: typing.List[str], schema: typing.Dict[str, TableSql]) -> None:
+        table = schema.get(nom)
+        # les clés, primaires et étrangères, ne sont pas encodées par dictionnaire
+        cles = [ champ for champ in champs if table is None or champ in table.cle_primaire or table.colonnes.get(champ) is None ]
+
+        self.champs  = champs
+        self.schema  = pyarrow.schema([ (champ, type_arrow(type_colonne(schema, nom, champ), champ in cles)) for champ in champs ])
+        self.fichier = pyarrow.parquet.ParquetWriter(fichier, self.schema)
+        self.colonnes: typing.List[typing.List[typing.Any]] = [ [] for _ in champs ]
+        super().__init__(fichier, self.ecrire)
+
+    def ecrire(self, lot: typing.List[Ligne]) -> None:
+        '''
+        Ajoute un lot aux colonnes du groupe en cours, et écrit celui-ci s'il
+        est complet.
+        '''
+        for champ, colonne in zip(self.champs, self.colonnes):
+            colonne.extend(ligne.get(champ) for ligne in lot)
+        if len(self.colonnes[0]) >= TAILLE_GROUPE:
+            self.ecrire_groupe()
+
+    def ecrire_groupe(self) -> None:
+        '''
+        Écrit le groupe en cours.
+        '''
+        if self.colonnes[0]:
+            self.fichier.write_table(pyarrow.table([ self.convertir(colonne, champ.type)
+                                                     for colonne, champ in zip(self.colonnes, self.schema) ],
+                                                   schema=self.schema))
+            self.colonnes = [ [] for _ in self.champs ]
+
+    @staticmethod
+    def convertir(valeurs: typing.List[typing.Any], type_arrow: typing.Any) -> typing.Any:
+        '''
+        Convertit les valeurs d'une colonne en un tableau Arrow de son type,
+        d'après leur texte si elles sont de types différents, comme les
+        consommations valant 0 par défaut.
+        '''
+        try:
+            tableau = pyarrow.array(valeurs)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+            tableau = pyarrow.array([ None if valeur is None else str(valeur) for valeur in valeurs ], pyarrow.string())
+        return tableau.cast(type_arrow)
+
+    def terminer(self) -> None:
+        '''
+        Écrit les dernières lignes, arrête l'étage, puis ferme le fichier.
+        '''
+        super().terminer()
+        self.ecrire_groupe()
+        self.fichier.close()
 
-                generateurs = combiner_generateurs(generateurs_chauffage, generateurs_ecs)
 
-                if not generateurs:
-                    raise GenError("Installations et générateurs invalides")
+def rollup(*dimensions: str) -> typing.List[typing.Tuple[str, ...]]:
+    '''
+    Retourne les ensembles de regroupement de `ROLLUP (dimensions)`.
+    '''
+    return [ dimensions[:i] for i in range(len(dimensions), -1, -1) ]
+
+def cube(*dimensions: str) -> typing.List[typing.Tuple[str, ...]]:
+    '''
+    Retourne les ensembles de regroupement de `CUBE (dimensions)`, dans
+    l'ordre de leur `GROUPING_ID`.
+    '''
+    n = len(dimensions)
+    return [ tuple(dimension for i, dimension in enumerate(dimensions) if not masque >> (n - 1 - i) & 1) for masque in range(2 ** n) ]
+
+def _ordre(valeurs: typing.Iterable[typing.Any]) -> typing.Tuple:
+    '''
+    Clé de tri de valeurs, les valeurs nulles en dernier comme dans Oracle.
+    '''
+    return tuple((valeur is None, '' if valeur is None else valeur) for valeur in valeurs)
+
+def _rangs(nombres: typing.Iterable[int]) -> typing.Iterator[int]:
+    '''
+    Calcule les rangs, au sens de `RANK()`, de nombres triés par ordre
+    décroissant.
+    '''
+    rang = precedent = None
+    for i, nombre in enumerate(nombres, 1):
+        if nombre != precedent:
+            rang, precedent = i, nombre
+        yield rang
+
+
+class Cellule(typing.NamedTuple):
+    '''
+    Une cellule d'un agrégat : les valeurs de ses dimensions (None pour une
+    dimension agrégée), son nombre de lignes, les moyennes de ses mesures et
+    son `GROUPING_ID`.
+    '''
+    valeurs: typing.Dict[str, typing.Any]
+    nombre: int
+    moyennes: typing.List[typing.Optional[float]]
+    groupement: int
+
+
+class Agregat:
+    '''
+    Les accumulateurs d'une requête d'agrégation, mis à jour ligne à ligne :
+    pour chaque cellule de ses ensembles de regroupement (`GROUPING SETS`,
+    auxquels se ramènent `ROLLUP` et `CUBE`), le nombre de lignes, et la somme
+    et le nombre de valeurs non nulles de chaque mesure, dont se déduisent
+    leurs moyennes.
+    '''
+    def __init__(self, dimensions: typing.List[str], ensembles: typing.List[typing.Tuple[str, ...]], mesures: typing.Sequence[str] = ()) -> None:
+        self.dimensions = dimensions
+        self.ensembles  = [ [ dimensions.index(dimension) for dimension in ensemble ] for ensemble in ensembles ]
+        self.mesures    = mesures
+        self.cellules: typing.Dict[typing.Tuple, typing.List[float]] = {}
+
+    def ajouter(self, valeurs: typing.Sequence[typing.Any], mesures: typing.Sequence[typing.Optional[float]] = ()) -> None:
+        '''
+        Ajoute une ligne, de valeurs des dimensions et des mesures données.
+        '''
+        for i, ensemble in enumerate(self.ensembles):
+            cle = (i, *[ valeurs[j] for j in ensemble ])
+            cellule = self.cellules.get(cle)
+            if cellule is None:
+                cellule = self.cellules[cle] = [0] * (1 + 2 * len(self.mesures))
+            cellule[0] += 1
+            for k, mesure in enumerate(mesures):
+                if mesure is not None:
+                    cellule[1 + 2 * k] += mesure
+                    cellule[2 + 2 * k] += 1
+
+    def __iter__(self) -> typing.Iterator[Cellule]:
+        n = len(self.dimensions)
+        for (i, *valeurs), cellule in self.cellules.items():
+            ensemble = self.ensembles[i]
+            yield Cellule(
+                { dimension: valeurs[ensemble.index(j)] if j in ensemble else None for j, dimension in enumerate(self.dimensions) },
+                cellule[0],
+                [ cellule[1 + 2 * k] / cellule[2 + 2 * k] if cellule[2 + 2 * k] else None for k in range(len(self.mesures)) ],
+                sum(1 << (n - 1 - j) for j in range(n) if j not in ensemble)
+            )
+
+    def etat(self) -> typing.List[typing.List[typing.Any]]:
+        '''
+        Retourne les accumulateurs, à enregistrer avec un point de reprise.
+        '''
+        return [ [ list(cle), cellule ] for cle, cellule in self.cellules.items() ]
+
+    def reprendre(self, etat: typing.List[typing.List[typing.Any]]) -> None:
+        '''
+        Reprend les accumulateurs d'un point de reprise.
+        '''
+        self.cellules = { tuple(cle): cellule for cle, cellule in etat }
+
+
+def _nombre(valeur: typing.Any) -> typing.Optional[float]:
+    '''
+    Convertit une valeur numérique éventuellement absente en flottant.
+    '''
+    return None if valeur is None else float(valeur)
+
+
+class Rapports:
+    '''
+    Les résultats des requêtes de `query/`, calculés au fil du traitement sur
+    les enregistrements produits, sans jointure : les départements, communes
+    et logements sont mémorisés à leur émission pour que chaque DPE et ses
+    générateurs soient ajoutés aux agrégats avec eux, les caractéristiques
+    des logements l'étant dans un registre.
+    '''
+    def __init__(self) -> None:
+        # zone climatique et région des départements, département des communes
+        self.departements: typing.Dict[int, typing.Tuple[str, int]] = {}
+        self.communes: typing.Dict[int, int] = {}
+        # typologie, classe d'inertie, type de bâtiment et commune des logements
+        self.logements = Registre('rapports_logements')
+
+        self.nombres = { 'dpes': 0, 'chauffage': 0, 'ecs': 0, 'solaire': 0 }
+        self.agregats = {
+            'conso_par_type': Agregat(['type_energie'], [('type_energie',)], ['conso_chauffage', 'conso_ecs']),
+            'conso_par_typologie': Agregat(['typologie', 'classe_inertie'], rollup('typologie', 'classe_inertie'),
+                                           ['conso_chauffage', 'conso_ecs', 'conso_enr']),
+            'departements_par_conso': Agregat(['no_departement'], [('no_departement',)], ['conso']),
+            'dpes_par_an': Agregat(['type_batiment', 'annee'], [('annee',), ('type_batiment', 'annee')]),
+            'energies_par_zone': Agregat(['zone_climatique', 'type_energie'], [('zone_climatique', 'type_energie')]),
+            'logements_par_etiquette': Agregat(['etiquette_ges', 'etiquette_dpe'], cube('etiquette_ges', 'etiquette_dpe')),
+            'repartition_logements': Agregat(['zone_climatique', 'no_region', 'type_installation_chauffage'], [
+                (),
+                ('type_installation_chauffage',),
+                ('zone_climatique',),
+                ('no_region', 'type_installation_chauffage'),
+                ('zone_climatique', 'type_installation_chauffage')
+            ])
+        }
+
+    def ajouter(self, departement: typing.Optional[Ligne], commune: typing.Optional[Ligne],
+                logement: typing.Optional[Ligne], diagnostic: Diagnostic) -> None:
+        '''
+        Ajoute aux agrégats les enregistrements d'un DPE accepté, les
+        départements, communes et logements n'étant donnés qu'à leur émission.
+        '''
+        if departement is not None:
+            self.departements[departement['no_departement']] = (departement['zone_climatique'], departement['no_region'])
+        if commune is not None:
+            self.communes[commune['code_insee']] = commune['no_departement']
+
+        dpe = diagnostic.dpe
+        if logement is not None:
+            caracteristiques = (logement.get('typologie'), logement.get('classe_inertie'), logement['type_batiment'], logement['code_insee'])
+            self.logements.ajouter(logement['id_logement'], '\x1f'.join('' if valeur is None else str(valeur) for valeur in caracteristiques))
+            no_departement = self.communes[logement['code_insee']]
+            zone_climatique, no_region = self.departements[no_departement]
+            self.agregats['repartition_logements'].ajouter((zone_climatique, no_region, logement.get('type_installation_chauffage')))
+        else:
+            typologie, classe_inertie, type_batiment, code_insee = self.logements.get(dpe['id_logement']).split('\x1f')
+            caracteristiques = (typologie or None, classe_inertie or None, type_batiment, int(code_insee))
+            no_departement = self.communes[caracteristiques[3]]
+            zone_climatique = self.departements[no_departement][0]
+
+        self.nombres['dpes']      += 1
+        self.nombres['chauffage'] += len(diagnostic.installations_chauffage)
+        self.nombres['ecs']       += len(diagnostic.installations_ecs)
+        self.nombres['solaire']   += diagnostic.installation_solaire is not None
+
+        self.agregats['dpes_par_an'].ajouter((caracteristiques[2], int(dpe['date_etablissement'][:4])))
+        if not dpe['dpe_remplace']:
+            self.agregats['logements_par_etiquette'].ajouter((dpe['etiquette_ges'], dpe['etiquette_dpe']))
+
+        conso_enr = _nombre(dpe.get('conso_enr'))
+        for generateur in diagnostic.generateurs:
+            conso_chauffage = float(generateur['conso_chauffage'])
+            conso_ecs       = float(generateur['conso_ecs'])
+            self.agregats['conso_par_type'].ajouter((generateur['type_energie'],), (conso_chauffage, conso_ecs))
+            self.agregats['conso_par_typologie'].ajouter(caracteristiques[:2], (conso_chauffage, conso_ecs, conso_enr))
+            self.agregats['departements_par_conso'].ajouter((no_departement,), (conso_chauffage + conso_ecs,))
+            self.agregats['energies_par_zone'].ajouter((zone_climatique, generateur['type_energie']))
+
+    def etat(self) -> typing.Dict[str, typing.Any]:
+        '''
+        Retourne les agrégats, à enregistrer avec un point de reprise.
+        '''
+        return {
+            'departements': [ [ no_departement, *valeurs ] for no_departement, valeurs in self.departements.items() ],
+            'communes': list(self.communes.items()),
+            'nombres': self.nombres,
+            'agregats': { nom: agregat.etat() for nom, agregat in self.agregats.items() }
+        }
+
+    def reprendre(self, etat: typing.Dict[str, typing.Any]) -> None:
+        '''
+        Reprend les agrégats d'un point de reprise.
+        '''
+        self.departements = { no_departement: (zone_climatique, no_region) for no_departement, zone_climatique, no_region in etat['departements'] }
+        self.communes     = { code_insee: no_departement for code_insee, no_departement in etat['communes'] }
+        self.nombres      = etat['nombres']
+        for nom, agregat in self.agregats.items():
+            agregat.reprendre(etat['agregats'][nom])
+
+    def resultats(self) -> typing.Dict[str, typing.Tuple[typing.List[str], typing.List[typing.Sequence[typing.Any]]]]:
+        '''
+        Retourne les colonnes et les lignes du résultat de chaque requête.
+        '''
+        a = self.agregats
+        resultats = {}
+
+        cellules = sorted(a['conso_par_type'], key=lambda c: (-c.nombre, _ordre(c.valeurs.values())))
+        resultats['conso_par_type'] = (
+            ['type_energie', 'conso_chauffage_moyenne', 'conso_ecs_moyenne', 'rank'],
+            [ [ c.valeurs['type_energie'], *c.moyennes, rang ] for c, rang in zip(cellules, _rangs(c.nombre for c in cellules)) ]
+        )
+
+        resultats['conso_par_typologie'] = (
+            ['typologie', 'classe_inertie', 'consommation_chauffage_moyenne', 'consommation_ecs_moyenne', 'consommation_enr_moyenne'],
+            [ [ *c.valeurs.values(), *c.moyennes ] for c in sorted(a['conso_par_typologie'], key=lambda c: (_ordre(c.valeurs.values()), c.groupement)) ]
+        )
+
+        cellules = sorted(a['departements_par_conso'], key=lambda c: (-c.moyennes[0], _ordre(c.valeurs.values())))[:10]
+        resultats['departements_par_conso'] = (
+            ['no_departement', 'conso_moyenne', 'nb_generateurs'],
+            [ [ c.valeurs['no_departement'], c.moyennes[0], c.nombre ] for c in cellules ]
+        )
+
+        # le cumul porte sur les lignes des deux ensembles de regroupement,
+        # ordonnées par année
+        lignes = []
+        cumul = 0
+        for c in sorted(a['dpes_par_an'], key=lambda c: _ordre((c.valeurs['annee'], c.valeurs['type_batiment']))):
+            cumul += c.nombre
+            lignes.append([ c.valeurs['type_batiment'], c.valeurs['annee'], c.nombre, cumul ])
+        resultats['dpes_par_an'] = (
+            ['type_batiment', 'annee', 'nb_dpes', 'nb_dpes_cumules'],
+            sorted(lignes, key=lambda ligne: _ordre(ligne[:2]))
+        )
+
+        lignes = []
+        zones = collections.defaultdict(list)
+        for c in a['energies_par_zone']:
+            zones[c.valeurs['zone_climatique']].append(c)
+        for zone_climatique in sorted(zones, key=lambda zone: _ordre((zone,))):
+            cellules = sorted(zones[zone_climatique], key=lambda c: (-c.nombre, _ordre(c.valeurs.values())))
+            lignes.extend([ zone_climatique, c.valeurs['type_energie'], rang, c.nombre ]
+                          for c, rang in zip(cellules, _rangs(c.nombre for c in cellules)) if rang <= 3)
+        resultats['energies_par_zone'] = (['zone_climatique', 'type_energie', 'rang', 'nb_generateurs'], lignes)
+
+        resultats['installations_par_appart'] = (
+            ['type_installation', 'nb_avg'],
+            [ [ nom, self.nombres[nom] / self.nombres['dpes'] ] for nom in ('chauffage', 'ecs', 'solaire') if self.nombres[nom] ]
+        )
+
+        resultats['logements_par_etiquette'] = (
+            ['etiquette_ges', 'etiquette_dpe', 'nb_logements'],
+            [ [ *c.valeurs.values(), c.nombre ] for c in sorted(a['logements_par_etiquette'], key=lambda c: (_ordre(c.valeurs.values()), c.groupement)) ]
+        )
+
+        resultats['repartition_logements'] = (
+            ['zone_climatique', 'no_region', 'type_installation_chauffage', 'nb_logements', 'id_groupe'],
+            [ [ *c.valeurs.values(), c.nombre, c.groupement ] for c in sorted(a['repartition_logements'], key=lambda c: (c.groupement, _ordre(c.valeurs.values()))) ]
+        )
+
+        return resultats
+
+    def ecrire(self, repertoire: str) -> None:
+        '''
+        Écrit le résultat de chaque requête dans un fichier CSV du répertoire.
+        '''
+        os.makedirs(repertoire, exist_ok=True)
+        for nom, (colonnes, lignes) in self.resultats().items():
+            with open(os.path.join(repertoire, f'{nom}.csv'), 'w', newline='') as f:
+                sortie = csv.writer(f)
+                sortie.writerow(colonnes)
+                sortie.writerows(lignes)
+
+
+class Suivi:
+    '''
+    Suit l'avancement du traitement d'après la position dans le fichier source
+    de la tranche en cours, et en affiche périodiquement les métriques sur la
+    sortie d'erreur, en texte ou en JSON.
+    '''
+    def __init__(self, taille: int, intervalle: float, en_json: bool) -> None:
+        self.taille     = taille
+        self.intervalle = intervalle
+        self.en_json    = en_json
+
+        self.octets    = 0
+        self.lignes    = 0
+        self.acceptes  = 0
+        self.rejetes   = 0
+        self.inchanges = 0
+
+        # les débits ne portent que sur la partie traitée depuis la reprise
+        self.octets_reprise = 0
+        self.lignes_reprise = 0
+
+        # les étages du traitement exécutés dans leurs propres fils, le temps
+        # d'occupation du fil principal étant celui qu'il ne passe pas à les
+        # attendre
+        self.etages: typing.List[Etage] = []
+
+        self.debut = self.dernier_affichage = time.monotonic()
+        self.debut_cpu = time.thread_time()
+
+    def compteurs(self) -> typing.Dict[str, int]:
+        '''
+        Retourne les compteurs du traitement, à enregistrer avec un point de
+        reprise.
+        '''
+        return {
+            'octets': self.octets,
+            'lignes': self.lignes,
+            'acceptes': self.acceptes,
+            'rejetes': self.rejetes,
+            'inchanges': self.inchanges
+        }
+
+    def reprendre(self, compteurs: typing.Dict[str, int]) -> None:
+        '''
+        Reprend les compteurs d'un point de reprise.
+        '''
+        for nom, valeur in compteurs.items():
+            setattr(self, nom, valeur)
+        self.octets_reprise = self.octets
+        self.lignes_reprise = self.lignes
+
+    def metriques(self) -> typing.Dict[str, typing.Any]:
+        '''
+        Calcule les métriques courantes du traitement.
+        '''
+        duree = max(time.monotonic() - self.debut, 1e-9)
+        debit = (self.octets - self.octets_reprise) / duree
+        return {
+            'duree': round(duree, 1),
+            'octets': self.octets,
+            'taille': self.taille,
+            'progression': round(100 * self.octets / self.taille, 1) if self.taille else 100.,
+            'lignes': self.lignes,
+            'lignes_par_seconde': round((self.lignes - self.lignes_reprise) / duree),
+            'mo_par_seconde': round(debit / 2 ** 20, 1),
+            'dpes_acceptes': self.acceptes,
+            'dpes_rejetes': self.rejetes,
+            'dpes_inchanges': self.inchanges,
+            'fin_estimee': round((self.taille - self.octets) / debit) if debit else None,
+            'logements_trouves': logements.trouves,
+            'logements_generes': logements.manques,
+            'memoire_max_mo': _memoire_max(),
+            'etages': {
+                'analyse': { 'occupation': round(max(duree - sum(etage.attente for etage in self.etages), 0.), 1) },
+                **{ etage.nom: etage.metriques() for etage in self.etages }
+            }
+        }
+
+    def afficher(self) -> None:
+        '''
+        Affiche les métriques courantes du traitement.
+        '''
+        self.dernier_affichage = time.monotonic()
+        m = self.metriques()
+        if self.en_json:
+            print(json.dumps(m), file=sys.stderr, flush=True)
+        else:
+            print(f"[{_duree(m['duree'])}] {m['progression']:5.1f} % : {m['lignes']} lignes"
+                  f" ({m['lignes_par_seconde']} lignes/s, {m['mo_par_seconde']} Mo/s),"
+                  f" {m['dpes_acceptes']} DPE acceptés, {m['dpes_rejetes']} rejetés,"
+                  + (f" {m['dpes_inchanges']} inchangés," if m['dpes_inchanges'] else '') +
+                  f" {m['logements_trouves']} logements déjà émis, {m['logements_generes']} générés,"
+                  f" fin estimée dans {_duree(m['fin_estimee'])}"
+                  + (f", mémoire max {m['memoire_max_mo']} Mo" if m['memoire_max_mo'] is not None else ''),
+                  file=sys.stderr, flush=True)
+            if self.etages:
+                print('    étages : ' + ', '.join(f"{nom} {etage['occupation']} s"
+                                                  + (f" [{etage['file']}]" if 'file' in etage else '')
+                                                  for nom, etage in m['etages'].items()),
+                      file=sys.stderr, flush=True)
+
+    def ligne(self) -> None:
+        '''
+        Compte une ligne traitée, et affiche les métriques si l'intervalle
+        d'affichage est écoulé.
+        '''
+        self.lignes += 1
+        if self.intervalle and not self.lignes % 1024 and time.monotonic() - self.dernier_affichage >= self.intervalle:
+            self.afficher()
+
+
+class Profil:
+    '''
+    Le profil du traitement : les appels des fonctions d'analyse (cast_*,
+    cle_*, generer_*...) sont comptés, et leurs temps mural et CPU cumulés,
+    appels imbriqués compris.
+    Les fonctions ne sont remplacées par leur version instrumentée qu'à
+    l'activation du profil, qui ne coûte ainsi rien sinon. Dans un processus
+    auxiliaire, les mesures sont relevées après chaque tranche, pour être
+    ajoutées à celles du processus principal.
+    '''
+    PREFIXES  = ('cast_', 'cle_', 'generer_')
+    FONCTIONS = ('combiner_generateurs', 'decouper_enregistrement', 'empreinte_ligne', 'analyser_ligne', 'resoudre_analyse')
+
+    def __init__(self) -> None:
+        # les nombres d'appels, et les temps mural et CPU cumulés
+        self.mesures: typing.Dict[str, typing.List[float]] = {}
+
+    def activer(self) -> None:
+        '''
+        Remplace les fonctions profilées de ce module par leur version
+        instrumentée, avant que l'en-tête du fichier source ne soit indexé.
+        '''
+        espace = globals()
+        for nom, fonction in list(espace.items()):
+            if inspect.isfunction(fonction) and (nom.startswith(self.PREFIXES) or nom in self.FONCTIONS):
+                espace[nom] = self.instrumenter(nom, fonction)
+        for conversion, fonction in CONVERSIONS.items():
+            CONVERSIONS[conversion] = espace[fonction.__name__]
+
+    def instrumenter(self, nom: str, fonction: typing.Callable) -> typing.Callable:
+        '''
+        Retourne la version instrumentée d'une fonction.
+        '''
+        mesure = self.mesures.setdefault(nom, [0, 0., 0.])
+        horloge, horloge_cpu = time.perf_counter, time.thread_time
+
+        @functools.wraps(fonction)
+        def instrumentee(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            debut, debut_cpu = horloge(), horloge_cpu()
+            try:
+                return fonction(*args, **kwargs)
+            finally:
+                mesure[0] += 1
+                mesure[1] += horloge() - debut
+                mesure[2] += horloge_cpu() - debut_cpu
+
+        return instrumentee
+
+    def relever(self) -> typing.Dict[str, typing.List[float]]:
+        '''
+        Retourne les mesures non nulles, et les remet à zéro.
+        '''
+        releve = { nom: list(mesure) for nom, mesure in self.mesures.items() if mesure[0] }
+        for mesure in self.mesures.values():
+            mesure[:] = [0, 0., 0.]
+        return releve
+
+    def ajouter(self, releve: typing.Dict[str, typing.List[float]]) -> None:
+        '''
+        Ajoute les mesures relevées dans un processus auxiliaire.
+        '''
+        for nom, (appels, mural, cpu) in releve.items():
+            mesure = self.mesures.setdefault(nom, [0, 0., 0.])
+            mesure[0] += appels
+            mesure[1] += mural
+            mesure[2] += cpu
+
+    def afficher(self, suivi: 'Suivi') -> None:
+        '''
+        Affiche le temps mural et CPU et le débit en lignes/s de chaque étage du
+        traitement, puis les mesures des fonctions, par temps décroissant.
+        '''
+        m = suivi.metriques()
+        largeur = max([ len('fonction') ] + [ len(etage.nom) for etage in suivi.etages ] + [ len(nom) for nom in self.mesures ])
+
+        print('profil des étages :', file=sys.stderr)
+        print(f"    {'étage':<{largeur}} {'mural (s)':>10} {'CPU (s)':>10} {'lignes':>10} {'lignes/s':>10}", file=sys.stderr)
+        analyse = m['etages']['analyse']['occupation']
+        lignes  = suivi.lignes - suivi.lignes_reprise
+        print(f"    {'analyse':<{largeur}} {analyse:>10.1f} {time.thread_time() - suivi.debut_cpu:>10.1f}"
+              f" {lignes:>10} {lignes / analyse if analyse else 0:>10.0f}", file=sys.stderr)
+        for etage in suivi.etages:
+            debit = f'{etage.lignes / etage.occupation:>10.0f}' if etage.lignes and etage.occupation else f"{'-':>10}"
+            print(f"    {etage.nom:<{largeur}} {etage.occupation:>10.1f} {etage.cpu:>10.1f}"
+                  f" {etage.lignes if etage.lignes else '-':>10} {debit}", file=sys.stderr)
+
+        print('profil des fonctions (temps cumulés, appels imbriqués compris) :', file=sys.stderr)
+        print(f"    {'fonction':<{largeur}} {'appels':>10} {'mural (s)':>10} {'CPU (s)':>10} {'µs/appel':>10}", file=sys.stderr)
+        for nom, (appels, mural, cpu) in sorted(self.mesures.items(), key=lambda mesure: -mesure[1][1]):
+            if appels:
+                print(f'    {nom:<{largeur}} {appels:>10} {mural:>10.1f} {cpu:>10.1f} {1e6 * mural / appels:>10.1f}', file=sys.stderr)
+        sys.stderr.flush()
+
+
+# le profil du traitement, s'il est activé par l'option --profile
+profil: typing.Optional[Profil] = None
+
+
+class Echantillonneur:
+    '''
+    Un profileur par échantillonnage : les piles d'appels de tous les fils sont
+    relevées à intervalle régulier dans un fil dédié, puis écrites au format
+    « folded » des flame graphs (une pile par ligne, de la racine à la
+    fonction en cours, séparées par des points-virgules, suivie de son nombre
+    d'échantillons), lu par exemple par flamegraph.pl ou speedscope.
+    '''
+    def __init__(self, fichier: str, intervalle: float = 0.005) -> None:
+        self.fichier    = fichier
+        self.intervalle = intervalle
+        self.piles: typing.Counter[str] = collections.Counter()
+        self.arret = threading.Event()
+        self.fil   = threading.Thread(target=self.executer, name='echantillonneur', daemon=True)
+
+    def executer(self) -> None:
+        '''
+        Relève les piles d'appels jusqu'à l'arrêt de l'échantillonneur.
+        '''
+        moi   = threading.get_ident()
+        noms  = { fil.ident: fil.name for fil in threading.enumerate() }
+        while not self.arret.wait(self.intervalle):
+            for ident, cadre in sys._current_frames().items():
+                if ident == moi:
+                    continue
+                if ident not in noms:
+                    noms = { fil.ident: fil.name for fil in threading.enumerate() }
+                pile: typing.List[str] = []
+                while cadre is not None:
+                    code = cadre.f_code
+                    # les versions instrumentées des fonctions profilées sont
+                    # omises
+                    if code.co_name != 'instrumentee' or cadre.f_globals is not globals():
+                        pile.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    cadre = cadre.f_back
+                pile.append(noms.get(ident, str(ident)))
+                self.piles[';'.join(reversed(pile))] += 1
+
+    def __enter__(self) -> 'Echantillonneur':
+        self.fil.start()
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.arret.set()
+        self.fil.join()
+        with open(self.fichier, 'w') as f:
+            f.writelines(f'{pile} {nombre}\n' for pile, nombre in self.piles.most_common())
+
+
+def analyser_fichier(source: Source, workers: int, suivi: Suivi, empreinter: bool = False,
+                     debut: typing.Optional[int] = None, apres_tranche: typing.Optional[typing.Callable[[int], None]] = None) -> typing.Iterator[Analyse]:
+    '''
+    Analyse les lignes du fichier source, par tranches, dans ce processus ou
+    réparties entre `workers` processus, en calculant leurs empreintes si
+    `empreinter`.
+    L'analyse commence à la position `debut` du fichier décompressé si elle est
+    donnée, et `apres_tranche` est appelée avec la position de fin de chaque
+    tranche une fois toutes ses lignes traitées.
+    Les tranches d'un fichier non compressé sont repérées dans sa projection en
+    mémoire : les processus auxiliaires ne reçoivent que leurs positions.
+    '''
+    src      = source.flux
+    noms     = next(csv.reader(io.TextIOWrapper(io.BytesIO(src.readline()), encoding='utf-8-sig')))
+    position = src.tell()
+    indexer_entete(noms)
+    if debut is not None:
+        if source.carte is not None:
+            position = debut
+        elif src.seekable():
+            position = src.seek(debut)
+        else:
+            # un fichier compressé au format zstd n'est parcouru qu'en avant
+            while position < debut:
+                position += len(src.read(min(TAILLE_TRANCHE, debut - position)))
+
+    def tranches() -> typing.Iterator[Tranche]:
+        if source.carte is not None:
+            for debut_tranche, fin in reperer_tranches(source.carte, position, TAILLE_TRANCHE):
+                # seul ce processus copie les données, s'il analyse lui-même
+                # les tranches
+                donnees = source.carte[debut_tranche:fin] if workers <= 1 else b''
+                yield Tranche(fin, donnees, fin, debut_tranche)
+            return
+
+        fin = position
+        for donnees in lire_tranches(src, TAILLE_TRANCHE):
+            fin += len(donnees)
+            yield Tranche(fin, donnees, source.lus())
+
+    # les tranches sont lues dans un fil dédié, en avance sur leur analyse
+    lecture = EtageLecture('lecture', tranches(), TRANCHES_EN_AVANCE)
+    suivi.etages.insert(0, lecture)
+
+    if workers <= 1:
+        for tranche in lecture:
+            suivi.octets = tranche.lus
+            for ligne in lire_lignes(tranche):
+                yield analyser_ligne(ligne, differer=True, empreinter=empreinter)
+            if apres_tranche is not None:
+                apres_tranche(tranche.fin)
+        return
+
+    # l'analyse est répartie entre les processus, la résolution restant faite
+    # dans l'ordre du fichier : les fichiers produits sont ainsi identiques à
+    # ceux d'un seul processus.
+    fichier = source.fichier if source.carte is not None else None
+    with multiprocessing.Pool(workers, initialiser_processus, (noms, fichier, profil is not None)) as pool:
+        for fin, lus, analyses, releve in executer_en_ordre(pool, functools.partial(analyser_tranche, empreinter=empreinter), lecture, 2 * workers):
+            suivi.octets = lus
+            if releve is not None:
+                profil.ajouter(releve)
+            yield from analyses
+            if apres_tranche is not None:
+                apres_tranche(fin)
+
+
+Enregistrement = typing.Tuple[str, Ligne]
+
+def emettre(analyses: typing.Iterable[Analyse], incremental: bool = False,
+            rejeter: typing.Optional[typing.Callable[[str, GenError], None]] = None,
+            rapports: typing.Optional[Rapports] = None, suivi: typing.Optional[Suivi] = None,
+            partitionnement: typing.Optional[str] = None) -> typing.Iterator[Enregistrement]:
+    '''
+    Résout les analyses des lignes du fichier source, dans l'ordre, et produit
+    les enregistrements émis, chacun précédé de ceux qu'il référence, sous la
+    forme (table, ligne). Les registres sont mis à jour au fil de l'émission.
+    En mode incrémental, les DPE inchangés ou remplacés depuis l'exécution
+    précédente sont ignorés, et les DPE modifiés sont produits dans la table
+    dpes_modifies avant d'être émis à nouveau. Les DPE rejetés ou ignorés sont
+    aussi enregistrés, pour ne pas être acceptés lors d'une exécution suivante
+    s'ils n'ont pas changé, l'acceptation d'une ligne dépendant des logements
+    déjà émis.
+    `rejeter` est appelée avec le numéro et l'erreur de chaque DPE rejeté, les
+    rapports sont calculés au fil de l'émission, et les compteurs du suivi mis
+    à jour, s'ils sont donnés.
+    Avec un `partitionnement` (voir PARTITIONNEMENTS), les lignes des tables de
+    faits sont produites sous le nom de leur partition, "table/partition",
+    d'après l'année d'établissement ou le département de leur DPE.
+    '''
+    for analyse in analyses:
+        if suivi is not None:
+            suivi.ligne()
+        no_dpe = None
+        try:
+            no_dpe = _valeur(analyse.no_dpe)
+
+            if incremental:
+                # un DPE déjà émis est ignoré s'il n'a pas changé, ou s'il a
+                # été remplacé depuis
+                empreinte = dpes.get(no_dpe)
+                if empreinte is not None and (empreinte == analyse.empreinte or no_dpe in dpes_remplaces) \
+                        or dpes_ecartes.get(no_dpe) == analyse.empreinte:
+                    if suivi is not None:
+                        suivi.inchanges += 1
+                    continue
 
+            try:
+                enregistrements = resoudre_analyse(analyse)
+                if enregistrements is None:
+                    if incremental:
+                        dpes_ecartes.ajouter(no_dpe, analyse.empreinte)
+                    continue
             except GenError as e:
-                print(f"{no_dpe} : {e}")
+                if incremental:
+                    dpes_ecartes.ajouter(no_dpe, analyse.empreinte)
+                if rejeter is not None:
+                    rejeter(no_dpe, e)
+                if suivi is not None:
+                    suivi.rejetes += 1
                 continue
 
-            no_departement = departement['no_departement']
-            if no_departement not in departements:
-                departements[no_departement] = departement
-                table_departement.writerow(departement)
-
-            code_insee = commune['code_insee']
-            if code_insee not in communes:
-                communes[code_insee] = commune
-                table_commune.writerow(commune)
-
-            id_logement = logement['id_logement']
-            if id_logement not in logements:
-                logements[id_logement] = logement
-                if 'id_ban' in logement:
-                    logements_par_id_ban[logement['id_ban']] = id_logement
-                    del logement['id_ban']
-                if 'adresse_brute' in logement:
-                    logements_par_adresse_brute[logement['adresse_brute']] = id_logement
-                    del logement['adresse_brute']
-                table_logement.writerow(logement)
-
-            table_dpe.writerow(dpe)
-            table_installation_chauffage.writerows(installations_chauffage)
-            table_installation_ecs.writerows(installations_ecs)
-            if installation_solaire:
-                table_installation_solaire.writerow(installation_solaire)
-            table_generateur.writerows(generateurs)
-
-        except Exception as e:
-            print(f'Traitement du DPE {no_dpe} ({f"{i}".rjust(nb_lignes_log10)}/{nb_lignes})...')
-            raise e
\ No newline at end of file
+            departement, commune, logement, diagnostic = enregistrements
+
+            # un DPE modifié est listé avant d'être émis à nouveau, pour être
+            # supprimé de la base de données avant son insertion
+            if incremental and empreinte is not None:
+                yield 'dpes_modifies', { 'no_dpe': no_dpe }
+
+            if departement is not None:
+                departements.ajouter(departement['no_departement'])
+                yield 'departements', departement
+
+            if commune is not None:
+                communes.ajouter(commune['code_insee'])
+                yield 'communes', commune
+
+            if logement is not None:
+                id_ban, adresse_brute = analyse.cle_logement
+                logements.ajouter(normaliser_cle_logement(id_ban, adresse_brute), logement['id_logement'])
+                yield 'logements', logement
+                yield 'identifiants_logements', { 'id_logement': logement['id_logement'],
+                                                  'id_ban': id_ban, 'adresse_brute': adresse_brute }
+
+            # les rapports sont calculés avant que les chaînes répétées ne
+            # soient remplacées par leur numéro
+            if rapports is not None:
+                rapports.ajouter(departement, commune, logement, diagnostic)
+            yield from coder_lignes('installations_chauffage', diagnostic.installations_chauffage)
+            yield from coder_lignes('generateurs', diagnostic.generateurs)
+
+            if partitionnement is None:
+                partition = ''
+            elif partitionnement == 'annee':
+                partition = '/' + diagnostic.dpe['date_etablissement'][:4]
+            else:
+                partition = f'/{_valeur(analyse.no_departement)}'
+
+            yield 'dpes' + partition, diagnostic.dpe
+            for installation in diagnostic.installations_chauffage:
+                yield 'installations_chauffage' + partition, installation
+            for installation in diagnostic.installations_ecs:
+                yield 'installations_ecs' + partition, installation
+            if diagnostic.installation_solaire:
+                yield 'installations_solaire' + partition, diagnostic.installation_solaire
+            for generateur in diagnostic.generateurs:
+                yield 'generateurs' + partition, generateur
+            if suivi is not None:
+                suivi.acceptes += 1
+
+            if incremental:
+                dpes.ajouter(no_dpe, analyse.empreinte)
+                if diagnostic.no_dpe_remplace is not None:
+                    dpes_remplaces.ajouter(diagnostic.no_dpe_remplace)
+
+        except Exception:
+            if suivi is not None:
+                print(f'Traitement du DPE {no_dpe} (ligne {suivi.lignes}, octet {suivi.octets}/{suivi.taille})...',
+                      file=sys.stderr)
+            raise
+
+
+def produire_enregistrements(lignes: typing.Iterable[typing.Sequence[str]], noms: typing.Optional[typing.Sequence[str]] = None,
+                             rejeter: typing.Optional[typing.Callable[[str, GenError], None]] = None) -> typing.Iterator[Enregistrement]:
+    '''
+    Produit en mémoire, sous la forme (table, ligne), les enregistrements émis
+    à partir de lignes au format de l'export de l'ADEME, sans fichier ni
+    processus : `noms` sont les noms des champs, pris par défaut de la première
+    ligne, de sorte que les lignes lues par `csv.reader` puissent être données
+    telles quelles. Chaque table peut ainsi être confiée à sa propre
+    destination, par exemple un `csv.DictWriter` :
+
+        for table, ligne in produire_enregistrements(csv.reader(f)):
+            destinations[table].writerow(ligne)
+
+    Les registres des enregistrements émis sont vidés une fois les lignes
+    épuisées ou le générateur fermé : deux appels successifs sont ainsi
+    indépendants, mais deux appels ne peuvent être parcourus en même temps.
+    '''
+    lignes = iter(lignes)
+    if noms is None:
+        noms = next(lignes, None)
+        if noms is None:
+            return
+    # le BOM de l'export, si le fichier n'a pas été ouvert avec l'encodage utf-8-sig
+    indexer_entete([ noms[0].lstrip('\ufeff'), *noms[1:] ])
+
+    analyses = ( analyser_ligne(entete.projeter(ligne), differer=True) for ligne in lignes if ligne )
+    with contextlib.ExitStack() as pile:
+        for registre in (departements, communes, logements, *( d for colonnes in DICTIONNAIRES.values() for d in colonnes )):
+            pile.enter_context(registre)
+        yield from emettre(analyses, rejeter=rejeter)
+
+
+class Reprise:
+    '''
+    Les points de reprise d'un traitement, enregistrés dans une base SQLite de
+    travail avec les registres : chacun contient la position dans le fichier
+    source, celles des fichiers produits et les compteurs du traitement, et est
+    validé dans la même transaction que les empreintes des registres.
+    '''
+    def __init__(self, fichier: str, intervalle: float) -> None:
+        self.fichier    = fichier
+        self.intervalle = intervalle
+        self.base: typing.Optional[sqlite3.Connection] = None
+        self.dernier = time.monotonic()
+
+    def ouvrir(self, registres: typing.Iterable[Registre], reprendre: bool, etat: typing.Optional[str] = None) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        '''
+        Ouvre la base de travail et les registres sur celle-ci. Si `reprendre`,
+        retourne le dernier point de reprise, ou None s'il n'y en a pas ; sinon
+        la base est recréée, à partir de l'état `etat` d'une exécution
+        précédente s'il existe.
+        '''
+        os.makedirs(os.path.dirname(self.fichier) or '.', exist_ok=True)
+        if not reprendre and os.path.exists(self.fichier):
+            os.remove(self.fichier)
+
+        self.base = sqlite3.connect(self.fichier)
+        if not reprendre and etat is not None and os.path.exists(etat):
+            with contextlib.closing(sqlite3.connect(etat)) as precedent:
+                precedent.backup(self.base)
+
+        self.base.execute('CREATE TABLE IF NOT EXISTS reprise (point TEXT)')
+        if not reprendre:
+            self.base.execute('DELETE FROM reprise')
+        for registre in registres:
+            registre.ouvrir(self.base)
+        self.base.commit()
+
+        point = self.base.execute('SELECT point FROM reprise').fetchone()
+        return json.loads(point[0]) if reprendre and point is not None else None
+
+    def echu(self) -> bool:
+        '''
+        Indique si l'intervalle entre deux points de reprise est écoulé.
+        '''
+        return bool(self.intervalle) and time.monotonic() - self.dernier >= self.intervalle
+
+    def enregistrer(self, registres: typing.Iterable[Registre], point: typing.Dict[str, typing.Any]) -> None:
+        '''
+        Enregistre un point de reprise, avec les empreintes des registres.
+        '''
+        for registre in registres:
+            registre.valider()
+        self.base.execute('DELETE FROM reprise')
+        self.base.execute('INSERT INTO reprise VALUES (?)', (json.dumps(point),))
+        self.base.commit()
+        self.dernier = time.monotonic()
+
+    def sauvegarder(self, etat: str) -> None:
+        '''
+        Copie la base de travail, i.e. les registres au dernier point de
+        reprise, comme état pour une exécution suivante.
+        '''
+        os.makedirs(os.path.dirname(etat) or '.', exist_ok=True)
+        with contextlib.closing(sqlite3.connect(etat + '.tmp')) as copie:
+            self.base.backup(copie)
+        os.replace(etat + '.tmp', etat)
+
+    def supprimer(self) -> None:
+        '''
+        Ferme et supprime la base de travail, une fois le traitement terminé.
+        '''
+        self.base.close()
+        os.remove(self.fichier)
+
+
+def _memoire_max() -> typing.Optional[float]:
+    '''
+    Retourne la mémoire résidente maximale de ce processus en Mo, ou None si
+    elle n'est pas disponible.
+    '''
+    if resource is None:
+        return None
+    maximum = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # en octets sous macOS, en kilo-octets ailleurs
+    return round(maximum / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+
+def _duree(secondes: typing.Optional[float]) -> str:
+    '''
+    Formate une durée en secondes au format "HH:MM:SS".
+    '''
+    if secondes is None:
+        return '--:--:--'
+    secondes = int(secondes)
+    return f'{secondes // 3600:02}:{secondes // 60 % 60:02}:{secondes % 60:02}'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pré-traite les données DPE de l'ADEME en un fichier CSV par table.")
+    parser.add_argument('--source', default=fichier_src, metavar='FICHIER',
+                        help=f"fichier source, éventuellement compressé (.gz, .zst ou .zip) (défaut : {fichier_src})")
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help="nombre de processus analysant le fichier source (défaut : 1)")
+    parser.add_argument('--metrics-interval', type=float, default=10., metavar='SECONDES',
+                        help="intervalle d'affichage des métriques d'avancement, 0 pour ne les afficher qu'à la fin (défaut : 10)")
+    parser.add_argument('--metrics-json', action='store_true',
+                        help="affiche les métriques d'avancement en JSON, une ligne par affichage")
+    parser.add_argument('--registry-budget', type=float, default=BUDGET_REGISTRE, metavar='MO',
+                        help=f"budget mémoire de chaque registre des départements, communes et logements émis, au delà duquel il est déversé sur disque (défaut : {BUDGET_REGISTRE:g})")
+    parser.add_argument('--registry-dir', metavar='REPERTOIRE',
+                        help="répertoire des registres déversés sur disque (défaut : répertoire temporaire du système)")
+    parser.add_argument('--since-state', metavar='REPERTOIRE',
+                        help="mode incrémental : seuls les DPE nouveaux ou modifiés depuis l'exécution ayant enregistré son état dans ce répertoire sont produits, et l'état y est mis à jour")
+    parser.add_argument('--checkpoint-interval', type=float, default=INTERVALLE_REPRISE, metavar='SECONDES',
+                        help=f"intervalle entre deux points de reprise, 0 pour n'en enregistrer aucun (défaut : {INTERVALLE_REPRISE:g})")
+    parser.add_argument('--checkpoint-dir', default='data/reprise', metavar='REPERTOIRE',
+                        help="répertoire des points de reprise (défaut : data/reprise)")
+    parser.add_argument('--resume', action='store_true',
+                        help="reprend un traitement interrompu à son dernier point de reprise")
+    parser.add_argument('--db', metavar='SGBD:CONNEXION',
+                        help="insère les enregistrements directement dans une base de données au lieu de produire les fichiers CSV, par exemple sqlite:data/dpe.sqlite ou oracle:user/user@localhost:1521/XEPDB1")
+    parser.add_argument('--db-batch-size', type=int, default=TAILLE_LOT_BASE, metavar='N',
+                        help=f"nombre de lignes des lots insérés dans la base de données (défaut : {TAILLE_LOT_BASE})")
+    parser.add_argument('--db-commit-interval', type=int, default=INTERVALLE_COMMIT, metavar='N',
+                        help=f"nombre de lignes insérées entre deux validations (défaut : {INTERVALLE_COMMIT})")
+    parser.add_argument('--format', nargs='+', choices=FORMATS, default=['csv'],
+                        help="formats des fichiers produits, CSV et/ou Parquet (défaut : csv)")
+    parser.add_argument('--compress', choices=COMPRESSIONS,
+                        help="compresse les fichiers CSV produits au format gzip ou zstd, par exemple data/dpes.csv.gz")
+    parser.add_argument('--partition', choices=PARTITIONNEMENTS,
+                        help="répartit les fichiers CSV des DPE, installations et générateurs en un fichier par année d'établissement du DPE ou par département, data/<table>/<partition>.csv")
+    parser.add_argument('--reports', action='store_true',
+                        help="calcule au fil du traitement les résultats des requêtes de query/, écrits dans data/rapports")
+    parser.add_argument('--rejects', default='data/rejets.csv', metavar='FICHIER',
+                        help="journal des DPE rejetés, au format JSON Lines si son extension est .jsonl, CSV sinon (défaut : data/rejets.csv)")
+    parser.add_argument('--rejects-sample', type=int, default=1, metavar='N',
+                        help="n'écrit dans le journal que le premier puis un DPE rejeté sur N de chaque raison, 0 pour n'en écrire aucun (défaut : 1)")
+    parser.add_argument('--profile', action='store_true',
+                        help="mesure les temps mural et CPU et le débit de chaque étage, et les appels et temps cumulés des fonctions cast_*, cle_* et generer_*, affichés à la fin du traitement")
+    parser.add_argument('--profile-output', metavar='FICHIER',
+                        help="enregistre le profil du fil principal au format de cProfile si l'extension du fichier est .prof ou .pstats, ou les piles d'appels échantillonnées de tous les fils au format « folded » des flame graphs sinon")
+    args = parser.parse_args()
+
+    if args.reports and args.since_state:
+        parser.error("l'option --reports n'est pas disponible en mode incrémental")
+    if 'parquet' in args.format and pyarrow is None:
+        parser.error('le format Parquet nécessite le module pyarrow')
+    if args.compress == 'zst' and zstandard is None:
+        parser.error('la compression zstd nécessite le module zstandard')
+    if args.partition and (args.db or args.format != ['csv']):
+        parser.error("l'option --partition n'est disponible qu'avec le format CSV, sans l'option --db")
+
+    # les insertions dans une base de données, les fichiers Parquet et les
+    # fichiers partitionnés ne peuvent être repris : les points de reprise ne
+    # servent alors qu'au mode incrémental
+    reprenable = not args.db and 'parquet' not in args.format and not args.partition
+    if args.resume and not reprenable:
+        parser.error("l'option --resume n'est disponible qu'avec le format CSV, sans les options --db et --partition")
+
+    rapports  = Rapports() if args.reports else None
+    dictionnaires = tuple(dictionnaire for colonnes in DICTIONNAIRES.values() for dictionnaire in colonnes)
+    registres = (departements, communes, logements, dpes, dpes_ecartes, dpes_remplaces) + dictionnaires + ((rapports.logements,) if rapports is not None else ())
+    for registre in registres:
+        registre.budget     = args.registry_budget
+        registre.repertoire = args.registry_dir
+
+    etat    = os.path.join(args.since_state, 'etat.sqlite') if args.since_state else None
+    reprise = None
+    point   = None
+    intervalle_reprise = args.checkpoint_interval if reprenable else 0.
+    if intervalle_reprise or args.since_state or args.resume:
+        reprise = Reprise(os.path.join(args.checkpoint_dir, 'reprise.sqlite'), intervalle_reprise)
+        if args.resume and not os.path.exists(reprise.fichier):
+            parser.error(f'aucun point de reprise dans "{args.checkpoint_dir}"')
+        point = reprise.ouvrir(registres, args.resume, etat)
+        if args.resume:
+            if point is None:
+                parser.error(f'aucun point de reprise dans "{args.checkpoint_dir}"')
+            if point['taille'] != os.path.getsize(args.source):
+                parser.error('le fichier source a changé depuis le dernier point de reprise')
+            if point['since_state'] != args.since_state:
+                parser.error("l'option --since-state doit être celle du traitement interrompu")
+            if ('rapports' in point) != args.reports:
+                parser.error("l'option --reports doit être celle du traitement interrompu")
+            if args.rejects not in point['sorties']:
+                parser.error("l'option --rejects doit être celle du traitement interrompu")
+            if point['compression'] != args.compress:
+                parser.error("l'option --compress doit être celle du traitement interrompu")
+
+    try:
+        source = Source(args.source)
+    except (ImportError, ValueError, zipfile.BadZipFile) as e:
+        parser.error(str(e))
+
+    # les fonctions sont instrumentées avant que l'en-tête ne soit indexé
+    global profil
+    if args.profile:
+        profil = Profil()
+        profil.activer()
+
+    base = None
+    if args.db:
+        try:
+            base = ouvrir_base(args.db, args.db_batch_size, args.db_commit_interval, etat is not None and os.path.exists(etat))
+        except (ImportError, ValueError, sqlite3.Error) as e:
+            parser.error(str(e))
+
+    with departements, communes, logements, dpes, dpes_ecartes, dpes_remplaces, \
+         source, \
+         contextlib.ExitStack() as pile:
+
+        suivi = Suivi(source.taille, args.metrics_interval, args.metrics_json)
+
+        if args.profile_output:
+            if args.profile_output.endswith(('.prof', '.pstats')):
+                profileur = cProfile.Profile()
+                pile.callback(profileur.dump_stats, args.profile_output)
+                pile.callback(profileur.disable)
+                profileur.enable()
+            else:
+                pile.enter_context(Echantillonneur(args.profile_output))
+
+        for dictionnaire in dictionnaires:
+            pile.enter_context(dictionnaire)
+        if rapports is not None:
+            pile.enter_context(rapports.logements)
+
+        # les tables sont écrites dans la base de données, ou dans un fichier
+        # par table et par format, les fichiers CSV étant tronqués au dernier
+        # point de reprise
+        sorties: typing.List[typing.Union[typing.TextIO, SortieCompressee]] = []
+        ecritures: typing.List[typing.Union[BaseDeDonnees, TableParLots]] = []
+        if base is not None:
+            tables = { nom: base.table(nom) for nom in TABLES }
+            ecritures.append(base)
+        else:
+            schema = lire_schema() if 'parquet' in args.format else {}
+            tables = {}
+            for nom, champs in TABLES.items():
+                # les fichiers d'une exécution précédente qui ne sont pas
+                # récrits, dans l'autre disposition, l'autre compression, ou
+                # ceux de la table dpes_modifies d'une exécution incrémentale,
+                # ne doivent pas être chargés avec ceux-ci
+                if point is None:
+                    partitionnee = nom in TABLES_PARTITIONNEES and args.partition
+                    ecrit = None
+                    if 'csv' in args.format and not partitionnee and (nom != 'dpes_modifies' or args.since_state):
+                        ecrit = f'data/{nom}.csv' + (f'.{args.compress}' if args.compress else '')
+                    anciens = glob.glob(f'data/{nom}.csv*')
+                    if nom in TABLES_PARTITIONNEES:
+                        anciens += glob.glob(f'data/{nom}/*.csv*')
+                    for fichier in anciens:
+                        if fichier != ecrit:
+                            os.remove(fichier)
+                if nom == 'dpes_modifies' and not args.since_state:
+                    continue
+                if nom in TABLES_PARTITIONNEES and args.partition:
+                    tables[nom] = TablePartitionnee(f'data/{nom}', champs, args.compress)
+                    ecritures.append(tables[nom])
+                    continue
+                destinations: typing.List[TableParLots] = []
+                if 'csv' in args.format:
+                    if args.compress:
+                        sortie = pile.enter_context(SortieCompressee(f'data/{nom}.csv.{args.compress}', 'r+' if point is not None else 'w', args.compress))
+                    else:
+                        sortie = pile.enter_context(open(f'data/{nom}.csv', 'r+' if point is not None else 'w', newline=''))
+                    sorties.append(sortie)
+                    destinations.append(TableCsv(sortie, champs))
+                    if point is None:
+                        destinations[-1].writeheader()
+                if 'parquet' in args.format:
+                    destinations.append(TableParquet(f'data/{nom}.parquet', nom, champs, schema))
+                tables[nom] = destinations[0] if len(destinations) == 1 else Diffusion(destinations)
+                ecritures.extend(destinations)
+
+        # le journal des rejets, tronqué au dernier point de reprise comme les
+        # fichiers CSV
+        sortie = pile.enter_context(open(args.rejects, 'r+' if point is not None else 'w', newline=''))
+        sorties.append(sortie)
+        if args.rejects.endswith('.jsonl'):
+            journal = JournalRejets(TableJsonl(sortie), args.rejects_sample)
+        else:
+            journal = JournalRejets(TableCsv(sortie, JournalRejets.CHAMPS), args.rejects_sample)
+            if point is None:
+                journal.table.writeheader()
+        ecritures.append(journal.table)
+        suivi.etages.extend(ecriture.etage for ecriture in ecritures)
+
+        if point is not None:
+            suivi.reprendre(point['suivi'])
+            for registre in registres:
+                registre.trouves, registre.manques = point['registres'][registre.nom]
+            for sortie in sorties:
+                sortie.seek(point['sorties'][sortie.name])
+                sortie.truncate()
+            if rapports is not None:
+                rapports.reprendre(point['rapports'])
+            journal.reprendre(point['rejets'])
+
+        def point_de_reprise(fin: typing.Optional[int]) -> typing.Dict[str, typing.Any]:
+            for ecriture in ecritures:
+                ecriture.attendre()
+            for sortie in sorties:
+                sortie.flush()
+                os.fsync(sortie.fileno())
+            courant = {
+                'source': fin,
+                'taille': suivi.taille,
+                'since_state': args.since_state,
+                'compression': args.compress,
+                'sorties': { sortie.name: sortie.tell() for sortie in sorties },
+                'suivi': suivi.compteurs(),
+                'registres': { registre.nom: [registre.trouves, registre.manques] for registre in registres },
+                'rejets': journal.etat()
+            }
+            if rapports is not None:
+                courant['rapports'] = rapports.etat()
+            return courant
+
+        def apres_tranche(fin: int) -> None:
+            if reprise.echu():
+                reprise.enregistrer(registres, point_de_reprise(fin))
+
+        if reprise is not None and point is None:
+            reprise.enregistrer(registres, point_de_reprise(None))
+
+        analyses = analyser_fichier(source, args.workers, suivi, args.since_state is not None,
+                                    point['source'] if point is not None else None,
+                                    apres_tranche if reprise is not None else None)
+        ecrire = { nom: table.writerow for nom, table in tables.items() }
+        for nom, ligne in emettre(analyses, args.since_state is not None, journal.ajouter, rapports, suivi, args.partition):
+            ecriture = ecrire.get(nom)
+            if ecriture is None:
+                # la première ligne d'une partition
+                table, _, partition = nom.partition('/')
+                ecriture = ecrire[nom] = functools.partial(tables[table].writerow, partition=partition)
+            ecriture(ligne)
+
+        for ecriture in ecritures:
+            ecriture.terminer()
+
+        if rapports is not None:
+            rapports.ecrire('data/rapports')
+
+        if args.since_state:
+            reprise.enregistrer(registres, point_de_reprise(suivi.taille))
+            reprise.sauvegarder(etat)
+
+        suivi.afficher()
+        if profil is not None:
+            profil.afficher(suivi)
+        journal.afficher()
+
+        if base is not None:
+            for nom, rejets in base.rejets.items():
+                print(f'{nom} : {rejets} lignes rejetées par la base de données')
+
+    if reprise is not None:
+        reprise.supprimer()
+
+
+if __name__ == '__main__':
+    main()
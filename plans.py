@@ -0,0 +1,179 @@
+import argparse
+import collections
+import glob
+import os
+import re
+import time
+import typing
+
+
+# le répertoire des requêtes des rapports
+REPERTOIRE_REQUETES = 'query'
+
+# le répertoire des plans d'exécution écrits pour chaque requête
+REPERTOIRE_PLANS = os.path.join('data', 'plans')
+
+# les index d'un script de création, et les requêtes des synthèses de
+# `init.sql`
+_motif_index    = re.compile(r'^CREATE (?:BITMAP )?INDEX (\w+)\b.*?;', re.MULTILINE | re.DOTALL)
+_motif_synthese = re.compile(r'^CREATE MATERIALIZED VIEW (?!LOG )(\w+)\s.*?\bAS (SELECT .*?);', re.MULTILINE | re.DOTALL)
+
+
+class Requete(typing.NamedTuple):
+    '''
+    Une requête mesurée : un rapport de `query/`, ou la requête d'une synthèse
+    qui joint les tables pour les rapports.
+    '''
+    nom: str
+    texte: str
+
+
+class Mesure(typing.NamedTuple):
+    '''
+    Le coût estimé du plan d'exécution d'une requête, sa meilleure durée
+    d'exécution et ses résultats.
+    '''
+    cout: typing.Optional[int]
+    duree: float
+    resultats: typing.Counter[tuple]
+
+
+def lire_requetes(schema: str) -> typing.List[Requete]:
+    '''
+    Lit les requêtes des rapports, puis celles des synthèses définies dans
+    `schema`.
+    '''
+    requetes = []
+    for fichier in sorted(glob.glob(os.path.join(REPERTOIRE_REQUETES, '*.sql'))):
+        with open(fichier, encoding='utf-8') as f:
+            texte = f.read().strip().rstrip(';')
+        requetes.append(Requete(os.path.splitext(os.path.basename(fichier))[0], texte))
+    with open(schema, encoding='utf-8') as f:
+        requetes.extend(Requete(nom, texte) for nom, texte in _motif_synthese.findall(f.read()))
+    return requetes
+
+
+def lire_index(fichier: str) -> typing.List[typing.Tuple[str, str]]:
+    '''
+    Lit le nom et l'instruction de création de chaque index d'un script.
+    '''
+    with open(fichier, encoding='utf-8') as f:
+        return [ (m.group(1), m.group(0).rstrip(';')) for m in _motif_index.finditer(f.read()) ]
+
+
+def supprimer_index(curseur: typing.Any, index: typing.List[typing.Tuple[str, str]]) -> None:
+    '''
+    Supprime les index, en ignorant ceux qui n'existent pas (ORA-01418).
+    '''
+    for nom, _ in index:
+        curseur.execute(f'''
+            BEGIN
+                EXECUTE IMMEDIATE 'DROP INDEX {nom}';
+            EXCEPTION
+                WHEN OTHERS THEN
+                    IF SQLCODE != -1418 THEN
+                        RAISE;
+                    END IF;
+            END;''')
+
+
+def expliquer(curseur: typing.Any, requete: Requete, fichier: str) -> typing.Optional[int]:
+    '''
+    Écrit le plan d'exécution d'une requête dans `fichier`, et retourne son
+    coût estimé.
+    '''
+    curseur.execute(f"DELETE FROM plan_table WHERE statement_id = '{requete.nom}'")
+    curseur.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{requete.nom}' FOR {requete.texte}")
+    curseur.execute("SELECT plan_table_output FROM TABLE(DBMS_XPLAN.DISPLAY(NULL, :1, 'TYPICAL'))", [requete.nom])
+    with open(fichier, 'w', encoding='utf-8') as f:
+        f.writelines(f'{ligne}\n' for ligne, in curseur)
+    curseur.execute('SELECT cost FROM plan_table WHERE statement_id = :1 AND id = 0', [requete.nom])
+    ligne = curseur.fetchone()
+    return None if ligne is None else ligne[0]
+
+
+def mesurer(curseur: typing.Any, requete: Requete, repetitions: int, fichier: str) -> Mesure:
+    '''
+    Explique une requête, puis l'exécute `repetitions` fois en lisant tous
+    ses résultats, et retient la meilleure durée.
+    '''
+    cout = expliquer(curseur, requete, fichier)
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        curseur.execute(requete.texte)
+        resultats = curseur.fetchall()
+        durees.append(time.perf_counter() - debut)
+    return Mesure(cout, min(durees), collections.Counter(map(tuple, resultats)))
+
+
+def mesurer_requetes(curseur: typing.Any, requetes: typing.List[Requete], repetitions: int,
+                     suffixe: str) -> typing.Dict[str, Mesure]:
+    '''
+    Mesure chaque requête, les plans étant écrits dans les fichiers
+    `<requête>.<suffixe>.txt`.
+    '''
+    return {
+        requete.nom: mesurer(curseur, requete, repetitions, os.path.join(REPERTOIRE_PLANS, f'{requete.nom}.{suffixe}.txt'))
+        for requete in requetes
+    }
+
+
+def afficher(requetes: typing.List[Requete], avant: typing.Dict[str, Mesure], apres: typing.Dict[str, Mesure]) -> None:
+    '''
+    Affiche les coûts et durées de chaque requête sans et avec les index.
+    '''
+    def cout(mesure: Mesure) -> str:
+        return '-' if mesure.cout is None else str(mesure.cout)
+
+    largeur = max((len(requete.nom) for requete in requetes), default=0)
+    print(f'{"requête":<{largeur}} {"coût sans":>10} {"coût avec":>10} {"sans (s)":>9} {"avec (s)":>9} {"gain":>7}')
+    for requete in requetes:
+        a, b = avant[requete.nom], apres[requete.nom]
+        ecart = '' if a.resultats == b.resultats else ' résultats différents'
+        print(f'{requete.nom:<{largeur}} {cout(a):>10} {cout(b):>10} {a.duree:>9.3f} {b.duree:>9.3f} '
+              f'{f"x{a.duree / b.duree:.2f}" if b.duree else "-":>7}{ecart}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare les plans d'exécution et les durées des requêtes des rapports "
+                                                 "et des synthèses, sans puis avec les index.")
+    parser.add_argument('connexion',
+                        help='accès à la base de données, par exemple user/user@localhost:1521/XEPDB1')
+    parser.add_argument('--index', default='index.sql', metavar='FICHIER',
+                        help='script de création des index (défaut : index.sql)')
+    parser.add_argument('--schema', default='init.sql', metavar='FICHIER',
+                        help='script de création des tables et des synthèses (défaut : init.sql)')
+    parser.add_argument('--repetitions', type=int, default=3,
+                        help="nombre d'exécutions de chaque requête, dont la meilleure est retenue (défaut : 3)")
+    args = parser.parse_args()
+
+    if args.repetitions < 1:
+        parser.error('--repetitions doit être strictement positif')
+
+    import oracledb
+
+    requetes = lire_requetes(args.schema)
+    index    = lire_index(args.index)
+    os.makedirs(REPERTOIRE_PLANS, exist_ok=True)
+
+    with oracledb.connect(args.connexion) as connexion, connexion.cursor() as curseur:
+        curseur.arraysize = 1000
+
+        # les statistiques des tables chargées, sans lesquelles les plans des
+        # deux mesures ne seraient pas comparables
+        supprimer_index(curseur, index)
+        curseur.execute('BEGIN DBMS_STATS.GATHER_SCHEMA_STATS(USER); END;')
+        avant = mesurer_requetes(curseur, requetes, args.repetitions, 'sans_index')
+
+        # les statistiques des index sont calculées à leur création
+        for _, instruction in index:
+            curseur.execute(instruction)
+        apres = mesurer_requetes(curseur, requetes, args.repetitions, 'avec_index')
+
+    afficher(requetes, avant, apres)
+    print(f"Plans d'exécution : {REPERTOIRE_PLANS}/<requête>.sans_index.txt et <requête>.avec_index.txt")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,17 @@
 -- le nombre de générateurs de ce type
 
 SELECT type_energie
-     , AVG(conso_chauffage) AS conso_chauffage_moyenne
-     , AVG(conso_ecs) AS conso_ecs_moyenne
-     , RANK() OVER (ORDER BY COUNT(*) DESC) AS rank
+     , conso_chauffage_moyenne
+     , conso_ecs_moyenne
+     , rank
 
-FROM generateurs
+FROM (SELECT code_type_energie
+           , somme_conso_chauffage / nb_conso_chauffage AS conso_chauffage_moyenne
+           , somme_conso_ecs / nb_conso_ecs AS conso_ecs_moyenne
+           , RANK() OVER (ORDER BY nb_generateurs DESC) AS rank
 
-GROUP BY type_energie
+      FROM synthese_generateurs_energies)
+
+NATURAL JOIN types_energie
 
 ORDER BY rank;
\ No newline at end of file
@@ -2,12 +2,10 @@
 -- classe d'inertie
 
 SELECT typologie, classe_inertie
-     , AVG(conso_chauffage) AS consommation_chauffage_moyenne
-     , AVG(conso_ecs)       AS consommation_ecs_moyenne
-     , AVG(conso_enr)       AS consommation_enr_moyenne
+     , SUM(somme_conso_chauffage) / SUM(nb_conso_chauffage)      AS consommation_chauffage_moyenne
+     , SUM(somme_conso_ecs)       / SUM(nb_conso_ecs)            AS consommation_ecs_moyenne
+     , SUM(somme_conso_enr)       / NULLIF(SUM(nb_conso_enr), 0) AS consommation_enr_moyenne
 
-FROM         generateurs
-NATURAL JOIN dpes
-NATURAL JOIN logements
+FROM synthese_generateurs_typologies
 
 GROUP BY ROLLUP (typologie, classe_inertie);
\ No newline at end of file
@@ -3,13 +3,10 @@
 SELECT *
 
 FROM (SELECT no_departement
-           , AVG(conso_chauffage + conso_ecs) AS conso_moyenne
-           , COUNT(*) AS nb_generateurs
+           , SUM(somme_conso) / SUM(nb_conso) AS conso_moyenne
+           , SUM(nb_generateurs) AS nb_generateurs
 
-      FROM         communes
-      NATURAL JOIN logements
-      NATURAL JOIN dpes
-      NATURAL JOIN generateurs
+      FROM synthese_generateurs_departements
 
       GROUP BY no_departement
 
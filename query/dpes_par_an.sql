@@ -1,15 +1,14 @@
 -- nombre de DPE réalisés par an avec cumul, par type d'établissement
 
 SELECT type_batiment
-     , EXTRACT(YEAR FROM date_etablissement) AS annee
-     , COUNT(*) AS nb_dpes
-     , SUM(COUNT(*)) OVER (ORDER BY EXTRACT(YEAR FROM date_etablissement) ROWS UNBOUNDED PRECEDING) AS nb_dpes_cumules
+     , annee
+     , SUM(nb_dpes) AS nb_dpes
+     , SUM(SUM(nb_dpes)) OVER (ORDER BY annee ROWS UNBOUNDED PRECEDING) AS nb_dpes_cumules
 
-FROM         dpes
-NATURAL JOIN logements
+FROM synthese_dpes_annees
 
-GROUP BY GROUPING SETS ( EXTRACT(YEAR FROM date_etablissement)
-                       , (type_batiment, EXTRACT(YEAR FROM date_etablissement))
+GROUP BY GROUPING SETS ( annee
+                       , (type_batiment, annee)
                        )
 
 ORDER BY type_batiment, annee;
\ No newline at end of file
@@ -1,20 +1,21 @@
 -- 3 types d'énergies les plus utilisés par zone climatique
 
-SELECT *
+SELECT zone_climatique
+     , type_energie
+     , rang
+     , nb_generateurs
 
 FROM (SELECT zone_climatique
-           , type_energie
+           , code_type_energie
            , RANK() OVER (PARTITION BY zone_climatique
-                          ORDER BY COUNT(*) DESC) AS rang
-           , COUNT(*) AS nb_generateurs
+                          ORDER BY SUM(nb_generateurs) DESC) AS rang
+           , SUM(nb_generateurs) AS nb_generateurs
 
-      FROM         generateurs
-      NATURAL JOIN dpes
-      NATURAL JOIN logements
-      NATURAL JOIN communes
-      NATURAL JOIN departements
+      FROM synthese_generateurs_departements
 
-      GROUP BY zone_climatique, type_energie)
+      GROUP BY zone_climatique, code_type_energie)
+
+NATURAL JOIN types_energie
 
 WHERE rang <= 3
 
@@ -1,7 +1,7 @@
 -- nombre d'installations chauffage/ECS/solaire par appartement
 
-WITH a (nb_dpe) AS (SELECT COUNT(*) FROM dpes)
+WITH a (nb_dpe) AS (SELECT SUM(nb_dpes) FROM synthese_dpes_etiquettes)
 
-          SELECT 'chauffage' AS type_installation, COUNT(*) / nb_dpe AS nb_avg FROM installations_chauffage, a GROUP BY nb_dpe
-UNION ALL SELECT 'ecs'       AS type_installation, COUNT(*) / nb_dpe AS nb_avg FROM installations_ecs      , a GROUP BY nb_dpe
-UNION ALL SELECT 'solaire'   AS type_installation, COUNT(*) / nb_dpe AS nb_avg FROM installations_solaire  , a GROUP BY nb_dpe;
\ No newline at end of file
+          SELECT 'chauffage' AS type_installation, SUM(nb_installations) / nb_dpe AS nb_avg FROM synthese_installations_chauffage, a GROUP BY nb_dpe
+UNION ALL SELECT 'ecs'       AS type_installation, SUM(nb_installations) / nb_dpe AS nb_avg FROM synthese_installations_ecs      , a GROUP BY nb_dpe
+UNION ALL SELECT 'solaire'   AS type_installation, SUM(nb_installations) / nb_dpe AS nb_avg FROM synthese_installations_solaire  , a GROUP BY nb_dpe;
\ No newline at end of file
@@ -2,9 +2,9 @@
 
 SELECT etiquette_ges
      , etiquette_dpe
-     , COUNT(*) AS nb_logements
+     , SUM(nb_dpes) AS nb_logements
 
-FROM dpes
+FROM synthese_dpes_etiquettes
 
 WHERE dpe_remplace = 0
 
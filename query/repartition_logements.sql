@@ -3,12 +3,10 @@
 SELECT zone_climatique
      , no_region
      , type_installation_chauffage
-     , COUNT(*) AS nb_logements
+     , SUM(nb_logements) AS nb_logements
      , GROUPING_ID(zone_climatique, no_region, type_installation_chauffage) AS id_groupe
 
-FROM         logements
-NATURAL JOIN communes
-NATURAL JOIN departements
+FROM synthese_logements_zones
 
 GROUP BY GROUPING SETS ( ()                                             -- tous les logements
                        , (type_installation_chauffage)                  -- par type d'installation